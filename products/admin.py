@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Product, Category, Cart, CartItem, Order, OrderItem
+from .search import filter_orders
+from .models import (
+    Product, Category, Cart, CartItem, Order, OrderItem, OrderEvent, SellerLatencyRollup,
+    ArchivedOrder, ArchivedOrderEvent, ArchivedOrderItem,
+)
 
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'parent', 'full_hierarchy')
@@ -52,18 +56,90 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('product', 'quantity', 'price', 'total_price')
 
 
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ('event_type', 'from_status', 'to_status', 'seller', 'created_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer_name', 'customer_email', 'status', 'seller_name', 'total_amount', 'created_at')
     list_filter = ('status', 'created_at', 'seller')
     search_fields = ('customer_name', 'customer_email', 'customer_phone')
-    readonly_fields = ('created_at', 'accepted_at', 'completed_at')
-    inlines = [OrderItemInline]
+    readonly_fields = ('status', 'created_at', 'accepted_at', 'completed_at')
+    inlines = [OrderItemInline, OrderEventInline]
+    actions = ['cancel_orders']
     
     def seller_name(self, obj):
         return obj.seller.username if obj.seller else 'Not Assigned'
     seller_name.short_description = 'Seller'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text order index instead of LIKE '%q%' over every order."""
+        if not search_term:
+            return queryset, False
+        return filter_orders(queryset, search_term), False
+
+    @admin.action(description='Cancel selected orders')
+    def cancel_orders(self, request, queryset):
+        """Cancel through the model so every cancellation is logged as an OrderEvent."""
+        cancelled = 0
+        for order in queryset.exclude(status__in=('completed', 'cancelled')):
+            order.cancel_order()
+            cancelled += 1
+        self.message_user(request, f'{cancelled} order(s) cancelled.')
+
+
+@admin.register(SellerLatencyRollup)
+class SellerLatencyRollupAdmin(admin.ModelAdmin):
+    list_display = ('seller', 'day', 'accepted_count', 'median_accept_seconds', 'p95_accept_seconds',
+                    'completed_count', 'median_complete_seconds', 'p95_complete_seconds')
+    list_filter = ('day', 'seller')
+    exclude = ('accept_samples', 'complete_samples')
+    date_hierarchy = 'day'
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    readonly_fields = ('product', 'product_name', 'quantity', 'price', 'total_price')
+
+
+class ArchivedOrderEventInline(admin.TabularInline):
+    model = ArchivedOrderEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ('event_type', 'from_status', 'to_status', 'seller', 'created_at')
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customer_name', 'customer_email', 'status', 'seller', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('customer_name', 'customer_email', 'customer_phone')
+    inlines = [ArchivedOrderItemInline, ArchivedOrderEventInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Archived orders keep their row in the full-text order index."""
+        if not search_term:
+            return queryset, False
+        return filter_orders(queryset, search_term), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
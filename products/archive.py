@@ -0,0 +1,97 @@
+"""
+Hot/cold archiving of finished orders.
+
+Completed and cancelled orders older than ``ORDER_ARCHIVE_AFTER_DAYS`` are copied
+into ``ArchivedOrder``/``ArchivedOrderItem`` and removed from the transactional
+``Order`` tables in small batches, so dashboard counts and lists only ever touch
+recent rows. The order's event log moves with it into ``ArchivedOrderEvent``,
+and archived orders stay in the full-text search table (same rowid), so the
+order lookup still finds them. Checked-out carts past the same cutoff are
+deleted: the order they produced already records what was bought.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderEvent, ArchivedOrderItem, Cart, Order, OrderEvent, OrderItem
+from .search import index_orders
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+
+EVENT_FIELDS = ('id', 'order_id', 'event_type', 'from_status', 'to_status', 'seller_id', 'created_at')
+
+ORDER_FIELDS = (
+    'id', 'customer_id', 'seller_id', 'customer_name', 'customer_email', 'customer_phone',
+    'delivery_address', 'status', 'total_amount', 'created_at', 'accepted_at',
+    'completed_at', 'is_anonymous',
+)
+
+
+def archive_cutoff(older_than_days=None):
+    days = older_than_days if older_than_days is not None else settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        created_at__lt=cutoff,
+    ).filter(Q(completed_at__isnull=True) | Q(completed_at__lt=cutoff))
+
+
+@transaction.atomic
+def archive_order_batch(order_ids):
+    """Copy one batch of orders and their items to the archive, then delete them."""
+    orders = list(Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS))
+    items = OrderItem.objects.filter(order_id__in=order_ids).values(
+        'order_id', 'product_id', 'product__name', 'quantity', 'price'
+    )
+    events = OrderEvent.objects.filter(order_id__in=order_ids).values(*EVENT_FIELDS)
+    archived = ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+    ArchivedOrderEvent.objects.bulk_create([ArchivedOrderEvent(**event) for event in events])
+    ArchivedOrderItem.objects.bulk_create([
+        ArchivedOrderItem(
+            order_id=item['order_id'],
+            product_id=item['product_id'],
+            product_name=item['product__name'] or '',
+            quantity=item['quantity'],
+            price=item['price'],
+        )
+        for item in items
+    ])
+    # The items and events were copied above; deleting the orders cascades to them
+    Order.objects.filter(id__in=order_ids).delete()
+    # The delete unindexed the orders; index the archived copies under the same ids
+    index_orders(archived)
+    return len(orders)
+
+
+def archive_orders(older_than_days=None, batch_size=None):
+    """
+    Archive every eligible order in batches of ``batch_size``.
+    Returns a dict with the number of orders archived and carts removed.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    cutoff = archive_cutoff(older_than_days)
+
+    archived = 0
+    while True:
+        order_ids = list(archivable_orders(cutoff).order_by('created_at').values_list('id', flat=True)[:batch_size])
+        if not order_ids:
+            break
+        archived += archive_order_batch(order_ids)
+
+    carts_removed = 0
+    while True:
+        cart_ids = list(
+            Cart.objects.filter(is_ordered=True, updated_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+        )
+        if not cart_ids:
+            break
+        with transaction.atomic():
+            carts_removed += Cart.objects.filter(id__in=cart_ids).delete()[1].get('products.Cart', 0)
+
+    return {'orders': archived, 'carts': carts_removed}
@@ -0,0 +1,97 @@
+"""
+In-memory prefix index for product-name autocomplete.
+
+Every word-start suffix of each product name is folded (lowercase, no
+diacritics) and kept in one sorted list, so a query is a bisect to the first
+candidate followed by a short forward scan: "contro", "Great Contro" and
+"Égypte" all resolve without touching the database.
+
+The index is built lazily per process and dropped by the Product signals in
+``products/signals.py``. The signal also writes a new version stamp to the
+``AUTOCOMPLETE_CACHE_ALIAS`` cache, which every process shares, so the other
+workers rebuild their copy once they next read the stamp; each reads it at most
+every AUTOCOMPLETE_STAMP_CHECK_SECONDS so typing does not hit the cache per
+keystroke.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Product
+from .search import normalize_text
+
+VERSION_KEY = 'product_autocomplete_version'
+DEFAULT_LIMIT = 10
+
+
+class PrefixIndex:
+    def __init__(self, names):
+        entries = set()
+        for name in names:
+            words = normalize_text(name).split()
+            for start in range(len(words)):
+                entries.add((' '.join(words[start:]), start, name))
+        # Sorted by folded key; whole-name matches (start 0) sort before word matches
+        self._entries = sorted(entries)
+        self._keys = [entry[0] for entry in self._entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        prefix = ' '.join(normalize_text(query).split())
+        if not prefix:
+            return []
+        full, partial = [], []
+        seen = set()
+        for position in range(bisect_left(self._keys, prefix), len(self._keys)):
+            key, start, name = self._entries[position]
+            if not key.startswith(prefix):
+                break
+            if name in seen:
+                continue
+            seen.add(name)
+            (full if start == 0 else partial).append(name)
+            if len(full) >= limit:
+                break
+        return (full + partial)[:limit]
+
+
+_index = None
+_index_version = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def version_cache():
+    return caches[settings.AUTOCOMPLETE_CACHE_ALIAS]
+
+
+def get_index():
+    global _index, _index_version, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _index is None or _checked_at is None or now - _checked_at >= settings.AUTOCOMPLETE_STAMP_CHECK_SECONDS:
+            version = version_cache().get(VERSION_KEY)
+            _checked_at = now
+            if _index is None or version != _index_version:
+                names = Product.objects.values_list('name', flat=True).distinct()
+                _index = PrefixIndex(names)
+                _index_version = version
+        return _index
+
+
+def invalidate_index():
+    """Forget the index here and tell other processes to rebuild theirs"""
+    global _index
+    with _lock:
+        _index = None
+    version_cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, limit)
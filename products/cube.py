@@ -0,0 +1,173 @@
+"""
+Query API over the sales cube tables.
+
+``SalesCubeDay`` (day x seller x product), ``SalesCubeMonth`` (month x seller x
+product) and ``SalesCubeCategoryMonth`` (month x seller x category) are kept
+current by ``BookSaleReport.save`` and ``Order.complete_order``. Every slice
+below filters on a leading index column plus a date range, so answering
+"revenue by title by month" or "top sellers this week" never touches the raw
+sales tables. ``rebuild_cube`` recomputes all three tables from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrderItem, BookSaleReport, OrderItem, Product,
+    SalesCubeCategoryMonth, SalesCubeDay, SalesCubeMonth,
+)
+
+DIMENSIONS = ('seller', 'product', 'category')
+GRAINS = ('day', 'month')
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def cube_table(grain, dimensions):
+    """Pick the smallest table that can answer a slice"""
+    if 'category' in dimensions:
+        if 'product' in dimensions:
+            raise ValueError("Category roll-ups do not keep the product dimension.")
+        if grain != 'month':
+            # Silently widening a day range to whole months would return wrong totals
+            raise ValueError("Category slices are only kept per month; pass grain='month'.")
+        return SalesCubeCategoryMonth, 'month'
+    if grain == 'month':
+        return SalesCubeMonth, 'month'
+    return SalesCubeDay, 'day'
+
+
+def sales_slice(start, end, group_by=('seller',), grain='day', by_period=False,
+                seller=None, product=None, category=None, order_by='-revenue', limit=None):
+    """
+    Sum units sold, units given free and revenue between ``start`` and ``end``
+    (inclusive dates), grouped by any of ``seller``, ``product`` and
+    ``category`` and optionally by period.
+
+    ``grain='month'`` reads the monthly roll-ups, which cover whole months:
+    ``start`` is rounded down to the first of its month. Category slices exist
+    only at that grain, so grouping or filtering by category with
+    ``grain='day'`` raises ValueError.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}")
+    unknown = set(group_by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+
+    filters = {'seller': seller, 'product': product, 'category': category}
+    used = set(group_by) | {name for name, value in filters.items() if value is not None}
+    table, period_field = cube_table(grain, used)
+
+    if period_field == 'month':
+        start = month_start(start)
+    queryset = table.objects.filter(**{f'{period_field}__gte': start, f'{period_field}__lte': end})
+    for name, value in filters.items():
+        if value is not None:
+            queryset = queryset.filter(**{name: value})
+
+    fields = [f'{name}_id' for name in group_by]
+    if by_period:
+        fields.insert(0, period_field)
+    rows = queryset.values(*fields).annotate(
+        units_sold=Sum('units_sold'),
+        units_free=Sum('units_free'),
+        revenue=Sum('revenue'),
+    )
+    if order_by:
+        rows = rows.order_by(order_by, *fields)
+    if limit:
+        rows = rows[:limit]
+    return list(rows)
+
+
+def top_sellers(start=None, end=None, limit=10):
+    """Sellers with the most revenue in the range (default: the last 7 days)"""
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=6)
+    return sales_slice(start, end, group_by=('seller',), limit=limit)
+
+
+def revenue_by_title_by_month(start, end, seller=None):
+    """Revenue and units per product per month"""
+    return sales_slice(
+        start, end, group_by=('product',), grain='month', by_period=True,
+        seller=seller, order_by='month',
+    )
+
+
+def _empty_measures():
+    return {'units_sold': 0, 'units_free': 0, 'revenue': Decimal('0.00')}
+
+
+def _cube_rows():
+    """Day x seller x product totals recomputed from the raw sales tables"""
+    totals = defaultdict(_empty_measures)
+
+    for row in BookSaleReport.objects.values('date_reported', 'seller_id', 'product_id').annotate(
+        sold=Sum('quantity_sold_money'), free=Sum('quantity_given_free'), revenue=Sum('total_revenue'),
+    ).order_by():
+        cell = totals[(row['date_reported'], row['seller_id'], row['product_id'])]
+        cell['units_sold'] += row['sold']
+        cell['units_free'] += row['free']
+        cell['revenue'] += row['revenue']
+
+    order_items = [
+        OrderItem.objects.filter(order__status='completed', order__seller__isnull=False),
+        ArchivedOrderItem.objects.filter(
+            order__status='completed', order__seller__isnull=False, product__isnull=False,
+        ),
+    ]
+    for items in order_items:
+        for row in items.values(
+            'order__seller_id', 'product_id', day=TruncDate('order__completed_at'),
+        ).annotate(
+            sold=Sum('quantity'), revenue=Sum(F('price') * F('quantity')),
+        ).order_by():
+            if row['day'] is None:
+                continue
+            cell = totals[(row['day'], row['order__seller_id'], row['product_id'])]
+            cell['units_sold'] += row['sold']
+            cell['revenue'] += row['revenue']
+    return totals
+
+
+@transaction.atomic
+def rebuild_cube(batch_size=1000):
+    """Replace every cube table with totals recomputed from the raw sales"""
+    days = _cube_rows()
+    categories = dict(Product.objects.values_list('id', 'category_id'))
+
+    months = defaultdict(_empty_measures)
+    category_months = defaultdict(_empty_measures)
+    for (day, seller_id, product_id), measures in days.items():
+        for field, value in measures.items():
+            months[(month_start(day), seller_id, product_id)][field] += value
+            category_months[(month_start(day), seller_id, categories[product_id])][field] += value
+
+    SalesCubeDay.objects.all().delete()
+    SalesCubeMonth.objects.all().delete()
+    SalesCubeCategoryMonth.objects.all().delete()
+    SalesCubeDay.objects.bulk_create(
+        [SalesCubeDay(day=day, seller_id=seller_id, product_id=product_id, **measures)
+         for (day, seller_id, product_id), measures in days.items()],
+        batch_size=batch_size,
+    )
+    SalesCubeMonth.objects.bulk_create(
+        [SalesCubeMonth(month=month, seller_id=seller_id, product_id=product_id, **measures)
+         for (month, seller_id, product_id), measures in months.items()],
+        batch_size=batch_size,
+    )
+    SalesCubeCategoryMonth.objects.bulk_create(
+        [SalesCubeCategoryMonth(month=month, seller_id=seller_id, category_id=category_id, **measures)
+         for (month, seller_id, category_id), measures in category_months.items()],
+        batch_size=batch_size,
+    )
+    return len(days)
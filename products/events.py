@@ -0,0 +1,100 @@
+"""
+In-process event bus for order lifecycle events.
+
+Order changes (created, accepted, completed, cancelled) are published here and streamed
+to open seller dashboards over Server-Sent Events. Events are kept in a small
+ring buffer with increasing ids so a reconnecting browser can resume from its
+``Last-Event-ID`` instead of reloading the whole dashboard.
+
+The bus lives in process memory, so the ASGI server should run the dashboard
+stream in a single worker process (e.g. ``uvicorn shopping_center.asgi:application``).
+Under WSGI the dashboard polls ``seller_order_updates`` instead, which reads the
+persistent ``OrderEvent`` log and so works across worker processes.
+"""
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+from django.db import transaction
+from django.utils import timezone
+
+BUFFER_SIZE = 500  # Number of recent events kept for reconnecting clients
+
+
+class OrderEventBus:
+    """Thread-safe publisher with asyncio-friendly waiting for subscribers."""
+
+    def __init__(self, maxlen=BUFFER_SIZE):
+        self._events = deque(maxlen=maxlen)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._events[-1]['id'] if self._events else 0
+
+    def publish(self, event_type, payload):
+        """Record an event and wake up every waiting stream."""
+        with self._lock:
+            event = {
+                'id': next(self._ids),
+                'type': event_type,
+                'data': payload,
+                'published_at': timezone.now().isoformat(),
+            }
+            self._events.append(event)
+            waiters = list(self._waiters)
+
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The subscriber's event loop has already been closed
+                pass
+        return event
+
+    def events_after(self, last_id):
+        """Return buffered events newer than ``last_id``."""
+        with self._lock:
+            return [event for event in self._events if event['id'] > last_id]
+
+    async def wait_for_events(self, last_id, timeout):
+        """Wait up to ``timeout`` seconds for events newer than ``last_id``."""
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            # Check after registering so an event published in between is not missed
+            events = self.events_after(last_id)
+            if events:
+                return events
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            return self.events_after(last_id)
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+order_events = OrderEventBus()
+
+
+def serialize_order(order):
+    """
+    Event payload: only the order id and status. The stream goes to every
+    seller, so customer details are fetched separately by the dashboard
+    through ``seller_order_detail``, which checks the seller may see them.
+    """
+    return {'id': order.id, 'status': order.status}
+
+
+def publish_order_event(event_type, order):
+    """Publish an order event once the surrounding transaction commits."""
+    payload = serialize_order(order)
+    transaction.on_commit(lambda: order_events.publish(event_type, payload))
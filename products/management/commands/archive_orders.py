@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.archive import archivable_orders, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move completed and cancelled orders older than the archive age into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive finished orders older than this many days (default: ORDER_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE,
+            help="Number of orders moved per transaction (default: ORDER_ARCHIVE_BATCH_SIZE).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many orders would be archived.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_orders(archive_cutoff(options['days'])).count()
+            self.stdout.write(f"{count} order(s) would be archived.")
+            return
+
+        result = archive_orders(older_than_days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {result['orders']} order(s) and removed {result['carts']} checked-out cart(s)."
+        ))
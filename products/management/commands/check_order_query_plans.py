@@ -0,0 +1,53 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from products.models import Order
+from users.pagination import encode_cursor, keyset_filter
+
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN QUERY PLAN on every dashboard order query and fail if any scans products_order."
+
+    # A plain table scan or an extra sort step means the query is not index-backed
+    FULL_SCAN = re.compile(r'SCAN (products_order|"products_order")(?! USING)')
+    TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Query plan checks are written for SQLite's EXPLAIN QUERY PLAN output.")
+
+        user = User(pk=0)
+        cursor = encode_cursor(['2000-01-01T00:00:00+00:00', 0])
+        queries = {
+            'seller_dashboard: pending orders': Order.objects.pending(anonymous=False),
+            'seller_dashboard: anonymous orders': Order.objects.pending(anonymous=True),
+            'seller_dashboard: my orders': Order.objects.for_seller(user),
+            'buyer_dashboard: orders': Order.objects.for_customer(user),
+            'superuser_dashboard: recent orders': Order.objects.all(),
+            'superuser_dashboard: pending count': Order.objects.pending(),
+        }
+
+        failures = []
+        for label, queryset in queries.items():
+            # Check both the first page and a page reached through a cursor
+            for page_cursor in (None, cursor):
+                page_query, _ = keyset_filter(queryset, page_cursor)
+                plan = page_query[:PAGE_SIZE + 1].explain()
+                ok = not self.FULL_SCAN.search(plan) and not self.TEMP_SORT.search(plan)
+                suffix = ' (after cursor)' if page_cursor else ''
+                status = self.style.SUCCESS('OK  ') if ok else self.style.ERROR('SCAN')
+                self.stdout.write(f"{status} {label}{suffix}")
+                if options['verbosity'] > 1 or not ok:
+                    for line in plan.splitlines():
+                        self.stdout.write(f"       {line}")
+                if not ok:
+                    failures.append(label + suffix)
+
+        if failures:
+            raise CommandError(f"{len(failures)} dashboard order queries do not use an index.")
+        self.stdout.write(self.style.SUCCESS("All dashboard order queries are index-backed."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.search import rebuild_index, uses_fts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text order search index from the orders table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Orders inserted per batch (default: 1000).")
+
+    def handle(self, *args, **options):
+        if not uses_fts():
+            self.stdout.write("Full-text search is only used on SQLite; nothing to rebuild.")
+            return
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} order(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.cube import rebuild_cube
+
+
+class Command(BaseCommand):
+    help = "Recompute the sales cube tables from book sale reports and completed orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows inserted per batch (default: 1000).")
+
+    def handle(self, *args, **options):
+        cells = rebuild_cube(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the sales cube with {cells} day cell(s)."))
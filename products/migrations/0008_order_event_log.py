@@ -0,0 +1,119 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:04
+
+import math
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def backfill_order_events(apps, schema_editor):
+    """Rebuild the event log and latency rollups from existing order timestamps."""
+    Order = apps.get_model('products', 'Order')
+    OrderEvent = apps.get_model('products', 'OrderEvent')
+    SellerLatencyRollup = apps.get_model('products', 'SellerLatencyRollup')
+
+    events = []
+    samples = defaultdict(lambda: {'accept': [], 'complete': []})
+    for order in Order.objects.all().iterator(chunk_size=1000):
+        events.append(OrderEvent(order_id=order.id, event_type='created', to_status='pending',
+                                 created_at=order.created_at))
+        if order.accepted_at:
+            events.append(OrderEvent(order_id=order.id, event_type='accepted', from_status='pending',
+                                     to_status='accepted', seller_id=order.seller_id,
+                                     created_at=order.accepted_at))
+            if order.seller_id:
+                day = django.utils.timezone.localtime(order.accepted_at).date()
+                seconds = max((order.accepted_at - order.created_at).total_seconds(), 0)
+                samples[(order.seller_id, day)]['accept'].append(round(seconds, 3))
+        if order.completed_at:
+            events.append(OrderEvent(order_id=order.id, event_type='completed', from_status='accepted',
+                                     to_status='completed', seller_id=order.seller_id,
+                                     created_at=order.completed_at))
+            if order.seller_id and order.accepted_at:
+                day = django.utils.timezone.localtime(order.completed_at).date()
+                seconds = max((order.completed_at - order.accepted_at).total_seconds(), 0)
+                samples[(order.seller_id, day)]['complete'].append(round(seconds, 3))
+        if order.status == 'cancelled':
+            events.append(OrderEvent(order_id=order.id, event_type='cancelled', to_status='cancelled',
+                                     seller_id=order.seller_id, created_at=order.created_at))
+        if len(events) >= 1000:
+            OrderEvent.objects.bulk_create(events)
+            events = []
+    OrderEvent.objects.bulk_create(events)
+
+    rollups = []
+    for (seller_id, day), kinds in samples.items():
+        accept = sorted(kinds['accept'])
+        complete = sorted(kinds['complete'])
+        rollups.append(SellerLatencyRollup(
+            seller_id=seller_id,
+            day=day,
+            accept_samples=accept,
+            complete_samples=complete,
+            accepted_count=len(accept),
+            completed_count=len(complete),
+            median_accept_seconds=_percentile(accept, 50),
+            p95_accept_seconds=_percentile(accept, 95),
+            median_complete_seconds=_percentile(complete, 50),
+            p95_complete_seconds=_percentile(complete, 95),
+        ))
+    SellerLatencyRollup.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_order_dashboard_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('created', 'Created'), ('accepted', 'Accepted'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='products.order')),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['order', 'created_at'], name='orderevent_order_created_idx'), models.Index(fields=['event_type', 'created_at'], name='orderevent_type_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerLatencyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('accept_samples', models.JSONField(default=list, help_text='Sorted accept latencies in seconds')),
+                ('complete_samples', models.JSONField(default=list, help_text='Sorted complete latencies in seconds')),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('median_accept_seconds', models.FloatField(blank=True, null=True)),
+                ('p95_accept_seconds', models.FloatField(blank=True, null=True)),
+                ('median_complete_seconds', models.FloatField(blank=True, null=True)),
+                ('p95_complete_seconds', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latency_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('seller', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_order_events, migrations.RunPython.noop),
+    ]
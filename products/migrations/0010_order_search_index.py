@@ -0,0 +1,83 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# Frozen copies of products.search helpers as of this migration, so later
+# changes to the live module cannot change what this migration does.
+def normalize_text(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+
+
+def phone_variants(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return ''
+    variants = {digits}
+    if digits.startswith('255') and len(digits) > 3:
+        local = digits[3:]
+        variants.update({local, '0' + local})
+    elif digits.startswith('0') and len(digits) > 1:
+        local = digits[1:]
+        variants.update({local, '255' + local})
+    return ' '.join(sorted(variants))
+
+
+def index_row(order):
+    return (
+        order.id,
+        normalize_text(order.customer_name),
+        normalize_text(order.customer_email),
+        phone_variants(order.customer_phone),
+        normalize_text(order.delivery_address),
+    )
+
+
+def create_search_table(apps, schema_editor):
+    """Create and fill the FTS5 order search table (SQLite only)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Order = apps.get_model('products', 'Order')
+    cursor = schema_editor.connection.cursor()
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_order_search USING fts5("
+        "customer_name, customer_email, customer_phone, delivery_address, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    batch = []
+    for order in Order.objects.only(
+        'id', 'customer_name', 'customer_email', 'customer_phone', 'delivery_address'
+    ).iterator(chunk_size=1000):
+        batch.append(index_row(order))
+        if len(batch) >= 1000:
+            cursor.executemany(
+                "INSERT INTO products_order_search (rowid, customer_name, customer_email, customer_phone, delivery_address) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                batch,
+            )
+            batch = []
+    if batch:
+        cursor.executemany(
+            "INSERT INTO products_order_search (rowid, customer_name, customer_email, customer_phone, delivery_address) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            batch,
+        )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.connection.cursor().execute("DROP TABLE IF EXISTS products_order_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_order_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:15
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_order_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesCubeCategoryMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_sold', models.IntegerField(default=0)),
+                ('units_free', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('month', models.DateField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_months', to='products.category')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_categories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['seller', 'month'], name='cubecat_seller_month_idx'), models.Index(fields=['category', 'month'], name='cubecat_category_month_idx')],
+                'unique_together': {('month', 'seller', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesCubeDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_sold', models.IntegerField(default=0)),
+                ('units_free', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('day', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_days', to='products.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['seller', 'day'], name='cubeday_seller_day_idx'), models.Index(fields=['product', 'day'], name='cubeday_product_day_idx')],
+                'unique_together': {('day', 'seller', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesCubeMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_sold', models.IntegerField(default=0)),
+                ('units_free', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('month', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_months', to='products.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_cube_months', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['seller', 'month'], name='cubemonth_seller_month_idx'), models.Index(fields=['product', 'month'], name='cubemonth_product_month_idx')],
+                'unique_together': {('month', 'seller', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_sales_cube'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['is_ordered', 'updated_at'], name='cart_ordered_updated_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+import bisect
+import math
+
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
-from django.db.models import F, Sum, DecimalField
+from django.db.models import F, Q, Sum, Case, When, DecimalField
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
 from django.conf import settings
+from .events import publish_order_event
 
 class Category(models.Model):
     name = models.CharField(max_length=255)
@@ -37,6 +41,17 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (update_fields is not None and 'category' not in update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_category_id = Product.objects.filter(pk=self.pk).values_list('category_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if previous_category_id is not None and previous_category_id != self.category_id:
+                # Keep the category roll-up filed under the product's current category
+                SalesCubeCategoryMonth.move_product(self.pk, previous_category_id, self.category_id)
+
     def update_stock(self, quantity):
         """ Method to update stock after purchase """
         new_stock = self.stock - quantity
@@ -75,6 +90,10 @@ class Cart(models.Model):
     class Meta:
         unique_together = ('user', 'session_key')
         ordering = ['-updated_at']
+        indexes = [
+            # Checked-out cart cleanup (archive_orders) and abandoned cart purge (purge_expired)
+            models.Index(fields=['is_ordered', 'updated_at'], name='cart_ordered_updated_idx'),
+        ]
 
     def total_price(self):
         """
@@ -98,11 +117,45 @@ class Cart(models.Model):
         """
         Deduct each item's quantity from its product stock
         when the cart is converted to an order.
+
+        All products are updated in one ``UPDATE ... SET stock = CASE id WHEN ...``
+        that only matches rows with enough stock. If any product is short the
+        update is rolled back and the short items are returned as a list of
+        dicts; an empty list means stock was deducted for the whole cart.
         """
-        for cart_item in self.items.through.objects.filter(cart=self):
-            product = cart_item.product
-            product.stock = models.F('stock') - cart_item.quantity
-            product.save(update_fields=['stock'])
+        quantities = dict(
+            self.items.through.objects.filter(cart=self).values_list('product_id', 'quantity')
+        )
+        if not quantities:
+            return []
+
+        enough_stock = Q()
+        for product_id, quantity in quantities.items():
+            enough_stock |= Q(id=product_id, stock__gte=quantity)
+
+        with transaction.atomic():
+            updated = Product.objects.filter(enough_stock).update(
+                stock=Case(
+                    *(When(id=product_id, then=F('stock') - quantity)
+                      for product_id, quantity in quantities.items()),
+                    default=F('stock'),
+                    output_field=models.PositiveIntegerField(),
+                )
+            )
+            if updated == len(quantities):
+                return []
+            transaction.set_rollback(True)
+
+        short_items = []
+        for product in Product.objects.filter(id__in=quantities).only('id', 'name', 'stock'):
+            if product.stock < quantities[product.id]:
+                short_items.append({
+                    'product_id': product.id,
+                    'name': product.name,
+                    'requested': quantities[product.id],
+                    'available': product.stock,
+                })
+        return short_items
 
 
 class CartItem(models.Model):
@@ -130,6 +183,21 @@ class CartItem(models.Model):
         return self.product.price * self.quantity
 
 
+class OrderQuerySet(models.QuerySet):
+    """Dashboard order lists, each backed by one of the composite indexes on Order"""
+
+    def pending(self, anonymous=None):
+        if anonymous is None:
+            return self.filter(status='pending')
+        return self.filter(is_anonymous=anonymous, status='pending')
+
+    def for_seller(self, seller):
+        return self.filter(seller=seller)
+
+    def for_customer(self, customer):
+        return self.filter(customer=customer)
+
+
 class Order(models.Model):
     ORDER_STATUS = (
         ('pending', 'Pending'),
@@ -150,26 +218,159 @@ class Order(models.Model):
     accepted_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_anonymous = models.BooleanField(default=False)
+
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['seller', 'created_at'], name='order_seller_created_idx'),
+            models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),
+            models.Index(fields=['is_anonymous', 'status', 'created_at'], name='order_anon_status_created_idx'),
+        ]
     
     def __str__(self):
         customer_type = "Anonymous" if self.is_anonymous else "Registered"
         return f"Order #{self.id} - {self.customer_name} ({customer_type})"
     
+    def record_event(self, event_type, from_status=''):
+        """Append a status transition to the order's event log"""
+        return OrderEvent.objects.create(
+            order=self,
+            event_type=event_type,
+            from_status=from_status,
+            to_status=self.status,
+            seller=self.seller,
+        )
+
+    @transaction.atomic
     def accept_order(self, seller):
         """Accept order by seller"""
+        previous_status = self.status
         self.seller = seller
         self.status = 'accepted'
         self.accepted_at = timezone.now()
-        self.save()
+        self.save(update_fields=['seller', 'status', 'accepted_at'])
+        self.record_event('accepted', previous_status)
+        SellerLatencyRollup.record_accept(self)
+        publish_order_event('order_accepted', self)
     
+    @transaction.atomic
     def complete_order(self):
         """Mark order as completed"""
+        previous_status = self.status
         self.status = 'completed'
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'completed_at'])
+        self.record_event('completed', previous_status)
+        SellerLatencyRollup.record_complete(self)
+        SalesCubeDay.record_order(self)
+        publish_order_event('order_completed', self)
+
+    @transaction.atomic
+    def cancel_order(self):
+        """Cancel an order that has not been completed"""
+        previous_status = self.status
+        self.status = 'cancelled'
+        self.save(update_fields=['status'])
+        self.record_event('cancelled', previous_status)
+        publish_order_event('order_cancelled', self)
+
+
+class OrderEvent(models.Model):
+    """Append-only log of order status transitions"""
+    EVENT_TYPES = (
+        ('created', 'Created'),
+        ('accepted', 'Accepted'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+    )
+
+    order = models.ForeignKey(Order, related_name='events', on_delete=models.CASCADE)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_events')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='orderevent_order_created_idx'),
+            models.Index(fields=['event_type', 'created_at'], name='orderevent_type_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} {self.event_type} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Order events are append-only and cannot be modified.")
+        super().save(*args, **kwargs)
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class SellerLatencyRollup(models.Model):
+    """
+    Per-seller, per-day fulfilment latency, updated as each order transition is
+    logged so dashboards never have to scan raw orders.
+
+    Accept latency is the time an order spent pending (created -> accepted);
+    complete latency is the time it spent accepted (accepted -> completed).
+    Latencies are stored in seconds and attributed to the day of the transition.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='latency_rollups')
+    day = models.DateField()
+    accept_samples = models.JSONField(default=list, help_text="Sorted accept latencies in seconds")
+    complete_samples = models.JSONField(default=list, help_text="Sorted complete latencies in seconds")
+    accepted_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    median_accept_seconds = models.FloatField(null=True, blank=True)
+    p95_accept_seconds = models.FloatField(null=True, blank=True)
+    median_complete_seconds = models.FloatField(null=True, blank=True)
+    p95_complete_seconds = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('seller', 'day')
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"Latency for {self.seller_id} on {self.day}"
+
+    @classmethod
+    def record_accept(cls, order):
+        if order.seller_id and order.accepted_at:
+            seconds = (order.accepted_at - order.created_at).total_seconds()
+            cls._add_sample(order.seller_id, order.accepted_at, 'accept', seconds)
+
+    @classmethod
+    def record_complete(cls, order):
+        if order.seller_id and order.completed_at and order.accepted_at:
+            seconds = (order.completed_at - order.accepted_at).total_seconds()
+            cls._add_sample(order.seller_id, order.completed_at, 'complete', seconds)
+
+    @classmethod
+    def _add_sample(cls, seller_id, when, kind, seconds):
+        """Insert one latency sample and refresh that day's median and p95"""
+        day = timezone.localtime(when).date()
+        rollup, _ = cls.objects.select_for_update().get_or_create(seller_id=seller_id, day=day)
+        samples = getattr(rollup, f'{kind}_samples')
+        bisect.insort(samples, round(max(seconds, 0), 3))
+        count_field = 'accepted_count' if kind == 'accept' else 'completed_count'
+        setattr(rollup, count_field, len(samples))
+        setattr(rollup, f'median_{kind}_seconds', _percentile(samples, 50))
+        setattr(rollup, f'p95_{kind}_seconds', _percentile(samples, 95))
+        rollup.save()
 
 
 class OrderItem(models.Model):
@@ -186,6 +387,73 @@ class OrderItem(models.Model):
         return self.price * self.quantity
 
 
+class ArchivedOrder(models.Model):
+    """
+    Cold copy of a completed or cancelled order moved out of ``Order`` by
+    ``manage.py archive_orders``. Keeps the original order id and the same field
+    names so templates can render live and archived orders alike.
+    """
+    id = models.BigIntegerField(primary_key=True)  # Original Order.id
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_customer_orders', null=True, blank=True)
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_seller_orders')
+    customer_name = models.CharField(max_length=100)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=15)
+    delivery_address = models.TextField()
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    accepted_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    is_anonymous = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='archorder_customer_created_idx'),
+            models.Index(fields=['seller', 'created_at'], name='archorder_seller_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived Order #{self.id} - {self.customer_name}"
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    product_name = models.CharField(max_length=255)  # Kept in case the product is removed later
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+    @property
+    def total_price(self):
+        return self.price * self.quantity
+
+
+class ArchivedOrderEvent(models.Model):
+    """Event log of an archived order, moved out of ``OrderEvent`` with its order"""
+    id = models.BigIntegerField(primary_key=True)  # Original OrderEvent.id
+    order = models.ForeignKey(ArchivedOrder, related_name='events', on_delete=models.CASCADE)
+    event_type = models.CharField(max_length=20, choices=OrderEvent.EVENT_TYPES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_order_events')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='archevent_order_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.order_id} {self.event_type} at {self.created_at:%Y-%m-%d %H:%M}"
+
+
 class BookSaleReport(models.Model):
     """Detailed report of individual book sales by sellers"""
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='book_sales')
@@ -205,7 +473,151 @@ class BookSaleReport(models.Model):
     def save(self, *args, **kwargs):
         # Calculate total revenue automatically
         self.total_revenue = self.sale_price * self.quantity_sold_money
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = BookSaleReport.objects.select_for_update().filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            if previous is not None:
+                SalesCubeDay.record_book_sale(previous, sign=-1)
+            SalesCubeDay.record_book_sale(self)
     
     def __str__(self):
-        return f"{self.seller.username} - {self.product.name} ({self.date_reported})"
\ No newline at end of file
+        return f"{self.seller.username} - {self.product.name} ({self.date_reported})"
+
+
+class SalesCubeMeasures(models.Model):
+    """Additive measures shared by every sales cube table"""
+    units_sold = models.IntegerField(default=0)
+    units_free = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    MEASURES = ('units_sold', 'units_free', 'revenue')
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump(cls, keys, delta):
+        """Add ``delta`` to the row identified by ``keys``, creating it on first use"""
+        changes = {field: F(field) + value for field, value in delta.items()}
+        updated = cls.objects.filter(**keys).update(**changes)
+        if not updated and any(value > 0 for value in delta.values()):
+            # Only additions create rows; a subtraction with no row means the
+            # row is already gone (e.g. cascading delete of the seller)
+            try:
+                with transaction.atomic():
+                    cls.objects.create(**keys, **delta)
+            except IntegrityError:
+                # A concurrent first sale for the same key created the row
+                # between our UPDATE and INSERT; add to it instead
+                cls.objects.filter(**keys).update(**changes)
+        elif updated and any(value < 0 for value in delta.values()):
+            cls.objects.filter(**keys, units_sold=0, units_free=0, revenue=0).delete()
+
+
+class SalesCubeDay(SalesCubeMeasures):
+    """
+    Pre-aggregated sales at day x seller x product grain, fed by BookSaleReport
+    saves and completed orders. SalesCubeMonth and SalesCubeCategoryMonth are
+    kept in step so reports never scan the raw tables (see products/cube.py).
+    """
+    day = models.DateField()
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales_cube_days')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_cube_days')
+
+    class Meta:
+        unique_together = ('day', 'seller', 'product')
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['seller', 'day'], name='cubeday_seller_day_idx'),
+            models.Index(fields=['product', 'day'], name='cubeday_product_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} seller {self.seller_id} product {self.product_id}"
+
+    @classmethod
+    def record(cls, day, seller_id, product_id, category_id=None, units_sold=0, units_free=0, revenue=0):
+        """Apply one sale (or, with negative values, its reversal) to every cube table"""
+        delta = {'units_sold': units_sold, 'units_free': units_free, 'revenue': Decimal(revenue)}
+        if not any(delta.values()):
+            return
+        if category_id is None:
+            category_id = Product.objects.filter(pk=product_id).values_list('category_id', flat=True).first()
+        month = day.replace(day=1)
+        cls.bump({'day': day, 'seller_id': seller_id, 'product_id': product_id}, delta)
+        SalesCubeMonth.bump({'month': month, 'seller_id': seller_id, 'product_id': product_id}, delta)
+        if category_id is not None:
+            SalesCubeCategoryMonth.bump({'month': month, 'seller_id': seller_id, 'category_id': category_id}, delta)
+
+    @classmethod
+    def record_book_sale(cls, sale, sign=1):
+        day = sale._meta.get_field('date_reported').to_python(sale.date_reported)
+        cls.record(
+            day, sale.seller_id, sale.product_id,
+            units_sold=sign * sale.quantity_sold_money,
+            units_free=sign * sale.quantity_given_free,
+            revenue=sign * sale.total_revenue,
+        )
+
+    @classmethod
+    def record_order(cls, order):
+        """Add a completed order's items on the day it was completed"""
+        if not order.seller_id or not order.completed_at:
+            return
+        day = timezone.localtime(order.completed_at).date()
+        for item in order.items.select_related('product'):
+            cls.record(
+                day, order.seller_id, item.product_id, item.product.category_id,
+                units_sold=item.quantity, revenue=item.total_price,
+            )
+
+
+class SalesCubeMonth(SalesCubeMeasures):
+    """Month x seller x product roll-up of SalesCubeDay (``month`` is the 1st)"""
+    month = models.DateField()
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales_cube_months')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_cube_months')
+
+    class Meta:
+        unique_together = ('month', 'seller', 'product')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['seller', 'month'], name='cubemonth_seller_month_idx'),
+            models.Index(fields=['product', 'month'], name='cubemonth_product_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} seller {self.seller_id} product {self.product_id}"
+
+
+class SalesCubeCategoryMonth(SalesCubeMeasures):
+    """
+    Month x seller x category roll-up under each product's current category;
+    ``Product.save`` re-files a product's months when its category changes,
+    matching what ``rebuild_cube`` computes.
+    """
+    month = models.DateField()
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales_cube_categories')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_cube_months')
+
+    class Meta:
+        unique_together = ('month', 'seller', 'category')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['seller', 'month'], name='cubecat_seller_month_idx'),
+            models.Index(fields=['category', 'month'], name='cubecat_category_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} seller {self.seller_id} category {self.category_id}"
+
+    @classmethod
+    def move_product(cls, product_id, old_category_id, new_category_id):
+        """Move a product's monthly totals from one category to another"""
+        for row in SalesCubeMonth.objects.filter(product_id=product_id).values('month', 'seller_id', *cls.MEASURES):
+            delta = {field: row[field] for field in cls.MEASURES}
+            keys = {'month': row['month'], 'seller_id': row['seller_id']}
+            cls.bump({**keys, 'category_id': old_category_id}, {field: -value for field, value in delta.items()})
+            cls.bump({**keys, 'category_id': new_category_id}, delta)
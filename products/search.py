@@ -0,0 +1,175 @@
+"""
+Full-text order search for administrators.
+
+On SQLite, orders are mirrored into the FTS5 table ``products_order_search``
+(rowid = order id) over the customer name, email, phone and delivery address.
+Rows are kept in sync by the Order signals in ``products/signals.py``, and
+archived orders are indexed under their original id by ``products/archive.py``
+so they stay searchable. Phone
+numbers are indexed in their international, local and bare forms so
+"+255712...", "0712..." and "712..." all find the same order.
+
+On other databases the search falls back to ``icontains`` lookups.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import ArchivedOrder, Order
+
+SEARCH_TABLE = 'products_order_search'
+MAX_RESULTS = 200
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+INSERT_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, customer_name, customer_email, customer_phone, delivery_address) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def normalize_text(value):
+    """Lowercase and strip diacritics so 'José' and 'jose' index alike."""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+
+
+def phone_variants(phone):
+    """Digits of a phone number in +255 / 0XXX / bare local form."""
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return ''
+    variants = {digits}
+    if digits.startswith('255') and len(digits) > 3:
+        local = digits[3:]
+        variants.update({local, '0' + local})
+    elif digits.startswith('0') and len(digits) > 1:
+        local = digits[1:]
+        variants.update({local, '255' + local})
+    return ' '.join(sorted(variants))
+
+
+def index_row(order):
+    return (
+        order.id,
+        normalize_text(order.customer_name),
+        normalize_text(order.customer_email),
+        phone_variants(order.customer_phone),
+        normalize_text(order.delivery_address),
+    )
+
+
+def index_order(order):
+    """Insert or refresh one order in the search table."""
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [order.id])
+        cursor.execute(INSERT_SQL, index_row(order))
+
+
+def index_orders(orders):
+    """Add ``orders`` (live or archived, not yet in the table) in one statement."""
+    if not uses_fts() or not orders:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(INSERT_SQL, [index_row(order) for order in orders])
+
+
+def unindex_order(order_id):
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [order_id])
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query where every term must prefix-match."""
+    return ' AND '.join(f'"{token}"*' for token in _TOKEN.findall(normalize_text(query)))
+
+
+def text_filters(query):
+    """``icontains`` fallback for databases without FTS5: every term must match some field."""
+    filters = Q()
+    for term in query.split():
+        filters &= (
+            Q(customer_name__icontains=term) | Q(customer_email__icontains=term)
+            | Q(customer_phone__icontains=term) | Q(delivery_address__icontains=term)
+        )
+    return filters
+
+
+def search_order_ids(query, limit=MAX_RESULTS):
+    """Return ids of orders matching ``query``, best matches first."""
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    if not uses_fts():
+        filters = text_filters(query)
+        ids = list(Order.objects.filter(filters).values_list('id', flat=True)[:limit])
+        ids += ArchivedOrder.objects.filter(filters).values_list('id', flat=True)[:limit - len(ids)]
+        return ids
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_orders(queryset, query):
+    """
+    Narrow an Order or ArchivedOrder ``queryset`` to every match, uncapped.
+
+    The match runs as a subquery so the admin can paginate and count the full
+    result set instead of the first ``MAX_RESULTS`` ids.
+    """
+    match = build_match_query(query)
+    if not match:
+        return queryset.none()
+    if not uses_fts():
+        return queryset.filter(text_filters(query))
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match],
+    ))
+
+
+def search_orders(query, limit=MAX_RESULTS):
+    """Matching live and archived orders in relevance order."""
+    ids = search_order_ids(query, limit)
+    orders = Order.objects.select_related('seller').in_bulk(ids)
+    missing = [order_id for order_id in ids if order_id not in orders]
+    if missing:
+        orders.update(ArchivedOrder.objects.select_related('seller').in_bulk(missing))
+    return [orders[order_id] for order_id in ids if order_id in orders]
+
+
+def rebuild_index(batch_size=1000):
+    """Repopulate the search table from every live and archived order."""
+    if not uses_fts():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        count = 0
+        batch = []
+        fields = ('id', 'customer_name', 'customer_email', 'customer_phone', 'delivery_address')
+        for model in (Order, ArchivedOrder):
+            for order in model.objects.only(*fields).iterator(chunk_size=batch_size):
+                batch.append(index_row(order))
+                if len(batch) >= batch_size:
+                    cursor.executemany(INSERT_SQL, batch)
+                    count += len(batch)
+                    batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+            count += len(batch)
+    return count
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .autocomplete import invalidate_index
+from .models import BookSaleReport, Order, Product, SalesCubeDay
+from .search import index_order, unindex_order
+
+
+@receiver(post_save, sender=Order)
+def index_order_for_search(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the order search table in sync with the searchable order fields.
+    Status-only saves (accept/complete/cancel) leave the index untouched.
+    """
+    searchable = {'customer_name', 'customer_email', 'customer_phone', 'delivery_address'}
+    if update_fields is not None and not searchable.intersection(update_fields):
+        return
+    index_order(instance)
+
+
+@receiver(post_delete, sender=Order)
+def unindex_deleted_order(sender, instance, **kwargs):
+    """Drop deleted (or archived) orders from the search table."""
+    unindex_order(instance.pk)
+
+
+@receiver(post_delete, sender=BookSaleReport)
+def remove_book_sale_from_cube(sender, instance, **kwargs):
+    """Subtract a deleted book sale from the sales cube."""
+    SalesCubeDay.record_book_sale(instance, sign=-1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def rebuild_product_autocomplete(sender, **kwargs):
+    """Product names changed; the autocomplete index is rebuilt on next use."""
+    invalidate_index()
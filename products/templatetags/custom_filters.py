@@ -17,4 +17,20 @@ def format_currency(value):
         return f"Tsh {formatted_value}/="
     except (ValueError, TypeError):
         # Handle cases where the value is not a valid number
-        return "Tsh 0.00/="
\ No newline at end of file
+        return "Tsh 0.00/="
+
+
+@register.simple_tag(takes_context=True)
+def query_transform(context, *pairs, **kwargs):
+    """
+    Return the current query string with the given parameters replaced (None removes them).
+    Parameters may be passed as keywords or, when the name is a variable, as name/value pairs.
+    """
+    query = context['request'].GET.copy()
+    kwargs.update(zip(pairs[::2], pairs[1::2]))
+    for key, value in kwargs.items():
+        if value is None:
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return query.urlencode()
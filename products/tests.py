@@ -1,3 +1,397 @@
+from datetime import date, datetime, timedelta
+from unittest import mock
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
 # Create your tests here.
+from . import autocomplete
+from .archive import archive_orders
+from .cube import rebuild_cube, sales_slice
+from .models import (
+    ArchivedOrder, ArchivedOrderEvent, BookSaleReport, Cart, CartItem, Category, Order, OrderEvent, OrderItem,
+    Product, SalesCubeCategoryMonth, SalesCubeDay, SalesCubeMonth, SellerLatencyRollup,
+)
+from .search import MAX_RESULTS, filter_orders, rebuild_index, search_order_ids, search_orders
+
+
+def make_product(name, stock=10, price='5000.00', category=None):
+    category = category or Category.objects.get_or_create(name='Books')[0]
+    return Product.objects.create(
+        name=name, price=Decimal(price), image='product_images/test.jpg', description=name,
+        category=category, stock=stock, slug=name.lower().replace(' ', '-'),
+    )
+
+
+def make_order(name='Asha Mushi', **fields):
+    fields = {
+        'customer_email': f"{name.split()[0].lower()}@example.com", 'customer_phone': '+255712345678',
+        'delivery_address': 'Arusha', 'total_amount': Decimal('10000.00'), **fields,
+    }
+    order = Order.objects.create(customer_name=name, **fields)
+    order.record_event('created')
+    return order
+
+
+class CheckoutStockTests(TestCase):
+    """Checkout deducts stock for the whole cart in one UPDATE, or not at all"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer1', password='x')
+        self.cart = Cart.objects.create(user=self.user)
+        self.bible = make_product('Bible', stock=5)
+        self.hymnal = make_product('Hymnal', stock=2)
+        CartItem.objects.create(cart=self.cart, product=self.bible, quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.hymnal, quantity=2)
+
+    def stock(self, product):
+        return Product.objects.get(pk=product.pk).stock
+
+    def test_deducts_every_item_in_one_statement(self):
+        with self.assertNumQueries(4):  # Quantities, savepoint, UPDATE, release
+            self.assertEqual(self.cart.update_stock_after_checkout(), [])
+        self.assertEqual((self.stock(self.bible), self.stock(self.hymnal)), (2, 0))
+
+    def test_short_item_rolls_back_the_whole_cart(self):
+        Product.objects.filter(pk=self.hymnal.pk).update(stock=1)
+
+        short = self.cart.update_stock_after_checkout()
+
+        self.assertEqual(short, [{'product_id': self.hymnal.id, 'name': 'Hymnal', 'requested': 2, 'available': 1}])
+        self.assertEqual((self.stock(self.bible), self.stock(self.hymnal)), (5, 1))
+
+    def test_payment_marks_cart_ordered_and_touches_updated_at(self):
+        old = timezone.now() - timedelta(days=30)
+        Cart.objects.filter(pk=self.cart.pk).update(updated_at=old)
+        self.client.force_login(self.user)
+
+        self.client.post(reverse('process_payment'))
+
+        cart = Cart.objects.get(pk=self.cart.pk)
+        self.assertTrue(cart.is_ordered)
+        self.assertGreater(cart.updated_at, old)
+
+
+class ArchiveOrderTests(TestCase):
+    """Archiving moves finished orders with their items and event log, and keeps them findable"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        self.product = make_product('Bible')
+        self.order = make_order()
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal('5000.00'))
+        self.order.accept_order(self.seller)
+        self.order.complete_order()
+        self.recent = make_order(name='Neema Kweka')
+        old = timezone.now() - timedelta(days=400)
+        Order.objects.filter(pk=self.order.pk).update(created_at=old, completed_at=old)
+
+    def test_moves_order_items_and_events(self):
+        event_ids = sorted(OrderEvent.objects.filter(order=self.order).values_list('id', flat=True))
+
+        result = archive_orders(older_than_days=365, batch_size=10)
+
+        self.assertEqual(result['orders'], 1)
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=self.recent.pk).exists())
+        archived = ArchivedOrder.objects.get(pk=self.order.pk)
+        self.assertEqual((archived.seller, archived.status), (self.seller, 'completed'))
+        self.assertEqual([(item.product_name, item.quantity) for item in archived.items.all()], [('Bible', 2)])
+        self.assertEqual(sorted(archived.events.values_list('id', flat=True)), event_ids)
+        self.assertEqual(
+            list(ArchivedOrderEvent.objects.filter(order=archived).values_list('event_type', flat=True)),
+            ['created', 'accepted', 'completed'],
+        )
+
+    def test_archived_orders_stay_searchable(self):
+        archive_orders(older_than_days=365)
+
+        self.assertEqual(search_order_ids('asha'), [self.order.pk])
+        [found] = search_orders('asha')
+        self.assertIsInstance(found, ArchivedOrder)
+
+    def test_seller_history_lists_archived_orders(self):
+        archive_orders(older_than_days=365)
+        self.client.force_login(self.seller)
+        self.seller.userprofile.role = 'seller'
+        self.seller.userprofile.save()
+
+        response = self.client.get(reverse('seller_dashboard'), {'history': 1})
+
+        self.assertEqual([order.pk for order in response.context['archived_orders']], [self.order.pk])
+
+
+class OrderSearchTests(TestCase):
+    """The FTS index follows order saves and deletes and matches names, accents and phone forms"""
+
+    def setUp(self):
+        self.order = make_order(name='José Mushi', customer_phone='+255712345678')
+        self.other = make_order(name='Neema Kweka', customer_phone='0754000111')
+
+    def test_matches_prefixes_accents_and_phone_forms(self):
+        for query in ('jos', 'JOSE mushi', '+255712345678', '0712345678', '712345'):
+            self.assertEqual(search_order_ids(query), [self.order.pk], query)
+        self.assertEqual(search_order_ids('jose kweka'), [])
+        self.assertEqual(search_order_ids('  '), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.customer_name = 'Neema Massawe'
+        self.other.save()
+        self.assertEqual(search_order_ids('massawe'), [self.other.pk])
+        self.assertEqual(search_order_ids('kweka'), [])
+
+        self.order.delete()
+        self.assertEqual(search_order_ids('jose'), [])
+
+    def test_rebuild_restores_the_index(self):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM products_order_search")
+
+        self.assertEqual(rebuild_index(), 2)
+        self.assertEqual(search_order_ids('neema'), [self.other.pk])
+
+    def test_admin_search_is_not_capped(self):
+        Order.objects.bulk_create([
+            Order(customer_name=f'Baraka {n}', customer_email='baraka@example.com', customer_phone='0700000000',
+                  delivery_address='Moshi', total_amount=Decimal('1.00'))
+            for n in range(MAX_RESULTS + 5)
+        ])
+        rebuild_index()
+
+        self.assertEqual(len(search_order_ids('baraka')), MAX_RESULTS)
+        self.assertEqual(filter_orders(Order.objects.all(), 'baraka').count(), MAX_RESULTS + 5)
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:products_order_changelist'), {'q': 'baraka'})
+        self.assertEqual(response.context['cl'].result_count, MAX_RESULTS + 5)
+
+
+class SalesCubeTests(TestCase):
+    """Sales and completed orders keep every cube table equal to a rebuild"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        self.bible = make_product('Bible', price='5000.00')
+        self.hymnal = make_product('Hymnal', price='3000.00', category=Category.objects.create(name='Music'))
+
+    def sell(self, product, day, sold, free=0):
+        return BookSaleReport.objects.create(
+            seller=self.seller, product=product, date_reported=day,
+            quantity_sold_money=sold, quantity_given_free=free, sale_price=product.price,
+        )
+
+    def cube(self):
+        return {
+            model.__name__: sorted(model.objects.values_list(*fields, 'units_sold', 'units_free', 'revenue'))
+            for model, fields in (
+                (SalesCubeDay, ('day', 'seller_id', 'product_id')),
+                (SalesCubeMonth, ('month', 'seller_id', 'product_id')),
+                (SalesCubeCategoryMonth, ('month', 'seller_id', 'category_id')),
+            )
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.cube()
+        rebuild_cube()
+        self.assertEqual(self.cube(), incremental)
+
+    def test_book_sale_saves_and_deletes_apply_deltas(self):
+        sale = self.sell(self.bible, date(2024, 3, 4), sold=2, free=1)
+        self.sell(self.hymnal, date(2024, 3, 20), sold=1)
+
+        sale.quantity_sold_money = 5
+        sale.save()
+        self.assertEqual(SalesCubeDay.objects.get(product=self.bible).revenue, Decimal('25000.00'))
+        self.assertMatchesRebuild()
+
+        sale.date_reported = date(2024, 4, 1)
+        sale.save()
+        self.assertEqual(
+            sales_slice(date(2024, 3, 1), date(2024, 4, 30), group_by=('product',), grain='month', by_period=True,
+                        order_by='month'),
+            [
+                {'month': date(2024, 3, 1), 'product_id': self.hymnal.id, 'units_sold': 1, 'units_free': 0,
+                 'revenue': Decimal('3000.00')},
+                {'month': date(2024, 4, 1), 'product_id': self.bible.id, 'units_sold': 5, 'units_free': 1,
+                 'revenue': Decimal('25000.00')},
+            ],
+        )
+        self.assertMatchesRebuild()
+
+        sale.delete()
+        self.assertFalse(SalesCubeDay.objects.filter(product=self.bible).exists())
+        self.assertFalse(SalesCubeMonth.objects.filter(product=self.bible).exists())
+        self.assertMatchesRebuild()
+
+    def test_completed_order_is_added_on_its_completion_day(self):
+        order = make_order()
+        OrderItem.objects.create(order=order, product=self.bible, quantity=3, price=Decimal('5000.00'))
+        order.accept_order(self.seller)
+        order.complete_order()
+
+        today = timezone.localdate()
+        [row] = sales_slice(today, today, group_by=('seller',))
+        self.assertEqual((row['seller_id'], row['units_sold'], row['revenue']), (self.seller.id, 3, Decimal('15000.00')))
+        self.assertMatchesRebuild()
+
+    def test_category_slices_need_month_grain(self):
+        self.sell(self.bible, date(2024, 3, 4), sold=2)
+        self.sell(self.hymnal, date(2024, 3, 5), sold=1)
+
+        with self.assertRaises(ValueError):
+            sales_slice(date(2024, 3, 4), date(2024, 3, 4), group_by=('category',))
+        with self.assertRaises(ValueError):
+            sales_slice(date(2024, 3, 4), date(2024, 3, 4), category=self.bible.category)
+
+        rows = sales_slice(date(2024, 3, 1), date(2024, 3, 31), group_by=('category',), grain='month')
+        self.assertEqual(
+            [(row['category_id'], row['units_sold']) for row in rows],
+            [(self.bible.category_id, 2), (self.hymnal.category_id, 1)],
+        )
+
+    def test_bump_adds_to_a_row_created_by_a_concurrent_first_sale(self):
+        self.sell(self.bible, date(2024, 3, 4), sold=2)
+        keys = {'month': date(2024, 3, 1), 'seller_id': self.seller.id, 'product_id': self.bible.id}
+        real_update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **changes):
+            # The first UPDATE runs before the other worker's INSERT commits
+            calls.append(changes)
+            return 0 if len(calls) == 1 else real_update(queryset, **changes)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            SalesCubeMonth.bump(keys, {'units_sold': 3, 'units_free': 0, 'revenue': Decimal('15000.00')})
+
+        row = SalesCubeMonth.objects.get(**keys)
+        self.assertEqual((row.units_sold, row.revenue), (5, Decimal('25000.00')))
+        self.assertEqual(len(calls), 2)
+
+    def test_category_change_refiles_the_product_months(self):
+        self.sell(self.bible, date(2024, 3, 4), sold=2)
+        self.sell(self.bible, date(2024, 4, 9), sold=1, free=1)
+        self.sell(self.hymnal, date(2024, 3, 5), sold=1)
+        books = self.bible.category
+
+        self.bible.category = self.hymnal.category
+        self.bible.save()
+
+        self.assertFalse(SalesCubeCategoryMonth.objects.filter(category=books).exists())
+        self.assertEqual(
+            sorted(SalesCubeCategoryMonth.objects.values_list('month', 'category_id', 'units_sold', 'units_free')),
+            [(date(2024, 3, 1), self.hymnal.category_id, 3, 0), (date(2024, 4, 1), self.hymnal.category_id, 1, 1)],
+        )
+        self.assertMatchesRebuild()
+
+        # Saves that leave the category alone do not touch the roll-up
+        with self.assertNumQueries(1):
+            self.bible.save(update_fields=['stock'])
+
+
+class AutocompleteIndexTests(TestCase):
+    """Each process keeps its own index and rebuilds it when the shared version stamp moves"""
+
+    def setUp(self):
+        make_product('Great Controversy')
+        make_product('Steps to Christ')
+
+    def test_product_changes_are_seen_through_the_shared_stamp(self):
+        self.assertEqual(autocomplete.suggest('contro'), ['Great Controversy'])
+        index = autocomplete.get_index()
+        self.assertIs(autocomplete.get_index(), index)
+
+        # Another worker saved a product: only the shared stamp reaches this process
+        Product.objects.bulk_create([Product(
+            name='Controlled Diet', price=Decimal('1.00'), image='product_images/test.jpg', description='x',
+            category=Category.objects.get(name='Books'), stock=1, slug='controlled-diet',
+        )])
+        self.assertEqual(autocomplete.suggest('contro'), ['Great Controversy'])
+        autocomplete.version_cache().set(autocomplete.VERSION_KEY, 'from-another-process', None)
+
+        # The stamp is read again only once the check interval has passed
+        checked_at = autocomplete._checked_at
+        with mock.patch('products.autocomplete.time.monotonic', return_value=checked_at + 1):
+            self.assertEqual(autocomplete.suggest('contro'), ['Great Controversy'])
+        later = checked_at + settings.AUTOCOMPLETE_STAMP_CHECK_SECONDS
+        with mock.patch('products.autocomplete.time.monotonic', return_value=later):
+            self.assertEqual(autocomplete.suggest('contro'), ['Controlled Diet', 'Great Controversy'])
+
+    def test_stamp_is_read_at_most_once_per_interval(self):
+        autocomplete.get_index()
+        self.assertEqual(settings.AUTOCOMPLETE_CACHE_ALIAS, 'shared')
+        with mock.patch.object(autocomplete, 'version_cache') as version_cache:
+            for query in ('g', 'gr', 'gre', 'grea'):
+                autocomplete.suggest(query)
+        version_cache.assert_not_called()
+
+
+class OrderLatencyTests(TestCase):
+    """Transitions are logged and rolled up into per-seller, per-day median and p95 latencies"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        self.created = timezone.make_aware(datetime(2024, 3, 4, 8, 0))
+
+    def order_created_at(self, when):
+        order = make_order()
+        Order.objects.filter(pk=order.pk).update(created_at=when)
+        order.refresh_from_db()
+        return order
+
+    def at(self, when):
+        return mock.patch('django.utils.timezone.now', return_value=when)
+
+    def rollup(self, day):
+        return SellerLatencyRollup.objects.get(seller=self.seller, day=day)
+
+    def test_median_and_p95_of_accept_and_complete_latencies(self):
+        for accept_after, complete_after in ((600, 50), (60, 10), (240, 40), (120, 20), (180, 30)):
+            order = self.order_created_at(self.created)
+            accepted = self.created + timedelta(seconds=accept_after)
+            with self.at(accepted):
+                order.accept_order(self.seller)
+            with self.at(accepted + timedelta(seconds=complete_after)):
+                order.complete_order()
+
+        rollup = self.rollup(date(2024, 3, 4))
+        self.assertEqual(rollup.accept_samples, [60, 120, 180, 240, 600])
+        self.assertEqual((rollup.accepted_count, rollup.completed_count), (5, 5))
+        # Nearest rank: the 3rd and 5th of five samples
+        self.assertEqual((rollup.median_accept_seconds, rollup.p95_accept_seconds), (180, 600))
+        self.assertEqual((rollup.median_complete_seconds, rollup.p95_complete_seconds), (30, 50))
+
+    def test_samples_count_on_the_local_day_of_the_transition(self):
+        late = timezone.make_aware(datetime(2024, 3, 4, 23, 50))
+        order = self.order_created_at(late)
+        with self.at(late + timedelta(minutes=5)):
+            order.accept_order(self.seller)
+        with self.at(late + timedelta(minutes=20)):  # 00:10 the next local day
+            order.complete_order()
+
+        self.assertEqual(self.rollup(date(2024, 3, 4)).accept_samples, [300])
+        self.assertEqual(self.rollup(date(2024, 3, 4)).complete_samples, [])
+        self.assertEqual(self.rollup(date(2024, 3, 5)).complete_samples, [900])
+
+    def test_cancel_records_an_event_and_the_log_is_append_only(self):
+        order = make_order()
+        order.accept_order(self.seller)
+        order.cancel_order()
+
+        event = order.events.order_by('id').last()
+        self.assertEqual(
+            (event.event_type, event.from_status, event.to_status, event.seller),
+            ('cancelled', 'accepted', 'cancelled', self.seller),
+        )
+        self.assertEqual(list(order.events.values_list('event_type', flat=True)), ['created', 'accepted', 'cancelled'])
+        event.to_status = 'completed'
+        with self.assertRaises(ValidationError):
+            event.save()
+        self.assertEqual(OrderEvent.objects.get(pk=event.pk).to_status, 'cancelled')
@@ -12,4 +12,5 @@ urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
     path('place_order/', views.place_order, name='place_order'),
     path('process-payment/', views.process_payment, name='process_payment'),
+    path('autocomplete/', views.product_autocomplete, name='product_autocomplete'),
 ]
\ No newline at end of file
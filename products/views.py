@@ -12,6 +12,7 @@ from django.db.models import Sum
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from .autocomplete import suggest
 
 
 def get_cart_item_count(request):
@@ -397,6 +398,7 @@ from django.core.mail import EmailMultiAlternatives, EmailMessage
 from django.template.loader import render_to_string
 from .models import Cart, CartItem, Category, Product, Order, OrderItem
 from .models import Cart, CartItem, Product, Category, Order, OrderItem
+from .events import publish_order_event
 
 @require_http_methods(["GET", "POST"])
 @transaction.atomic
@@ -495,9 +497,13 @@ def place_order(request):
                 price=Decimal(str(data['unit_price']))
             )
 
+    # Log the transition and notify open seller dashboards once committed
+    order.record_event('created')
+    publish_order_event('order_created', order)
+
     # Mark cart ordered and clear session
     cart.is_ordered = True
-    cart.save(update_fields=['is_ordered'])
+    cart.save(update_fields=['is_ordered', 'updated_at'])
     request.session.pop('cart_id', None)
 
     # Prepare email context
@@ -568,13 +574,20 @@ def process_payment(request):
             messages.error(request, "Your cart is empty.")
             return redirect('shop')
 
-        # Update stock after checkout and set the order as placed
-        cart.update_stock_after_checkout()
-        cart.is_ordered = True
-        cart.save()
+        with transaction.atomic():
+            # Deduct stock for the whole cart in one statement
+            short_items = cart.update_stock_after_checkout()
+            if short_items:
+                details = ", ".join(
+                    f"{item['name']} (only {item['available']} available)" for item in short_items
+                )
+                messages.error(request, f"Not enough stock for: {details}")
+                return redirect('view_cart')
 
-        # Clear the cart items after successful payment
-        cart_items.delete()
+            # Set the order as placed and clear the cart items after successful payment
+            cart.is_ordered = True
+            cart.save(update_fields=['is_ordered', 'updated_at'])
+            cart_items.delete()
 
         # Notify the user that the payment was successful
         messages.success(request, 'Payment processed successfully! Your order is confirmed.')
@@ -667,4 +680,10 @@ def update_cart(request, product_id):
         )
 
     # 5) Redirect back
-    return HttpResponseRedirect(request.META.get("HTTP_REFERER", "view_cart"))
\ No newline at end of file
+    return HttpResponseRedirect(request.META.get("HTTP_REFERER", "view_cart"))
+
+
+@login_required
+def product_autocomplete(request):
+    """Product names matching the typed prefix, for the daily report book pickers"""
+    return JsonResponse({'results': suggest(request.GET.get('q', ''))})
@@ -3,6 +3,11 @@ ASGI config for shopping_center project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The seller dashboard's live order feed (``users/seller-dashboard/events/``) is a
+long-lived Server-Sent Events stream and must be served through this callable,
+e.g. ``uvicorn shopping_center.asgi:application``. Under WSGI the stream
+endpoint answers 204 and the dashboard polls the order event log instead.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -53,6 +53,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Loads the UserProfile together with the user on every request. Sessions store the
+# backend path they logged in with, so sessions created under the default ModelBackend
+# were signed out when this replaced it.
+AUTHENTICATION_BACKENDS = ['users.backends.ProfileModelBackend']
+
 ROOT_URLCONF = 'shopping_center.urls'
 
 TEMPLATES = [
@@ -82,6 +87,44 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each worker's connection open between requests (pragmas and page
+        # cache survive), checking it is still usable before reuse. This serves
+        # the sync views; the async SSE stream (seller_order_events) gains nothing
+        # from it: the stream itself never queries the database, and under ASGI
+        # each request's sync work (the session/user lookups before the stream)
+        # runs in a thread of its own, so its connection is never reused by a
+        # later request.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Run on every new connection:
+            # NORMAL sync is durable in WAL mode except on power loss; 128 MB of
+            # memory-mapped I/O, a 64 MB page cache and in-memory temp tables
+            # keep reads and sorts off the disk. None of these change the
+            # database file. WAL itself (readers continue while a write is in
+            # progress) is stored in the file, so it is switched on once by
+            # migration users 0015 rather than here.
+            'init_command': (
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            # busy_timeout: wait up to 20 seconds for the writer lock instead of
+            # failing with "database is locked"
+            'timeout': 20,
+            # Take the writer lock when a transaction begins, so a transaction
+            # that reads then writes waits for its turn (honouring the timeout)
+            # rather than failing on the lock upgrade; SQLite ignores
+            # select_for_update(), so this is what serializes the read-modify-
+            # write saves. The cost: EVERY atomic() block takes the single
+            # writer lock, read-only ones included, and queues behind other
+            # writers. The project's own atomic() blocks all write; Django's
+            # admin also wraps add/change/delete page GETs in atomic(), so an
+            # admin form view holds the lock for the length of its request.
+            # Reads outside atomic() are unaffected.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -203,9 +246,31 @@ EMAIL_HOST_PASSWORD = 'ntdq dsqp jwti niks'  # Replace with actual password or a
 SITE_URL = "http://localhost:8000"  # Update this to your site URL
 
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Use database-backed sessions
+# The default cache stays per-process; sessions need one cache shared by every
+# worker process, so they get a file cache (point it at Redis/Memcached when
+# the site runs on more than one host)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Small cross-process cache for snapshots and version stamps every worker must agree on
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'shared',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+SESSION_ENGINE = 'users.sessions'  # Cache-first sessions that only write django_session on change or expiry refresh
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 3600  # Session expiry time in seconds
 SESSION_SAVE_EVERY_REQUEST = True  # Optional: Refresh expiry on each request
+SESSION_REFRESH_FRACTION = 0.5  # users.sessions re-saves an unchanged session once less than this share of its age is left
 
 
 # Ensure security by enforcing SSL (in production)
@@ -288,3 +353,31 @@ CONTENT_SECURITY_POLICY = {
         ),
     }
 }
+
+# Order archiving (manage.py archive_orders)
+ORDER_ARCHIVE_AFTER_DAYS = 365  # Finished orders older than this move to the archive tables
+ORDER_ARCHIVE_BATCH_SIZE = 500  # Orders moved per transaction
+
+# Filtered report counts on the View Reports page are cached this long (seconds)
+REPORT_COUNT_CACHE_SECONDS = 300
+
+# Superuser dashboard counters are cached this long (seconds) unless a signal drops them sooner
+DASHBOARD_STATS_CACHE_SECONDS = 60
+# Cache alias holding that snapshot; shared by every process so a signal in one worker drops it for all
+DASHBOARD_CACHE_ALIAS = 'shared'
+
+# Cache alias holding the product autocomplete version stamp; must be shared by every
+# process (the default LocMemCache is not) so a product change rebuilds all their indexes
+AUTOCOMPLETE_CACHE_ALIAS = 'shared'
+AUTOCOMPLETE_STAMP_CHECK_SECONDS = 2  # Each process reads the stamp at most this often, not on every keystroke
+
+# Background jobs (manage.py run_jobs)
+JOB_CHUNK_SIZE = 200  # Sellers / reports / export rows handled per chunk
+JOB_STALE_SECONDS = 300  # A running job without a heartbeat this long is picked up by another worker
+JOB_EXPORT_DIR = BASE_DIR / 'exports'  # Background CSV exports; outside MEDIA_ROOT so they are only served to admins
+
+# Maintenance purge (manage.py purge_expired)
+PURGE_BATCH_SIZE = 500  # Rows deleted per transaction
+PURGE_BATCH_PAUSE = 0.05  # Seconds slept between batches so request writers get the SQLite lock
+PURGE_CART_AFTER_DAYS = 7  # Anonymous carts untouched this long are abandoned (their session is long gone)
+PURGE_JOBS_AFTER_DAYS = 30  # Finished background jobs and their export files are kept this long
@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import UserProfile, PasswordResetCode, DailyReport, MonthlyReport
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import UserImportForm
+from .importing import ADMIN_MAX_ROWS, COLUMNS, ROLES, import_users, read_csv
+from .models import UserProfile, PasswordResetCode, DailyReport, DailyReportLine, MonthlyReport, Job
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -31,6 +37,56 @@ class UserProfileAdmin(admin.ModelAdmin):
 
     user_username.short_description = 'Username'  # Label for the 'user_username' field in the admin
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_users_view), name='users_userprofile_import'),
+        ] + super().get_urls()
+
+    def import_users_view(self, request):
+        """Create users and profiles from an uploaded CSV file"""
+        if not request.user.has_perm('auth.add_user'):
+            raise PermissionDenied
+
+        errors = {}
+        form = UserImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                rows = read_csv(form.cleaned_data['csv_file'].read().decode('utf-8-sig').splitlines())
+            except UnicodeDecodeError:
+                form.add_error('csv_file', 'The file must be UTF-8 encoded CSV.')
+            except ValidationError as exc:
+                form.add_error('csv_file', exc)
+            else:
+                if len(rows) > ADMIN_MAX_ROWS:
+                    form.add_error('csv_file', f'At most {ADMIN_MAX_ROWS} rows can be imported here; '
+                                               'use manage.py import_users for larger files.')
+                else:
+                    result = self.run_import(request, rows, form.cleaned_data['dry_run'])
+                    errors = result['errors']
+                    if not errors:
+                        if form.cleaned_data['dry_run']:
+                            self.message_user(request, f'All {len(rows)} row(s) are valid.')
+                        else:
+                            self.message_user(request, f"Created {result['created']} user(s).", messages.SUCCESS)
+                            return redirect('admin:users_userprofile_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import users from CSV',
+            'form': form,
+            'columns': COLUMNS,
+            'max_rows': ADMIN_MAX_ROWS,
+            'errors': sorted(errors.items()),
+        }
+        return TemplateResponse(request, 'admin/users/userprofile/import_users.html', context)
+
+    def run_import(self, request, rows, dry_run):
+        # Only superusers may create superusers. Passwords are hashed in this
+        # process: a process pool per admin request would fork a worker per core.
+        allowed_roles = ROLES if request.user.is_superuser else ROLES - {'superuser'}
+        return import_users(rows, created_by=request.user, workers=1, dry_run=dry_run, allowed_roles=allowed_roles)
+
 
 @admin.register(PasswordResetCode)
 class PasswordResetCodeAdmin(admin.ModelAdmin):
@@ -62,6 +118,17 @@ class PasswordResetCodeAdmin(admin.ModelAdmin):
     user_email.short_description = 'Email'  # Label for the 'user_email' field in the admin
 
 
+class DailyReportLineInline(admin.TabularInline):
+    model = DailyReportLine
+    extra = 0
+    can_delete = False
+    fields = ('kind', 'book_name', 'product', 'quantity')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(DailyReport)
 class DailyReportAdmin(admin.ModelAdmin):
     list_display = ('seller_name', 'date', 'total_books_sold', 'total_books_given_free', 'houses_visited', 'teachings_given', 'working_hours')
@@ -69,11 +136,25 @@ class DailyReportAdmin(admin.ModelAdmin):
     search_fields = ('seller__username', 'seller__email')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'date'
+    list_select_related = ('seller',)
+    inlines = [DailyReportLineInline]
+
+    def get_queryset(self, request):
+        # Book totals are summed in SQL instead of per row in Python
+        return super().get_queryset(request).with_book_totals()
     
     def seller_name(self, obj):
         return obj.seller.username
     seller_name.short_description = 'Seller'
 
+    @admin.display(description='Books sold', ordering='books_sold_total')
+    def total_books_sold(self, obj):
+        return obj.books_sold_total
+
+    @admin.display(description='Books given free', ordering='books_free_total')
+    def total_books_given_free(self, obj):
+        return obj.books_free_total
+
 
 @admin.register(MonthlyReport)
 class MonthlyReportAdmin(admin.ModelAdmin):
@@ -84,4 +165,17 @@ class MonthlyReportAdmin(admin.ModelAdmin):
     
     def seller_name(self, obj):
         return obj.seller.username
-    seller_name.short_description = 'Seller'
\ No newline at end of file
+    seller_name.short_description = 'Seller'
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'processed', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('created_by',)
+    readonly_fields = ('processed', 'total', 'state', 'result', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected failed jobs from their last chunk')
+    def requeue(self, request, queryset):
+        count = queryset.filter(status=Job.FAILED).update(status=Job.QUEUED, error='', finished_at=None)
+        self.message_user(request, f'{count} job(s) requeued.')
@@ -0,0 +1,51 @@
+"""
+Cached statistics snapshot for the superuser dashboard.
+
+The counters are computed with one conditional-aggregate query per table and
+cached together with the recent-users list in the DASHBOARD_CACHE_ALIAS
+cache, which every process shares. The snapshot expires after
+DASHBOARD_STATS_CACHE_SECONDS and is dropped early, for all workers, by the
+signals in ``users/signals.py`` whenever a user, profile or order changes.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+
+from products.models import Order
+from .models import AnonymousOrder, UserProfile
+
+STATS_CACHE_KEY = 'superuser_dashboard_stats'
+RECENT_USERS = 10
+
+
+def compute_dashboard_stats():
+    users = User.objects.aggregate(total_users=Count('id'))
+    profiles = UserProfile.objects.aggregate(
+        total_sellers=Count('id', filter=Q(role='seller')),
+        total_buyers=Count('id', filter=Q(role='buyer')),
+    )
+    orders = Order.objects.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='pending')),
+    )
+    anonymous_orders = AnonymousOrder.objects.aggregate(
+        total_anonymous_orders=Count('id'),
+        pending_anonymous_orders=Count('id', filter=Q(is_processed=False)),
+    )
+    recent_users = list(User.objects.select_related('userprofile').order_by('-date_joined')[:RECENT_USERS])
+    return {**users, **profiles, **orders, **anonymous_orders, 'recent_users': recent_users}
+
+
+def stats_cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def dashboard_stats():
+    return stats_cache().get_or_set(STATS_CACHE_KEY, compute_dashboard_stats, settings.DASHBOARD_STATS_CACHE_SECONDS)
+
+
+def invalidate_dashboard_stats():
+    # Wait for the commit so a concurrent request cannot re-cache the old values
+    transaction.on_commit(lambda: stats_cache().delete(STATS_CACHE_KEY))
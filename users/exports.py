@@ -0,0 +1,112 @@
+"""
+Streaming CSV exports for the report pages.
+
+Rows are read with ``queryset.iterator(chunk_size=...)`` and written one at a
+time into a ``StreamingHttpResponse``, so memory stays flat regardless of the
+export size and the header row reaches the browser immediately.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the formatted line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(filename, header, rows):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.csv"'
+    return response
+
+
+def parse_filter_date(value):
+    """A YYYY-MM-DD filter value as a date (raises ValueError)"""
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value!r}")
+    return parsed
+
+
+def filter_reports(queryset, params, date_field='date'):
+    """Apply the seller / date range filters shared by the report pages and exports (raises ValueError)"""
+    if params.get('seller'):
+        queryset = queryset.filter(seller_id=int(params['seller']))
+    if params.get('date_from'):
+        queryset = queryset.filter(**{f'{date_field}__gte': parse_filter_date(params['date_from'])})
+    if params.get('date_to'):
+        queryset = queryset.filter(**{f'{date_field}__lte': parse_filter_date(params['date_to'])})
+    return queryset
+
+
+def filter_monthly_reports(queryset, params):
+    """Apply the month / year filters of the Monthly Reports page (raises ValueError)"""
+    if params.get('year'):
+        queryset = queryset.filter(year=int(params['year']))
+    if params.get('month'):
+        queryset = queryset.filter(month=int(params['month']))
+    return queryset
+
+
+def format_books(details):
+    return '; '.join(f"{item.get('book_name', '')} x{item.get('quantity', 0)}" for item in details or [])
+
+
+DAILY_REPORT_HEADER = [
+    'Seller', 'Date', 'Books Sold', 'Books Free', 'Houses Visited', 'Teachings Given',
+    'Working Hours', 'Books Sold Details', 'Books Free Details', 'Notes',
+]
+
+
+def daily_report_rows(queryset):
+    for report in queryset.with_book_totals().select_related('seller').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            report.seller.username, report.date.isoformat(), report.total_books_sold,
+            report.total_books_given_free, report.houses_visited, report.teachings_given,
+            report.working_hours, format_books(report.books_sold_details),
+            format_books(report.books_given_free_details), report.additional_notes,
+        ]
+
+
+MONTHLY_REPORT_HEADER = [
+    'Seller', 'Month', 'Year', 'Books Sold', 'Books Free', 'Houses Visited',
+    'Teachings Given', 'Working Hours', 'Days Worked',
+]
+
+
+def monthly_report_rows(queryset):
+    for report in queryset.select_related('seller').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            report.seller.username, report.month, report.year, report.total_books_sold_money,
+            report.total_books_given_free, report.total_houses_visited, report.total_teachings_given,
+            report.total_working_hours, report.days_worked,
+        ]
+
+
+BOOK_SALE_HEADER = [
+    'Seller', 'Book', 'Date', 'Sold For Money', 'Given Free', 'Sale Price', 'Total Revenue', 'Notes',
+]
+
+
+def book_sale_rows(queryset):
+    for sale in queryset.select_related('seller', 'product').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            sale.seller.username, sale.product.name, sale.date_reported.isoformat(),
+            sale.quantity_sold_money, sale.quantity_given_free, sale.sale_price,
+            sale.total_revenue, sale.notes,
+        ]
@@ -3,6 +3,7 @@ from .models import UserProfile
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import re
 
@@ -20,13 +21,10 @@ class CustomAuthenticationForm(forms.Form):
         password = self.cleaned_data.get('password')
 
         # Avoid user enumeration: don't reveal whether the email is correct
-        users = User.objects.filter(email=email)
+        users = list(User.objects.filter(email=email)[:2])
 
-        # If multiple users are found, choose the first one (or handle as needed)
-        if users.count() == 1:
-            user = users.first()
-        else:
-            user = None
+        # Ambiguous emails (shared by several accounts) cannot be used to log in
+        user = users[0] if len(users) == 1 else None
 
         if user:
             # Authenticate using the email and password
@@ -37,9 +35,14 @@ class CustomAuthenticationForm(forms.Form):
             raise forms.ValidationError("Invalid email or password.")
 
         self.cleaned_data['username'] = user.username
+        self.user_cache = user
 
         return self.cleaned_data
 
+    def get_user(self):
+        """The authenticated user; log this one in rather than calling authenticate() again"""
+        return getattr(self, 'user_cache', None)
+
 
 #End
 
@@ -147,6 +150,19 @@ class RegistrationForm(UserCreationForm):
                 raise ValidationError(_("A user with this email already exists."))
         return email
 
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        # The post_save signal creates the profile from these values
+        user._profile_defaults = {
+            'phone_number': self.cleaned_data.get('phone_number', ''),
+            'role': 'buyer',  # Default role for self-registered users
+        }
+        if commit:
+            user.save()
+            if hasattr(self, 'save_m2m'):
+                self.save_m2m()
+        return user
+
 
 from django import forms
 from django.core.exceptions import ValidationError
@@ -204,3 +220,67 @@ class UserProfileForm(forms.ModelForm):
             if user_profile:
                 raise ValidationError("This phone number is already in use. Please provide a unique number.")
         return phone_number
+
+
+class BookListField(forms.Field):
+    """A JSON list of {"book_name": ..., "quantity": ...} entries"""
+
+    def to_python(self, value):
+        if value in (None, ''):
+            return []
+        if not isinstance(value, list):
+            raise ValidationError(_('Expected a list of books.'))
+        books = []
+        for item in value:
+            if not isinstance(item, dict):
+                raise ValidationError(_('Each book must be an object with book_name and quantity.'))
+            name = str(item.get('book_name') or '').strip()
+            try:
+                quantity = int(item.get('quantity') or 0)
+            except (TypeError, ValueError):
+                raise ValidationError(_('Quantity for "%(name)s" must be a whole number.') % {'name': name})
+            if quantity < 0:
+                raise ValidationError(_('Quantity for "%(name)s" cannot be negative.') % {'name': name})
+            if quantity and not name:
+                raise ValidationError(_('Every book with a quantity needs a name.'))
+            if len(name) > 255:
+                raise ValidationError(_('Book names are limited to 255 characters.'))
+            if quantity:
+                books.append({'book_name': name, 'quantity': quantity})
+        return books
+
+
+class DailyReportEntryForm(forms.Form):
+    """One day of a batch daily report submission"""
+    date = forms.DateField()
+    books_sold = BookListField(required=False)
+    books_given_free = BookListField(required=False)
+    houses_visited = forms.IntegerField(min_value=0, required=False)
+    teachings_given = forms.IntegerField(min_value=0, required=False)
+    working_hours = forms.DecimalField(min_value=0, max_value=24, max_digits=4, decimal_places=2, required=False)
+    additional_notes = forms.CharField(required=False)
+
+    def clean_date(self):
+        report_date = self.cleaned_data['date']
+        if report_date > timezone.localdate():
+            raise ValidationError(_('Reports cannot be filed for future dates.'))
+        return report_date
+
+    def report_fields(self):
+        """Cleaned data as DailyReport field values"""
+        data = self.cleaned_data
+        return {
+            'date': data['date'],
+            'books_sold_details': data['books_sold'],
+            'books_given_free_details': data['books_given_free'],
+            'houses_visited': data['houses_visited'] or 0,
+            'teachings_given': data['teachings_given'] or 0,
+            'working_hours': data['working_hours'] or 0,
+            'additional_notes': data['additional_notes'],
+        }
+
+
+class UserImportForm(forms.Form):
+    """CSV upload for bulk user onboarding (see users/importing.py)"""
+    csv_file = forms.FileField(label=_('CSV file'))
+    dry_run = forms.BooleanField(required=False, label=_('Only validate the file'))
@@ -0,0 +1,179 @@
+"""
+Bulk user onboarding from CSV (``manage.py import_users`` and the UserProfile
+admin upload).
+
+A file is validated as a whole before anything is written: per-row checks
+mirror RegistrationForm, duplicates inside the file are caught in memory, and
+clashes with existing accounts are found with a handful of set-based ``IN``
+queries instead of per-row ``exists()`` calls. Passwords are then hashed (in a
+process pool for the management command, since PBKDF2 is CPU bound and threads
+would not help; in-process for the admin upload, which must not fork workers
+from a web request) and the users and their profiles are written with two
+``bulk_create`` calls in one transaction.
+"""
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+
+from .dashboard import invalidate_dashboard_stats
+from .models import UserProfile
+
+COLUMNS = ('username', 'email', 'password', 'first_name', 'last_name', 'phone_number', 'role')
+REQUIRED_COLUMNS = ('username', 'password', 'phone_number')
+ROLES = {role for role, _ in UserProfile.USER_ROLES}
+LOOKUP_CHUNK_SIZE = 500  # Values per IN (...) query, well under SQLite's variable limit
+POOL_THRESHOLD = 8  # Smaller imports are hashed in-process
+ADMIN_MAX_ROWS = 200  # The admin upload hashes in the request; larger files go through manage.py import_users
+
+_USERNAME = re.compile(r'^[a-zA-Z0-9_]+$')
+
+
+def read_csv(file):
+    """Rows of a CSV text stream as dicts keyed by the lowercased header"""
+    reader = csv.DictReader(file)
+    missing = set(REQUIRED_COLUMNS) - {name.strip().lower() for name in reader.fieldnames or []}
+    if missing:
+        raise ValidationError(f"Missing column(s): {', '.join(sorted(missing))}")
+    return [
+        {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        for row in reader
+    ]
+
+
+def row_errors(row, allowed_roles=ROLES):
+    errors = []
+    username, email, phone = row.get('username', ''), row.get('email', ''), row.get('phone_number', '')
+    if len(username) < 3 or not _USERNAME.match(username):
+        errors.append("username must be at least 3 letters, digits or underscores")
+    if not row.get('password'):
+        errors.append("password is required")
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append(f"invalid email '{email}'")
+    if not (phone.startswith('+255') and len(phone) == 13 and phone[1:].isdigit()):
+        errors.append(f"phone number '{phone}' must be +255 followed by 9 digits")
+    role = row.get('role') or 'seller'
+    if role not in ROLES:
+        errors.append(f"unknown role '{role}'")
+    elif role not in allowed_roles:
+        errors.append(f"you may not create '{role}' accounts")
+    return errors
+
+
+def existing_values(queryset, field, values):
+    """Which of ``values`` already exist in ``field``, a few IN queries at a time"""
+    values = sorted(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(queryset.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+    return found
+
+
+def validate_rows(rows, allowed_roles=ROLES):
+    """
+    Return ``{line_number: [messages]}`` for every invalid row (line 1 is the
+    header), checking each row and then uniqueness within the file and against
+    the database.
+    """
+    errors = {}
+    seen = {'username': {}, 'email': {}, 'phone_number': {}}
+    for line, row in enumerate(rows, start=2):
+        problems = row_errors(row, allowed_roles)
+        for field, lines in seen.items():
+            value = row.get(field, '')
+            if not value:
+                continue
+            if value in lines:
+                problems.append(f"{field} '{value}' repeats line {lines[value]}")
+            else:
+                lines[value] = line
+        if problems:
+            errors[line] = problems
+
+    taken = {
+        'username': existing_values(User.objects.all(), 'username', seen['username']),
+        'email': existing_values(User.objects.all(), 'email', seen['email']),
+        'phone_number': existing_values(UserProfile.objects.all(), 'phone_number', seen['phone_number']),
+    }
+    for field, values in taken.items():
+        for value in values:
+            line = seen[field].get(value)
+            if line:
+                errors.setdefault(line, []).append(f"{field} '{value}' is already registered")
+    return errors
+
+
+def _setup_worker():
+    # Processes started with "spawn" (macOS, Windows) must load Django themselves
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash ``passwords`` with the default hasher, spread over ``workers`` processes"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(rows, created_by=None, workers=None, batch_size=500, dry_run=False, allowed_roles=ROLES):
+    """
+    Create a user and profile for every row (dicts keyed by ``COLUMNS``; the
+    role defaults to seller). Rows asking for a role outside ``allowed_roles``
+    are invalid. Nothing is written unless every row is valid.
+
+    Returns ``{'created': count, 'errors': {line_number: [messages]}}``.
+    """
+    rows = [{**row, 'email': User.objects.normalize_email(row.get('email', ''))} for row in rows]
+    errors = validate_rows(rows, allowed_roles)
+    if errors or dry_run or not rows:
+        return {'created': 0, 'errors': errors}
+
+    hashes = hash_passwords([row['password'] for row in rows], workers)
+    users = []
+    for row, password in zip(rows, hashes):
+        role = row.get('role') or 'seller'
+        users.append(User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row.get('first_name', ''),
+            last_name=row.get('last_name', ''),
+            password=password,
+            is_superuser=role == 'superuser',
+            is_staff=role == 'superuser',
+        ))
+
+    with transaction.atomic():
+        # bulk_create sends no post_save, so the profiles are inserted here
+        User.objects.bulk_create(users, batch_size=batch_size)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=user, phone_number=row['phone_number'],
+                    role=row.get('role') or 'seller', created_by=created_by,
+                )
+                for user, row in zip(users, rows)
+            ],
+            batch_size=batch_size,
+        )
+        invalidate_dashboard_stats()
+    return {'created': len(users), 'errors': {}}
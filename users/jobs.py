@@ -0,0 +1,170 @@
+"""
+Background job handlers run by ``manage.py run_jobs``.
+
+Each handler takes a claimed ``Job`` and processes ONE bounded chunk of work,
+saving its cursor in ``job.state`` and its counters with ``job.save_progress``,
+then returns ``True`` once there is nothing left. Because progress is stored
+after every chunk, the worker can be stopped at any point and a restarted
+worker (or another one, once the heartbeat goes stale) carries on from the
+last finished chunk.
+
+Enqueue work with ``Job.enqueue(kind, params, user)``; ``kind`` must be a key of
+``HANDLERS``.
+"""
+import csv
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from products.models import BookSaleReport
+from .exports import (
+    BOOK_SALE_HEADER, DAILY_REPORT_HEADER, MONTHLY_REPORT_HEADER,
+    book_sale_rows, daily_report_rows, filter_monthly_reports, filter_reports, monthly_report_rows,
+)
+from .models import DailyReport, Job, MonthlyReport
+from .pagination import encode_cursor, keyset_filter
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+@handler('monthly_reports')
+def generate_monthly_reports(job, chunk_size):
+    """Recompute MonthlyReport rows for ``params['month']/['year']``, a chunk of sellers at a time"""
+    month, year = job.params['month'], job.params['year']
+    start, end = MonthlyReport.month_bounds(month, year)
+    seller_ids = (
+        DailyReport.objects.filter(date__gte=start, date__lt=end)
+        .order_by('seller_id').values_list('seller_id', flat=True).distinct()
+    )
+    if job.total is None:
+        job.total = seller_ids.count()
+
+    chunk = list(seller_ids.filter(seller_id__gt=job.state.get('after', 0))[:chunk_size])
+    if not chunk:
+        job.result = {'generated': job.processed, 'month': month, 'year': year}
+        return True
+    MonthlyReport.generate_monthly_reports(month, year, sellers=chunk)
+    job.save_progress(state={'after': chunk[-1]}, processed=job.processed + len(chunk))
+    return False
+
+
+@handler('backfill_report_lines')
+def backfill_report_lines(job, chunk_size):
+    """Rebuild DailyReportLine rows from the JSON book lists, a chunk of reports at a time"""
+    reports = DailyReport.objects.order_by('id')
+    if job.total is None:
+        job.total = reports.count()
+
+    batch = list(
+        reports.filter(id__gt=job.state.get('after', 0))
+        .only('id', 'books_sold_details', 'books_given_free_details')[:chunk_size]
+    )
+    if not batch:
+        job.result = {'backfilled': job.processed}
+        return True
+    with transaction.atomic():
+        DailyReport.rebuild_lines(batch)
+    job.save_progress(state={'after': batch[-1].id}, processed=job.processed + len(batch))
+    return False
+
+
+# name -> (file name, header, queryset, filter, row generator, keyset ordering)
+EXPORTS = {
+    'daily': (
+        'daily-reports', DAILY_REPORT_HEADER, lambda: DailyReport.objects.all(),
+        filter_reports, daily_report_rows, ('-date', '-id'),
+    ),
+    'monthly': (
+        'monthly-reports', MONTHLY_REPORT_HEADER, lambda: MonthlyReport.objects.all(),
+        filter_monthly_reports, monthly_report_rows, ('-year', '-month', 'id'),
+    ),
+    'book_sales': (
+        'book-sales', BOOK_SALE_HEADER, lambda: BookSaleReport.objects.all(),
+        lambda queryset, params: filter_reports(queryset, params, date_field='date_reported'),
+        book_sale_rows, ('-date_reported', '-id'),
+    ),
+}
+
+
+def export_path(job):
+    filename = EXPORTS[job.params['report']][0]
+    return Path(settings.JOB_EXPORT_DIR) / f"{filename}-{job.pk}.csv"
+
+
+@handler('export')
+def export_csv(job, chunk_size):
+    """
+    Write ``params['report']`` (a key of ``EXPORTS``) filtered by
+    ``params['filters']`` to a CSV file under ``JOB_EXPORT_DIR``, appending one
+    keyset page per chunk.
+    """
+    _, header, base, apply_filters, rows, ordering = EXPORTS[job.params['report']]
+    queryset = apply_filters(base(), job.params.get('filters', {}))
+    path = export_path(job)
+    if job.total is None:
+        job.total = queryset.count()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', newline='') as handle:
+            csv.writer(handle).writerow(header)
+        job.state = {'cursor': None, 'size': path.stat().st_size}
+
+    fields = [name.lstrip('-') for name in ordering]
+    page, _ = keyset_filter(queryset, job.state['cursor'], ordering)
+    keys = list(page.values_list('pk', *fields)[:chunk_size])
+    if not keys:
+        job.result = {'file': path.name, 'rows': job.processed}
+        return True
+
+    with open(path, 'r+', newline='') as handle:
+        # Drop anything a previously interrupted chunk wrote past the last saved cursor
+        handle.truncate(job.state['size'])
+        handle.seek(job.state['size'])
+        csv.writer(handle).writerows(rows(queryset.filter(pk__in=[key[0] for key in keys]).order_by(*ordering)))
+        handle.flush()
+        os.fsync(handle.fileno())
+        size = handle.tell()
+    job.save_progress(
+        state={'cursor': encode_cursor(keys[-1][1:]), 'size': size},
+        processed=job.processed + len(keys),
+    )
+    return False
+
+
+def run_job(job, chunk_size=None, max_chunks=None):
+    """
+    Process ``job`` chunk by chunk until it finishes (or ``max_chunks`` chunks
+    have run, leaving it claimable). Any exception marks the job as failed.
+    """
+    chunk_size = chunk_size or settings.JOB_CHUNK_SIZE
+    step = HANDLERS.get(job.kind)
+    if step is None:
+        job.finish(error=f"Unknown job kind '{job.kind}'")
+        return job
+
+    chunks = 0
+    try:
+        while not step(job, chunk_size):
+            chunks += 1
+            if max_chunks and chunks >= max_chunks:
+                # Hand the job back so other queued work gets a turn
+                job.status = Job.QUEUED
+                job.save(update_fields=['status'])
+                return job
+    except Exception as exc:
+        logger.exception("Job %s failed", job.pk)
+        job.finish(error=f"{exc.__class__.__name__}: {exc}")
+        return job
+    job.finish()
+    return job
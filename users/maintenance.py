@@ -0,0 +1,103 @@
+"""
+Purging of expired and abandoned rows (``manage.py purge_expired``).
+
+Nothing else removes these rows: Django never deletes expired sessions on its
+own, password reset codes are only dropped when the same user asks again or
+uses theirs, anonymous carts outlive the session that pointed at them, and
+finished background jobs (with their export files) pile up.
+
+Each kind is deleted ``batch_size`` primary keys at a time, each batch in its
+own short transaction that re-checks the purge condition, so SQLite's writer
+lock is only held for a moment and requests keep flowing while a large backlog
+is cleared. Sleeping ``pause`` seconds between batches gives waiting writers a
+turn.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from products.models import Cart
+from .jobs import export_path
+from .models import Job, PasswordResetCode
+
+
+def expired_sessions(now):
+    return Session.objects.filter(expire_date__lt=now)
+
+
+def expired_reset_codes(now):
+    # Codes without an expiry can never be confirmed (password_reset_confirm requires expires_at > now)
+    return PasswordResetCode.objects.filter(Q(expires_at__lt=now) | Q(expires_at__isnull=True))
+
+
+def abandoned_carts(now):
+    return Cart.objects.filter(
+        user__isnull=True,
+        is_ordered=False,
+        updated_at__lt=now - timedelta(days=settings.PURGE_CART_AFTER_DAYS),
+    )
+
+
+def finished_jobs(now):
+    return Job.objects.filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED),
+        created_at__lt=now - timedelta(days=settings.PURGE_JOBS_AFTER_DAYS),
+    )
+
+
+def delete_export_files(jobs):
+    paths = [export_path(job) for job in jobs.filter(kind='export')]
+
+    def unlink():
+        for path in paths:
+            path.unlink(missing_ok=True)
+    transaction.on_commit(unlink)
+
+
+# name -> (rows to purge as of ``now``, hook called with each batch before it is deleted)
+PURGES = {
+    'sessions': (expired_sessions, None),
+    'reset_codes': (expired_reset_codes, None),
+    'carts': (abandoned_carts, None),
+    'jobs': (finished_jobs, delete_export_files),
+}
+
+
+def purge(queryset, batch_size=None, pause=None, before_delete=None):
+    """Delete the rows of ``queryset`` in batches; returns the number removed"""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    label = queryset.model._meta.label
+
+    removed = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        with transaction.atomic():
+            batch = queryset.filter(pk__in=ids)
+            if before_delete:
+                before_delete(batch)
+            removed += batch.delete()[1].get(label, 0)
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired(kinds=None, batch_size=None, pause=None):
+    """
+    Purge every kind in ``kinds`` (keys of ``PURGES``, default all).
+    Returns ``{kind: {'removed': rows, 'seconds': elapsed}}``.
+    """
+    now = timezone.now()
+    results = {}
+    for kind in kinds or PURGES:
+        rows, before_delete = PURGES[kind]
+        started = time.perf_counter()
+        removed = purge(rows(now), batch_size, pause, before_delete)
+        results[kind] = {'removed': removed, 'seconds': time.perf_counter() - started}
+    return results
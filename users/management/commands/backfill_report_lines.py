@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import DailyReport, Job
+
+
+class Command(BaseCommand):
+    help = "Populate DailyReportLine rows from the JSON book lists of existing daily reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Reports rewritten per transaction (default: 500).")
+        parser.add_argument('--enqueue', action='store_true', help="Queue the backfill for `manage.py run_jobs` instead of running it now.")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = Job.enqueue('backfill_report_lines')
+            self.stdout.write(self.style.SUCCESS(f"Queued {job}."))
+            return
+
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(
+                DailyReport.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'books_sold_details', 'books_given_free_details')[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                DailyReport.rebuild_lines(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f"Backfilled {total} report(s)...")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled lines for {total} daily report(s)."))
@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Time password verification with the configured PASSWORD_HASHERS and report "
+        "logins per second per CPU core, for sizing web workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasher', action='append', dest='hashers',
+            help="Algorithm to benchmark, e.g. pbkdf2_sha256 (repeatable; default: the preferred hasher).",
+        )
+        parser.add_argument('--all', action='store_true', help="Benchmark every configured hasher.")
+        parser.add_argument('--seconds', type=float, default=3.0, help="Time spent on each hasher (default: 3).")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            hashers = get_hashers()
+        else:
+            try:
+                hashers = [get_hasher(name) for name in options['hashers'] or ['default']]
+            except ValueError as exc:
+                raise CommandError(exc)
+
+        cores = os.cpu_count() or 1
+        self.stdout.write(f"{cores} CPU core(s); one login = one password verification.")
+        for hasher in hashers:
+            try:
+                rate = self.measure(hasher, options['seconds'])
+            except ValueError as exc:
+                # Optional hashers (argon2, bcrypt, scrypt) need extra libraries
+                self.stdout.write(self.style.WARNING(f"{hasher.algorithm}: skipped ({exc})"))
+                continue
+            work = ', '.join(
+                f"{name}={getattr(hasher, name)}"
+                for name in ('iterations', 'time_cost', 'memory_cost', 'rounds', 'work_factor')
+                if hasattr(hasher, name)
+            )
+            self.stdout.write(
+                f"{hasher.algorithm} ({work or 'no work factor'}): "
+                f"{1000 / rate:.1f} ms per login, {rate:.1f} logins/sec per core, "
+                f"~{rate * cores:.0f} logins/sec on all cores"
+            )
+
+    def measure(self, hasher, seconds):
+        password = 'benchmark-password'
+        encoded = hasher.encode(password, hasher.salt())
+        hasher.verify(password, encoded)  # Warm up (imports, C extensions)
+
+        count = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < seconds or count == 0:
+            hasher.verify(password, encoded)
+            count += 1
+            elapsed = time.perf_counter() - started
+        return count / elapsed
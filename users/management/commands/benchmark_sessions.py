@@ -0,0 +1,87 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'users.sessions': 'users.sessions',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay simulated browsing through SessionMiddleware with each session engine "
+        "and report django_session writes and time per request. Runs inside a "
+        "transaction that is rolled back, so no sessions are left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per engine (default: 2000).")
+        parser.add_argument('--sessions', type=int, default=50, help="Distinct visitors (default: 50).")
+        parser.add_argument(
+            '--modify-every', type=int, default=20,
+            help="Every Nth request changes session data, e.g. a cart update (default: 20; 0 = never).",
+        )
+        parser.add_argument(
+            '--engine', action='append', dest='engines', choices=sorted(ENGINES),
+            help="Engine to benchmark (repeatable; default: all).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['requests']} requests from {options['sessions']} visitors, "
+            f"SESSION_SAVE_EVERY_REQUEST={settings.SESSION_SAVE_EVERY_REQUEST}"
+        )
+        for label in options['engines'] or ENGINES:
+            with override_settings(SESSION_ENGINE=ENGINES[label]):
+                writes, seconds = self.replay(options['requests'], options['sessions'], options['modify_every'])
+            self.stdout.write(
+                f"{label}: {writes} django_session writes, "
+                f"{writes / options['requests']:.3f} writes/request, "
+                f"{seconds * 1000 / options['requests']:.2f} ms/request"
+            )
+
+    def replay(self, requests, sessions, modify_every):
+        def view(request):
+            # Every page reads the session (theme, cart, role); some change it
+            if 'theme' not in request.session:
+                request.session['theme'] = 'light'
+            if modify_every and request.number % modify_every == 0:
+                request.session['last_page'] = request.number
+            return HttpResponse()
+
+        writes = 0
+
+        def count_writes(execute, sql, params, many, context):
+            nonlocal writes
+            if sql.split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE') and '"django_session"' in sql:
+                writes += 1
+            return execute(sql, params, many, context)
+
+        middleware = SessionMiddleware(view)
+        factory = RequestFactory()
+        cookies = [None] * sessions
+        with transaction.atomic(), connection.execute_wrapper(count_writes):
+            started = time.perf_counter()
+            for number in range(requests):
+                visitor = number % sessions
+                request = factory.get('/')
+                request.number = number
+                if cookies[visitor]:
+                    request.COOKIES[settings.SESSION_COOKIE_NAME] = cookies[visitor]
+                cookie = middleware(request).cookies.get(settings.SESSION_COOKIE_NAME)
+                if cookie:
+                    cookies[visitor] = cookie.value
+            seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        # The rows were rolled back; drop any cached copies too
+        for key in filter(None, cookies):
+            middleware.SessionStore(key).delete()
+        return writes, seconds
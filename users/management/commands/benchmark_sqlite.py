@@ -0,0 +1,139 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.utils import timezone
+
+from products.models import Product
+
+ALIAS = 'sqlite_benchmark'
+
+# name -> (OPTIONS, CONN_MAX_AGE, journal mode); 'default' is Django's out-of-the-box
+# SQLite setup. The journal mode lives in the database file (migration users 0015
+# sets WAL), so it is applied to the copy rather than through OPTIONS.
+PROFILES = {
+    'default': ({}, 0, 'DELETE'),
+    'tuned': (None, None, 'WAL'),  # OPTIONS and CONN_MAX_AGE taken from DATABASES['default']
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite throughput with many readers and a few writers, on a copy of "
+        "the database, with Django's default connection settings and with the tuned "
+        "DATABASES['default'] settings (pragmas, BEGIN IMMEDIATE, persistent connections)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help="Reader threads (default: 8).")
+        parser.add_argument('--writers', type=int, default=2, help="Writer threads (default: 2).")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run (default: 5).")
+        parser.add_argument(
+            '--profile', action='append', dest='profiles', choices=list(PROFILES),
+            help="Connection profile to run (repeatable; default: all).",
+        )
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("benchmark_sqlite only applies to the sqlite3 backend.")
+
+        self.stdout.write(
+            f"{options['readers']} reader(s), {options['writers']} writer(s), "
+            f"{options['seconds']:g}s per profile"
+        )
+        for name in options['profiles'] or PROFILES:
+            db_options, conn_max_age, journal_mode = PROFILES[name]
+            if db_options is None:
+                db_options, conn_max_age = database.get('OPTIONS', {}), database.get('CONN_MAX_AGE', 0)
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'benchmark.sqlite3'
+                self.copy_database(database['NAME'], path, journal_mode)
+                stats = self.run(path, db_options, conn_max_age, options)
+            self.report(name, stats, options['seconds'])
+
+    def copy_database(self, source, target, journal_mode):
+        with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+            dst.execute(f'PRAGMA journal_mode={journal_mode}')
+
+    def run(self, path, db_options, conn_max_age, options):
+        config = {
+            **settings.DATABASES[DEFAULT_DB_ALIAS],
+            'NAME': path,
+            'OPTIONS': db_options,
+            'CONN_MAX_AGE': conn_max_age,
+        }
+        connections.settings[ALIAS] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS], ALIAS: config}
+        )[ALIAS]
+
+        stats = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def worker(kind, number):
+            operation = self.read if kind == 'read' else self.write
+            latencies, errors, count = [], 0, 0
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        operation(number, count)
+                        latencies.append(time.perf_counter() - started)
+                    except OperationalError:
+                        errors += 1
+                    count += 1
+                    # End of "request": what request_finished does, honouring CONN_MAX_AGE
+                    connections[ALIAS].close_if_unusable_or_obsolete()
+            finally:
+                connections[ALIAS].close()
+            with lock:
+                stats[kind].extend(latencies)
+                stats[f'{kind}_errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=('read', n)) for n in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=('write', n)) for n in range(options['writers'])]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del connections.settings[ALIAS]
+        return stats
+
+    def read(self, worker, count):
+        # A catalogue page: newest products plus a count
+        list(Product.objects.using(ALIAS).order_by('-created_at').values('id', 'name', 'price')[:20])
+        Product.objects.using(ALIAS).count()
+
+    def write(self, worker, count):
+        # A session/cart style read-modify-write in one transaction
+        key = f'benchmark-{worker}-{count % 100}'
+        with transaction.atomic(using=ALIAS):
+            Session.objects.using(ALIAS).filter(session_key=key).exists()
+            Session(
+                session_key=key, session_data='x' * 200,
+                expire_date=timezone.now() + timedelta(hours=1),
+            ).save(using=ALIAS)
+
+    def report(self, name, stats, seconds):
+        parts = []
+        for kind in ('read', 'write'):
+            latencies = stats[kind]
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0
+            parts.append(
+                f"{len(latencies) / seconds:.0f} {kind}s/s (p95 {p95:.1f} ms, "
+                f"{stats[f'{kind}_errors']} failed)"
+            )
+        self.stdout.write(f"{name}: " + ', '.join(parts))
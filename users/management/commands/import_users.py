@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import COLUMNS, import_users, read_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and profiles from a CSV file with the columns "
+        f"{', '.join(COLUMNS)} (role defaults to seller). Nothing is created unless every row is valid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help="Path to the CSV file (UTF-8, header row required).")
+        parser.add_argument('--workers', type=int, help="Processes used to hash passwords (default: one per CPU core).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per INSERT (default: 500).")
+        parser.add_argument('--created-by', help="Username recorded as the creator of the new profiles.")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the file.")
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = User.objects.get(username=options['created_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named '{options['created_by']}'.")
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as handle:
+                rows = read_csv(handle)
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(f"Cannot read {options['csv_file']}: {exc}")
+        except ValidationError as exc:
+            raise CommandError(exc.message)
+
+        result = import_users(
+            rows, created_by=created_by, workers=options['workers'],
+            batch_size=options['batch_size'], dry_run=options['dry_run'],
+        )
+        if result['errors']:
+            for line, messages in sorted(result['errors'].items()):
+                self.stderr.write(f"Line {line}: {'; '.join(messages)}")
+            raise CommandError(f"{len(result['errors'])} invalid row(s); no users were created.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"All {len(rows)} row(s) are valid."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Created {result['created']} user(s)."))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.maintenance import PURGES, purge_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions and password reset codes, abandoned anonymous carts "
+        "and old finished background jobs, in small batches that are safe to run "
+        "alongside traffic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', action='append', dest='kinds', choices=list(PURGES),
+            help="Purge only this kind of row (repeatable; default: all).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help="Rows deleted per transaction (default: PURGE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=settings.PURGE_BATCH_PAUSE,
+            help="Seconds to sleep between batches (default: PURGE_BATCH_PAUSE).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would be removed.")
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or list(PURGES)
+        if options['dry_run']:
+            now = timezone.now()
+            for kind in kinds:
+                self.stdout.write(f"{kind}: {PURGES[kind][0](now).count()} row(s) would be removed.")
+            return
+
+        results = purge_expired(kinds, batch_size=options['batch_size'], pause=options['pause'])
+        for kind, result in results.items():
+            self.stdout.write(f"{kind}: removed {result['removed']} row(s) in {result['seconds']:.2f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {sum(r['removed'] for r in results.values())} row(s) in "
+            f"{sum(r['seconds'] for r in results.values()):.2f}s."
+        ))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from users.models import ROLLUP_FIELDS, DailyReport, MonthlyReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute monthly reports from the daily reports and repair rows whose "
+        "incrementally maintained totals have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, help="Only check this month (requires --year).")
+        parser.add_argument('--year', type=int, help="Only check this year.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without repairing it.")
+
+    def periods(self, month, year):
+        if month and not year:
+            raise CommandError("--month requires --year.")
+        if month:
+            return [(month, year)]
+
+        daily = DailyReport.objects.annotate(m=ExtractMonth('date'), y=ExtractYear('date')).values_list('m', 'y')
+        monthly = MonthlyReport.objects.values_list('month', 'year')
+        if year:
+            daily = daily.filter(date__year=year)
+            monthly = monthly.filter(year=year)
+        return sorted(set(daily.distinct()) | set(monthly.distinct()), key=lambda period: (period[1], period[0]))
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for month, year in self.periods(options['month'], options['year']):
+            expected = {report.seller_id: report for report in MonthlyReport.compute_monthly_reports(month, year)}
+            stored = {report.seller_id: report for report in MonthlyReport.objects.filter(month=month, year=year)}
+
+            stale = [
+                seller_id for seller_id, report in expected.items()
+                if seller_id not in stored or self.differs(stored[seller_id], report)
+            ]
+            orphans = [seller_id for seller_id in stored if seller_id not in expected]
+            if not stale and not orphans:
+                continue
+
+            drifted += len(stale) + len(orphans)
+            self.stdout.write(
+                f"{month:02d}/{year}: {len(stale)} missing or stale, {len(orphans)} without daily reports."
+            )
+            if options['dry_run']:
+                continue
+            with transaction.atomic():
+                MonthlyReport.generate_monthly_reports(month, year, sellers=stale)
+                MonthlyReport.objects.filter(month=month, year=year, seller_id__in=orphans).delete()
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Monthly reports are in sync."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{drifted} monthly report(s) have drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {drifted} monthly report(s)."))
+
+    @staticmethod
+    def differs(stored, expected):
+        if stored.days_worked != expected.days_worked:
+            return True
+        return any(getattr(stored, field) != getattr(expected, field) for field in ROLLUP_FIELDS)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.models import SellerPerformance
+
+
+class Command(BaseCommand):
+    help = "Recompute every seller's rolling 7/30/90-day metrics (run daily as the windows roll forward)."
+
+    def handle(self, *args, **options):
+        sellers = SellerPerformance.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed rolling metrics for {sellers} seller(s)."))
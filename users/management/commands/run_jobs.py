@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.jobs import run_job
+from users.models import Job
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (monthly report generation, exports, backfills)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.JOB_CHUNK_SIZE,
+            help="Items handled per chunk (default: JOB_CHUNK_SIZE).",
+        )
+        parser.add_argument(
+            '--max-chunks', type=int, default=50,
+            help="Chunks run before a job goes back to the queue so others get a turn (default: 50, 0 = no limit).",
+        )
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty instead of polling.")
+        parser.add_argument('--poll-interval', type=float, default=5, help="Seconds between polls of an empty queue.")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=settings.JOB_STALE_SECONDS)
+        processed = 0
+        try:
+            while True:
+                job = Job.claim_next(stale_after)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                run_job(job, chunk_size=options['chunk_size'], max_chunks=options['max_chunks'] or None)
+                if job.is_finished:
+                    processed += 1
+                    style = self.style.SUCCESS if job.status == Job.SUCCEEDED else self.style.ERROR
+                    self.stdout.write(style(f"{job}: {job.processed}/{job.total or 0} {job.error}".rstrip()))
+                else:
+                    self.stdout.write(f"{job}: {job.processed}/{job.total or 0}, requeued")
+        except KeyboardInterrupt:
+            # The current chunk's progress is already saved; the job resumes once its heartbeat goes stale
+            self.stdout.write("Interrupted.")
+        self.stdout.write(self.style.SUCCESS(f"Finished {processed} job(s)."))
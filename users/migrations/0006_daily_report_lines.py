@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_order_search_index'),
+        ('users', '0005_remove_dailyreport_books_given_free_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReportLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_name', models.CharField(help_text='Name as entered, also for books not in the catalogue', max_length=255)),
+                ('kind', models.CharField(choices=[('sold', 'Sold'), ('free', 'Given free')], max_length=4)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_lines', to='products.product')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='users.dailyreport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['report', 'kind'], name='reportline_report_kind_idx'), models.Index(fields=['product', 'kind'], name='reportline_product_kind_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_daily_report_lines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlyreport',
+            index=models.Index(fields=['year', 'month'], name='monthlyreport_period_idx'),
+        ),
+    ]
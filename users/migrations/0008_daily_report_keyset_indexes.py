@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_monthly_report_period_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyreport',
+            index=models.Index(fields=['date', 'id'], name='dailyreport_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyreport',
+            index=models.Index(fields=['seller', 'date', 'id'], name='dailyreport_seller_date_id_idx'),
+        ),
+    ]
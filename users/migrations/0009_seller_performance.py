@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_daily_report_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField(choices=[(7, '7 days'), (30, '30 days'), (90, '90 days')])),
+                ('as_of', models.DateField()),
+                ('days_reported', models.PositiveIntegerField(default=0)),
+                ('books_sold', models.IntegerField(default=0)),
+                ('books_free', models.IntegerField(default=0)),
+                ('houses_visited', models.IntegerField(default=0)),
+                ('teachings_given', models.IntegerField(default=0)),
+                ('working_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('books_per_hour', models.FloatField(default=0)),
+                ('houses_per_hour', models.FloatField(default=0)),
+                ('teachings_per_hour', models.FloatField(default=0)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window_days', '-books_sold'], name='sellerperf_window_books_idx')],
+                'unique_together': {('seller', 'window_days')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0010_background_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['phone_number'], name='userprofile_phone_idx'),
+        ),
+        # auth_user belongs to django.contrib.auth, so its extra indexes are
+        # plain SQL: email for login/uniqueness lookups and email search,
+        # (date_joined, id) for the keyset-paginated manage-users list.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS users_auth_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS users_auth_user_email_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS users_auth_user_joined_idx ON auth_user (date_joined, id)',
+            'DROP INDEX IF EXISTS users_auth_user_joined_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passwordresetcode',
+            index=models.Index(fields=['reset_code', 'expires_at'], name='resetcode_code_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passwordresetcode',
+            index=models.Index(fields=['expires_at'], name='resetcode_expires_idx'),
+        ),
+    ]
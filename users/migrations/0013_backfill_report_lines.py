@@ -0,0 +1,58 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_report_lines(apps, schema_editor):
+    """
+    Create DailyReportLine rows for reports saved before the lines existed, so
+    book totals and monthly reconciliation see them. Frozen copy of
+    DailyReport.rebuild_lines: one product lookup and one insert per batch.
+    """
+    DailyReport = apps.get_model('users', 'DailyReport')
+    DailyReportLine = apps.get_model('users', 'DailyReportLine')
+    Product = apps.get_model('products', 'Product')
+
+    reports = (
+        DailyReport.objects.filter(lines__isnull=True).order_by('id')
+        .only('id', 'books_sold_details', 'books_given_free_details')
+    )
+    last_id = 0
+    while True:
+        batch = list(reports.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            return
+        names = {
+            item.get('book_name')
+            for report in batch
+            for items in (report.books_sold_details or [], report.books_given_free_details or [])
+            for item in items if item.get('book_name')
+        }
+        product_ids = {}
+        for product_id, name in Product.objects.filter(name__in=names).order_by('-id').values_list('id', 'name'):
+            product_ids[name] = product_id
+        DailyReportLine.objects.bulk_create([
+            DailyReportLine(
+                report=report,
+                product_id=product_ids.get(item.get('book_name')),
+                book_name=item.get('book_name', ''),
+                kind=kind,
+                quantity=int(item.get('quantity') or 0),
+            )
+            for report in batch
+            for kind, items in (('sold', report.books_sold_details or []), ('free', report.books_given_free_details or []))
+            for item in items
+            if int(item.get('quantity') or 0) > 0
+        ])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_purge_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_report_lines, migrations.RunPython.noop),
+    ]
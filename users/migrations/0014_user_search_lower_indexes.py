@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_backfill_report_lines'),
+    ]
+
+    operations = [
+        # Case-insensitive prefix search on the manage-users page compares
+        # lower(username) / lower(email) ranges (see users/search.py)
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS users_auth_user_username_lower_idx ON auth_user (lower(username))',
+            'DROP INDEX IF EXISTS users_auth_user_username_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS users_auth_user_email_lower_idx ON auth_user (lower(email))',
+            'DROP INDEX IF EXISTS users_auth_user_email_lower_idx',
+        ),
+    ]
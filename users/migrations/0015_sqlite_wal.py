@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    """
+    Switch the SQLite database to write-ahead logging, once. The journal mode
+    is stored in the database file, so every later connection uses it without
+    the file being rewritten on connect.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().execute('PRAGMA journal_mode=WAL')
+
+
+def disable_wal(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.connection.cursor().execute('PRAGMA journal_mode=DELETE')
+
+
+class Migration(migrations.Migration):
+    # The journal mode cannot be changed inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0014_user_search_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, disable_wal),
+    ]
@@ -1,7 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from products.models import Product
+from .performance import MEASURES, WINDOWS, window_metrics, window_start
 
 class UserProfile(models.Model):
     USER_ROLES = (
@@ -17,9 +24,39 @@ class UserProfile(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_users')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Phone uniqueness checks on registration/import and phone search
+            models.Index(fields=['phone_number'], name='userprofile_phone_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} ({self.get_role_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self):
+        """Names of the loaded fields whose value differs from the database row"""
+        loaded = getattr(self, '_loaded_values', {})
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def save(self, *args, **kwargs):
+        """Write only the changed columns of a loaded profile, and nothing at all when it is clean"""
+        if not self._state.adding and kwargs.get('update_fields') is None and hasattr(self, '_loaded_values'):
+            changed = self.changed_fields()
+            if not changed:
+                return
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
 from uuid import uuid4
 from django.db import models
 from django.contrib.auth.models import User
@@ -35,6 +72,14 @@ class PasswordResetCode(models.Model):
     expires_at = models.DateTimeField(blank=True, null=True)  # Expiration time for the code and token
     request_token = models.UUIDField(default=uuid4, editable=False)  # Unique request token
 
+    class Meta:
+        indexes = [
+            # password_reset_confirm looks codes up by value among the unexpired ones
+            models.Index(fields=['reset_code', 'expires_at'], name='resetcode_code_expires_idx'),
+            # purge_expired
+            models.Index(fields=['expires_at'], name='resetcode_expires_idx'),
+        ]
+
     def __str__(self):
         return f"Reset Code for {self.user.email}"
 
@@ -46,6 +91,17 @@ class PasswordResetCode(models.Model):
             self.delete()
 
 
+class DailyReportQuerySet(models.QuerySet):
+    def with_book_totals(self):
+        """Annotate SQL-side book totals from the report lines."""
+        # Correlated subqueries rather than a join + GROUP BY, so paginated
+        # listings can still walk the (date, id) index in order
+        return self.annotate(
+            books_sold_total=report_line_total(DailyReportLine.SOLD),
+            books_free_total=report_line_total(DailyReportLine.FREE),
+        )
+
+
 class DailyReport(models.Model):
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_reports')
     date = models.DateField(default=timezone.now)
@@ -58,24 +114,177 @@ class DailyReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DailyReportQuerySet.as_manager()
+
     class Meta:
         unique_together = ('seller', 'date')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='dailyreport_date_id_idx'),
+            models.Index(fields=['seller', 'date', 'id'], name='dailyreport_seller_date_id_idx'),
+        ]
     
     def __str__(self):
         return f"Report for {self.seller.username} - {self.date}"
-    
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = DailyReport.objects.select_for_update().filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            if update_fields is None or {'books_sold_details', 'books_given_free_details'} & set(update_fields):
+                self.sync_lines()
+            MonthlyReport.record_daily_change(old=previous, new=self)
+            SellerPerformance.refresh_for_reports(previous, self)
+
+    def rollup_values(self):
+        """This report's contribution to its MonthlyReport totals"""
+        return {
+            'total_books_sold_money': sum(int(item.get('quantity') or 0) for item in self.books_sold_details or []),
+            'total_books_given_free': sum(int(item.get('quantity') or 0) for item in self.books_given_free_details or []),
+            'total_houses_visited': self.houses_visited,
+            'total_teachings_given': self.teachings_given,
+            'total_working_hours': Decimal(str(self.working_hours)),
+        }
+
+    def sync_lines(self):
+        """Rewrite this report's DailyReportLine rows from the JSON book lists."""
+        DailyReport.rebuild_lines([self])
+
+    @classmethod
+    def rebuild_lines(cls, reports):
+        """Rewrite the lines of many saved reports with one product lookup and one insert"""
+        DailyReportLine.objects.filter(report__in=reports).delete()
+        product_ids = cls.product_ids_for(reports)
+        DailyReportLine.objects.bulk_create(
+            [line for report in reports for line in report.build_lines(product_ids)]
+        )
+
+    @staticmethod
+    def product_ids_for(reports):
+        """Map the book names used in ``reports`` to catalogue product ids"""
+        names = {
+            item.get('book_name')
+            for report in reports
+            for items in (report.books_sold_details or [], report.books_given_free_details or [])
+            for item in items if item.get('book_name')
+        }
+        product_ids = {}
+        for product_id, name in Product.objects.filter(name__in=names).order_by('-id').values_list('id', 'name'):
+            product_ids[name] = product_id  # Lowest id wins for duplicate names
+        return product_ids
+
+    def build_lines(self, product_ids):
+        details = [
+            (DailyReportLine.SOLD, self.books_sold_details or []),
+            (DailyReportLine.FREE, self.books_given_free_details or []),
+        ]
+        return [
+            DailyReportLine(
+                report=self,
+                product_id=product_ids.get(item.get('book_name')),
+                book_name=item.get('book_name', ''),
+                kind=kind,
+                quantity=int(item.get('quantity') or 0),
+            )
+            for kind, items in details
+            for item in items
+            if int(item.get('quantity') or 0) > 0
+        ]
+
+    @classmethod
+    def bulk_upsert(cls, seller, entries):
+        """
+        Create or update one report per entry (dicts of model field values
+        keyed by ``date``) for ``seller`` with bulk queries, keeping the report
+        lines, monthly reports and rolling metrics in step as ``save()`` does.
+        Returns ``{date: 'created' | 'updated'}``.
+        """
+        fields = [
+            'books_sold_details', 'books_given_free_details', 'houses_visited',
+            'teachings_given', 'working_hours', 'additional_notes',
+        ]
+        with transaction.atomic():
+            previous = {
+                report.date: report
+                for report in cls.objects.select_for_update().filter(
+                    seller=seller, date__in=[entry['date'] for entry in entries],
+                )
+            }
+            reports = [cls(seller=seller, **entry) for entry in entries]
+            cls.objects.bulk_create(
+                reports,
+                update_conflicts=True,
+                unique_fields=['seller', 'date'],
+                update_fields=fields + ['updated_at'],
+            )
+            if any(report.pk is None for report in reports):
+                # Backends that cannot return ids from an upsert
+                ids = dict(cls.objects.filter(seller=seller, date__in=[r.date for r in reports]).values_list('date', 'id'))
+                for report in reports:
+                    report.pk = ids[report.date]
+
+            cls.rebuild_lines(reports)
+            MonthlyReport.record_daily_changes([(previous.get(report.date), report) for report in reports])
+            SellerPerformance.refresh_for_reports(*reports, *previous.values())
+        return {report.date: 'updated' if report.date in previous else 'created' for report in reports}
+
     @property
     def total_books_sold(self):
-        """Calculate total books sold from details"""
+        """Total books sold; uses the with_book_totals() annotation when present"""
+        if hasattr(self, 'books_sold_total'):
+            return self.books_sold_total
         return sum(item.get('quantity', 0) for item in self.books_sold_details)
     
     @property
     def total_books_given_free(self):
-        """Calculate total books given free from details"""
+        """Total books given free; uses the with_book_totals() annotation when present"""
+        if hasattr(self, 'books_free_total'):
+            return self.books_free_total
         return sum(item.get('quantity', 0) for item in self.books_given_free_details)
 
 
+class DailyReportLine(models.Model):
+    """One book entry of a DailyReport, so per-title totals can be queried in SQL"""
+    SOLD = 'sold'
+    FREE = 'free'
+    KIND_CHOICES = (
+        (SOLD, 'Sold'),
+        (FREE, 'Given free'),
+    )
+
+    report = models.ForeignKey(DailyReport, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_lines')
+    book_name = models.CharField(max_length=255, help_text="Name as entered, also for books not in the catalogue")
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'kind'], name='reportline_report_kind_idx'),
+            models.Index(fields=['product', 'kind'], name='reportline_product_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_name} x{self.quantity} ({self.kind})"
+
+
+ROLLUP_FIELDS = (
+    'total_books_sold_money', 'total_books_given_free', 'total_houses_visited',
+    'total_teachings_given', 'total_working_hours',
+)
+
+
+def report_line_total(kind):
+    """Correlated subquery: one DailyReport's total quantity of ``kind`` lines."""
+    return Coalesce(Subquery(
+        DailyReportLine.objects.filter(report=OuterRef('pk'), kind=kind)
+        .values('report').annotate(total=Sum('quantity')).values('total')
+    ), 0)
+
+
 class MonthlyReport(models.Model):
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_reports')
     month = models.IntegerField()
@@ -91,52 +300,243 @@ class MonthlyReport(models.Model):
     class Meta:
         unique_together = ('seller', 'month', 'year')
         ordering = ['-year', '-month']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='monthlyreport_period_idx'),
+        ]
     
     def __str__(self):
         return f"Monthly Report for {self.seller.username} - {self.month}/{self.year}"
     
+    @staticmethod
+    def month_bounds(month, year):
+        """First day of the month and first day of the next month."""
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return start, end
+
+    @staticmethod
+    def build_averages(books_sold, books_free, houses, teachings, hours, days_worked):
+        """Per-day averages stored in ``average_daily_performance``."""
+        return {
+            'avg_books_sold': round(books_sold / days_worked, 2),
+            'avg_books_free': round(books_free / days_worked, 2),
+            'avg_houses': round(houses / days_worked, 2),
+            'avg_teachings': round(teachings / days_worked, 2),
+            'avg_hours': round(float(hours) / days_worked, 2),
+            'days_worked': days_worked,
+        }
+
+    @property
+    def days_worked(self):
+        return self.average_daily_performance.get('days_worked', 0)
+
     @classmethod
-    def generate_monthly_report(cls, seller, month, year):
-        """Generate monthly report from daily reports"""
-        daily_reports = DailyReport.objects.filter(
-            seller=seller,
-            date__month=month,
-            date__year=year
+    def compute_monthly_reports(cls, month, year, sellers=None):
+        """
+        Build (unsaved) monthly reports for every seller (or just ``sellers``).
+
+        All totals, including the book quantities from the report lines, come
+        from one GROUP BY over ``DailyReport``.
+        """
+        start, end = cls.month_bounds(month, year)
+        daily_reports = DailyReport.objects.filter(date__gte=start, date__lt=end)
+        if sellers is not None:
+            daily_reports = daily_reports.filter(seller__in=sellers)
+
+        totals = daily_reports.values('seller_id').annotate(
+            books_sold=Sum(report_line_total(DailyReportLine.SOLD)),
+            books_free=Sum(report_line_total(DailyReportLine.FREE)),
+            houses=Sum('houses_visited'),
+            teachings=Sum('teachings_given'),
+            hours=Sum('working_hours'),
+            days_worked=Count('id'),
+        ).order_by('seller_id')
+
+        reports = []
+        for row in totals:
+            books_sold = row['books_sold'] or 0
+            books_free = row['books_free'] or 0
+            houses = row['houses'] or 0
+            teachings = row['teachings'] or 0
+            hours = row['hours'] or Decimal('0')
+            reports.append(cls(
+                seller_id=row['seller_id'],
+                month=month,
+                year=year,
+                total_books_sold_money=books_sold,
+                total_books_given_free=books_free,
+                total_houses_visited=houses,
+                total_teachings_given=teachings,
+                total_working_hours=hours,
+                average_daily_performance=cls.build_averages(
+                    books_sold, books_free, houses, teachings, hours, row['days_worked'],
+                ),
+            ))
+        return reports
+
+    @classmethod
+    def generate_monthly_reports(cls, month, year, sellers=None):
+        """Recompute monthly reports from scratch and write them with one bulk upsert."""
+        reports = cls.compute_monthly_reports(month, year, sellers)
+        if reports:
+            cls.objects.bulk_create(
+                reports,
+                update_conflicts=True,
+                unique_fields=['seller', 'month', 'year'],
+                update_fields=[
+                    'total_books_sold_money', 'total_books_given_free', 'total_houses_visited',
+                    'total_teachings_given', 'total_working_hours', 'average_daily_performance',
+                    'generated_at',
+                ],
+            )
+        return reports
+
+    @classmethod
+    def record_daily_change(cls, old=None, new=None):
+        """
+        Apply the difference between two versions of a DailyReport to the
+        affected month rows. ``old`` is ``None`` for a new report and ``new`` is
+        ``None`` for a deleted one. Must run inside the report's transaction.
+        """
+        cls.record_daily_changes([(old, new)])
+
+    @classmethod
+    def record_daily_changes(cls, changes):
+        """Apply many ``(old, new)`` changes, touching each month row once."""
+        deltas = {}
+        for old, new in changes:
+            for report, sign in ((old, -1), (new, 1)):
+                if report is None:
+                    continue
+                key = (report.seller_id, report.date.month, report.date.year)
+                delta = deltas.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0) | {'days': 0})
+                for field, value in report.rollup_values().items():
+                    delta[field] += sign * value
+                delta['days'] += sign
+
+        for (seller_id, month, year), delta in deltas.items():
+            if any(delta.values()):
+                cls.apply_delta(seller_id, month, year, delta)
+
+    @classmethod
+    def apply_delta(cls, seller_id, month, year, delta):
+        report = cls.objects.select_for_update().filter(seller_id=seller_id, month=month, year=year).first()
+        if report is None:
+            if delta['days'] <= 0:
+                # Nothing to subtract from (e.g. the seller is being deleted)
+                return
+            report = cls(seller_id=seller_id, month=month, year=year)
+
+        days_worked = report.days_worked + delta['days']
+        if days_worked <= 0:
+            if report.pk:
+                report.delete()
+            return
+
+        for field in ROLLUP_FIELDS:
+            setattr(report, field, getattr(report, field) + delta[field])
+        report.average_daily_performance = cls.build_averages(
+            report.total_books_sold_money, report.total_books_given_free, report.total_houses_visited,
+            report.total_teachings_given, report.total_working_hours, days_worked,
         )
-        
-        if not daily_reports.exists():
+        report.save()
+
+    @classmethod
+    def generate_monthly_report(cls, seller, month, year):
+        """Generate (or refresh) one seller's monthly report from daily reports"""
+        reports = cls.generate_monthly_reports(month, year, sellers=[seller])
+        if not reports:
             return None
-            
-        total_books_sold = sum(report.books_sold_money for report in daily_reports)
-        total_books_free = sum(report.books_given_free for report in daily_reports)
-        total_houses = sum(report.houses_visited for report in daily_reports)
-        total_teachings = sum(report.teachings_given for report in daily_reports)
-        total_hours = sum(report.working_hours for report in daily_reports)
-        
-        days_worked = daily_reports.count()
-        
-        monthly_report, created = cls.objects.get_or_create(
-            seller=seller,
-            month=month,
-            year=year,
-            defaults={
-                'total_books_sold_money': total_books_sold,
-                'total_books_given_free': total_books_free,
-                'total_houses_visited': total_houses,
-                'total_teachings_given': total_teachings,
-                'total_working_hours': total_hours,
-                'average_daily_performance': {
-                    'avg_books_sold': round(total_books_sold / days_worked, 2) if days_worked > 0 else 0,
-                    'avg_books_free': round(total_books_free / days_worked, 2) if days_worked > 0 else 0,
-                    'avg_houses': round(total_houses / days_worked, 2) if days_worked > 0 else 0,
-                    'avg_teachings': round(total_teachings / days_worked, 2) if days_worked > 0 else 0,
-                    'avg_hours': round(float(total_hours) / days_worked, 2) if days_worked > 0 else 0,
-                    'days_worked': days_worked
-                }
-            }
+        return cls.objects.get(seller=seller, month=month, year=year)
+
+
+class SellerPerformance(models.Model):
+    """
+    Precomputed rolling 7/30/90-day totals, per-hour rates and streaks for a
+    seller, refreshed when their daily reports change and nightly by
+    ``manage.py refresh_seller_performance`` as the windows roll forward.
+    """
+    WINDOW_CHOICES = [(window, f'{window} days') for window in WINDOWS]
+    LEADERBOARD_METRICS = (
+        'books_sold', 'books_free', 'houses_visited', 'teachings_given', 'working_hours',
+        'books_per_hour', 'houses_per_hour', 'current_streak', 'longest_streak',
+    )
+
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='performance')
+    window_days = models.PositiveSmallIntegerField(choices=WINDOW_CHOICES)
+    as_of = models.DateField()
+    days_reported = models.PositiveIntegerField(default=0)
+    books_sold = models.IntegerField(default=0)
+    books_free = models.IntegerField(default=0)
+    houses_visited = models.IntegerField(default=0)
+    teachings_given = models.IntegerField(default=0)
+    working_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    books_per_hour = models.FloatField(default=0)
+    houses_per_hour = models.FloatField(default=0)
+    teachings_per_hour = models.FloatField(default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('seller', 'window_days')
+        indexes = [
+            models.Index(fields=['window_days', '-books_sold'], name='sellerperf_window_books_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id}: last {self.window_days} days as of {self.as_of}"
+
+    @classmethod
+    def refresh(cls, as_of=None, seller_ids=None):
+        """
+        Recompute the windows for every seller (or just ``seller_ids``) from one
+        query over the last 90 days of reports, then bulk upsert the rows.
+        """
+        as_of = as_of or timezone.localdate()
+        reports = DailyReport.objects.with_book_totals().filter(
+            date__gte=window_start(as_of), date__lte=as_of,
         )
-        
-        return monthly_report
+        stale = cls.objects.all()
+        if seller_ids is not None:
+            reports = reports.filter(seller_id__in=seller_ids)
+            stale = stale.filter(seller_id__in=seller_ids)
+
+        rows_by_seller = defaultdict(list)
+        for row in reports.values('seller_id', 'date', *[key for key in MEASURES.values()]):
+            rows_by_seller[row['seller_id']].append(row)
+
+        performances = [
+            cls(seller_id=seller_id, window_days=window, as_of=as_of, **metrics)
+            for seller_id, rows in rows_by_seller.items()
+            for window, metrics in window_metrics(rows, as_of).items()
+        ]
+        with transaction.atomic():
+            # Sellers with no reports in the widest window drop off the board
+            stale.exclude(seller_id__in=rows_by_seller.keys()).delete()
+            cls.objects.bulk_create(
+                performances,
+                update_conflicts=True,
+                unique_fields=['seller', 'window_days'],
+                update_fields=[
+                    field.name for field in cls._meta.concrete_fields
+                    if field.name not in ('id', 'seller', 'window_days')
+                ],
+            )
+        return len(rows_by_seller)
+
+    @classmethod
+    def refresh_for_reports(cls, *reports):
+        """Refresh the sellers of the given DailyReports if they fall in the 90-day window"""
+        as_of = timezone.localdate()
+        first_day = window_start(as_of)
+        date_field = DailyReport._meta.get_field('date')
+        seller_ids = {
+            report.seller_id for report in reports
+            if report is not None and first_day <= date_field.to_python(report.date) <= as_of
+        }
+        if seller_ids:
+            cls.refresh(as_of, seller_ids)
 
 
 class AnonymousOrder(models.Model):
@@ -153,3 +553,95 @@ class AnonymousOrder(models.Model):
     
     def __str__(self):
         return f"Anonymous Order - {self.customer_name} ({self.customer_email})"
+
+
+class Job(models.Model):
+    """
+    A unit of background work (report generation, export, backfill) processed
+    in bounded chunks by ``manage.py run_jobs``. ``state`` holds the handler's
+    cursor so a job interrupted mid-way resumes from its last finished chunk.
+    Handlers live in ``users/jobs.py``.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    state = models.JSONField(default=dict, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+    @classmethod
+    def enqueue(cls, kind, params=None, user=None):
+        return cls.objects.create(kind=kind, params=params or {}, created_by=user)
+
+    @classmethod
+    def claim_next(cls, stale_after):
+        """
+        Atomically take the oldest queued job, or a running job whose worker
+        stopped sending heartbeats ``stale_after`` ago. Returns ``None`` when
+        there is nothing to do.
+        """
+        now = timezone.now()
+        candidates = cls.objects.filter(
+            Q(status=cls.QUEUED) | Q(status=cls.RUNNING, heartbeat_at__lt=now - stale_after)
+        ).order_by('created_at', 'id').values_list('id', 'status', 'heartbeat_at')
+        for job_id, status, heartbeat_at in candidates[:10]:
+            # Compare-and-set so two workers never claim the same job
+            claimed = cls.objects.filter(id=job_id, status=status, heartbeat_at=heartbeat_at).update(
+                status=cls.RUNNING, heartbeat_at=now,
+                started_at=Coalesce('started_at', Value(now)),
+            )
+            if claimed:
+                return cls.objects.get(id=job_id)
+        return None
+
+    def save_progress(self, **fields):
+        """Persist the cursor and counters after a chunk and refresh the heartbeat"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.heartbeat_at = timezone.now()
+        self.save(update_fields={'state', 'processed', 'total', 'result', 'heartbeat_at', *fields})
+
+    def finish(self, error=''):
+        self.status = self.FAILED if error else self.SUCCEEDED
+        self.error = error
+        self.finished_at = self.heartbeat_at = timezone.now()
+        self.save(update_fields=['status', 'error', 'finished_at', 'heartbeat_at', 'state', 'processed', 'total', 'result'])
@@ -0,0 +1,110 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, next_cursor, cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        # Keyset pages only walk forward; "previous" means back to the first page
+        return self.cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _cursor_value(value):
+    # Keep full microsecond precision; DjangoJSONEncoder truncates to milliseconds
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_cursor_value(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def keyset_filter(queryset, cursor=None, ordering=('-created_at', '-id')):
+    """
+    Order ``queryset`` by ``ordering`` and seek past the row encoded in ``cursor``.
+
+    Returns the filtered queryset and the cursor actually applied (``None`` when
+    the cursor was missing or malformed).
+    """
+    model = queryset.model
+    fields = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+    if not cursor:
+        return queryset, None
+
+    try:
+        raw_values = decode_cursor(cursor)
+        values = [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(fields, raw_values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return queryset, None
+    if len(values) != len(fields):
+        return queryset, None
+
+    # Build (a < x) OR (a = x AND b < y) OR ... for the ordering tuple
+    seek = Q()
+    for index, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition = Q(**{f'{fields[index]}__{lookup}': values[index]})
+        for prior in range(index):
+            condition &= Q(**{fields[prior]: values[prior]})
+        seek |= condition
+    return queryset.filter(seek), cursor
+
+
+def keyset_paginate(queryset, cursor=None, per_page=20, ordering=('-created_at', '-id')):
+    """
+    Paginate ``queryset`` by seeking past the last row of the previous page.
+
+    Unlike ``Paginator`` this never runs ``COUNT(*)`` or ``OFFSET`` scans, so every
+    page costs one indexed range read no matter how deep the user pages. The
+    ``ordering`` fields must end with a unique column (usually ``id``) and be
+    backed by an index for the filters applied to ``queryset``.
+    """
+    queryset, cursor = keyset_filter(queryset, cursor, ordering)
+    fields = [name.lstrip('-') for name in ordering]
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name in fields])
+
+    return KeysetPage(rows, next_cursor, cursor)
@@ -0,0 +1,91 @@
+"""
+Rolling-window seller metrics over the last 7, 30 and 90 days.
+
+Each seller's daily reports are laid out as a dense day-by-measure matrix
+ending on ``as_of``; one prefix-sum pass per measure then yields every window
+total as a single subtraction. The results are stored in SellerPerformance
+(see ``SellerPerformance.refresh``) so the leaderboard never reads raw reports.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+WINDOWS = (7, 30, 90)
+MAX_WINDOW = max(WINDOWS)
+
+# Column of the report matrix -> key in the values() rows
+MEASURES = {
+    'books_sold': 'books_sold_total',
+    'books_free': 'books_free_total',
+    'houses_visited': 'houses_visited',
+    'teachings_given': 'teachings_given',
+    'working_hours': 'working_hours',
+}
+
+
+def window_start(as_of):
+    """First day covered by the widest window ending on ``as_of``"""
+    return as_of - timedelta(days=MAX_WINDOW - 1)
+
+
+def report_matrix(rows, as_of):
+    """
+    Dense per-day columns for one seller, oldest day first, plus a column of
+    1/0 flags for days with a report.
+    """
+    first_day = window_start(as_of)
+    columns = {name: [0] * MAX_WINDOW for name in MEASURES}
+    columns['working_hours'] = [Decimal('0')] * MAX_WINDOW
+    reported = [0] * MAX_WINDOW
+    for row in rows:
+        index = (row['date'] - first_day).days
+        if not 0 <= index < MAX_WINDOW:
+            continue
+        for name, key in MEASURES.items():
+            columns[name][index] += row[key] or 0
+        reported[index] = 1
+    return columns, reported
+
+
+def streaks(flags):
+    """Current streak (ending today, or yesterday if today is not in yet) and longest run"""
+    longest = run = 0
+    for flag in flags:
+        run = run + 1 if flag else 0
+        longest = max(longest, run)
+
+    end = len(flags) - 1
+    if end >= 0 and not flags[end]:
+        end -= 1
+    current = 0
+    while end >= 0 and flags[end]:
+        current += 1
+        end -= 1
+    return current, longest
+
+
+def rate(amount, hours):
+    return round(float(amount) / float(hours), 2) if hours else 0.0
+
+
+def window_metrics(rows, as_of):
+    """Return ``{window_days: metrics}`` for one seller's report rows"""
+    columns, reported = report_matrix(rows, as_of)
+    prefixes = {name: list(accumulate(values, initial=0)) for name, values in columns.items()}
+    reported_prefix = list(accumulate(reported, initial=0))
+
+    metrics = {}
+    for window in WINDOWS:
+        start = MAX_WINDOW - window
+        totals = {name: prefix[MAX_WINDOW] - prefix[start] for name, prefix in prefixes.items()}
+        current, longest = streaks(reported[start:])
+        metrics[window] = {
+            **totals,
+            'days_reported': reported_prefix[MAX_WINDOW] - reported_prefix[start],
+            'books_per_hour': rate(totals['books_sold'], totals['working_hours']),
+            'houses_per_hour': rate(totals['houses_visited'], totals['working_hours']),
+            'teachings_per_hour': rate(totals['teachings_given'], totals['working_hours']),
+            'current_streak': current,
+            'longest_streak': longest,
+        }
+    return metrics
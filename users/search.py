@@ -0,0 +1,57 @@
+"""
+User lookup for the manage-users page.
+
+Searches are prefix matches on username, email or phone number, written as
+``field >= prefix AND field < prefix-with-last-character-bumped`` ranges rather
+than ``startswith``: Django turns ``startswith`` into ``LIKE`` which SQLite
+matches case-insensitively and therefore cannot answer from an ordinary
+(binary collated) index. The ranges are served by ``users_auth_user_username_lower_idx``,
+``users_auth_user_email_lower_idx`` and ``userprofile_phone_idx``, so a search reads
+only the matching rows. Username and email are compared lowercased, against
+the ``lower(username)`` / ``lower(email)`` expression indexes, so "asha" finds
+"Asha". (SQLite's lower() folds ASCII only, which covers usernames, limited to
+letters, digits and underscores, and practically all email addresses.)
+
+Queries made only of digits, spaces and "+" are treated as phone numbers and
+normalized to the stored +255 form, so "0712", "712" and "+255712" find the
+same users.
+"""
+import re
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+_PHONE = re.compile(r'^\+?[\d ]+$')
+
+
+def prefix_range(field, prefix):
+    """``Q`` matching values of ``field`` that start with ``prefix``, as an index range"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+
+def phone_prefix(query):
+    """The +255 form of a (possibly partial) phone number, or ``None``"""
+    if not _PHONE.match(query):
+        return None
+    digits = query.replace(' ', '').lstrip('+')
+    if query.startswith('+') or digits.startswith('255'):
+        return '+' + digits
+    return '+255' + digits[1:] if digits.startswith('0') else '+255' + digits
+
+
+def search_users(queryset, query='', role=''):
+    """Narrow a ``User`` queryset to ``query`` prefix matches and profile ``role``"""
+    query = query.strip()
+    if query:
+        phone = phone_prefix(query)
+        if phone:
+            queryset = queryset.filter(prefix_range('userprofile__phone_number', phone))
+        else:
+            prefix = query.lower()
+            queryset = queryset.alias(username_lower=Lower('username'), email_lower=Lower('email')).filter(
+                prefix_range('username_lower', prefix) | prefix_range('email_lower', prefix)
+            )
+    if role:
+        queryset = queryset.filter(userprofile__role=role)
+    return queryset
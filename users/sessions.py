@@ -0,0 +1,132 @@
+"""
+Cache-first session engine that rarely writes to the database
+(``SESSION_ENGINE = 'users.sessions'``).
+
+Sessions are read from the ``SESSION_CACHE_ALIAS`` cache and fall back to
+``django_session`` on a miss, like Django's ``cached_db`` engine. The
+difference is in ``save()``: with ``SESSION_SAVE_EVERY_REQUEST`` the stock
+engines UPDATE ``django_session`` on every request just to slide the expiry,
+and on SQLite each of those takes the single writer lock. Here a save only
+reaches the database when
+
+* the session data changed (``modified``), or
+* less than ``SESSION_REFRESH_FRACTION`` of the session lifetime is left on the
+  stored expiry date.
+
+Otherwise it is a no-op, so plain browsing is read-only. The trade-off is that
+an idle session expires between ``(1 - SESSION_REFRESH_FRACTION)`` and one full
+``SESSION_COOKIE_AGE`` after the last request, rather than exactly one age
+after it.
+
+Writes that do happen go to the database first and then to the cache, so the
+database stays authoritative. The cache entry holds the expiry date alongside
+the data so that the refresh decision costs no query. All worker processes
+must share the cache (see ``CACHES['sessions']``); a per-process cache would
+serve stale sessions.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+KEY_PREFIX = 'users.sessions'
+
+logger = logging.getLogger('django.contrib.sessions')
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_expiry = None  # expire_date of the django_session row, once known
+        self._written = None
+
+    def needs_write(self):
+        """Whether ``save()`` has to reach the database"""
+        if self.modified or self._stored_expiry is None:
+            return True
+        remaining = (self._stored_expiry - timezone.now()).total_seconds()
+        return remaining < self.get_expiry_age() * settings.SESSION_REFRESH_FRACTION
+
+    def _remember(self, data, expiry):
+        self._stored_expiry = expiry
+        try:
+            self._cache.set(self.cache_key, (data, expiry), self.get_expiry_age(expiry=expiry))
+        except Exception:
+            logger.exception("Error saving to cache (%s)", self._cache)
+
+    async def _aremember(self, data, expiry):
+        self._stored_expiry = expiry
+        try:
+            await self._cache.aset(
+                await self.acache_key(), (data, expiry), await self.aget_expiry_age(expiry=expiry),
+            )
+        except Exception:
+            logger.exception("Error saving to cache (%s)", self._cache)
+
+    def load(self):
+        try:
+            cached = self._cache.get(self.cache_key)
+        except Exception:
+            # Invalid keys raise on some backends; treat as a miss like cached_db
+            cached = None
+        if cached is not None:
+            data, self._stored_expiry = cached
+            return data
+
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        self._remember(data, s.expire_date)
+        return data
+
+    async def aload(self):
+        try:
+            cached = await self._cache.aget(await self.acache_key())
+        except Exception:
+            cached = None
+        if cached is not None:
+            data, self._stored_expiry = cached
+            return data
+
+        s = await self._aget_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        await self._aremember(data, s.expire_date)
+        return data
+
+    def create_model_instance(self, data):
+        obj = super().create_model_instance(data)
+        self._written = (data, obj.expire_date)
+        return obj
+
+    async def acreate_model_instance(self, data):
+        obj = await super().acreate_model_instance(data)
+        self._written = (data, obj.expire_date)
+        return obj
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None:
+            self._get_session()  # Loads the stored expiry date
+            if self.session_key is not None and not self.needs_write():
+                return
+        if self.session_key is None:
+            return self.create()
+        # Skip cached_db's own cache write; ours also records the expiry date
+        DBStore.save(self, must_create)
+        self._remember(*self._written)
+
+    async def asave(self, must_create=False):
+        if not must_create and self.session_key is not None:
+            await self._aget_session()
+            if self.session_key is not None and not self.needs_write():
+                return
+        if self.session_key is None:
+            return await self.acreate()
+        await DBStore.asave(self, must_create)
+        await self._aremember(*self._written)
@@ -1,31 +1,46 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from products.models import Order
+from .dashboard import invalidate_dashboard_stats
+from .models import AnonymousOrder, DailyReport, MonthlyReport, SellerPerformance, UserProfile
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
     """
-    Signal to create a UserProfile whenever a new User is created.
+    Create the UserProfile of a new User, exactly once.
+
+    Code creating a user sets ``user._profile_defaults`` (e.g. phone number,
+    role, created_by) before saving it instead of creating or saving the
+    profile itself. Later User saves, such as the last_login update on every
+    login, never touch the profile.
     """
-    if created:
-        # Create a UserProfile and link it to the User, only passing the required fields
-        UserProfile.objects.create(
-            user=instance,  # Link UserProfile to the User
-            phone_number=''  # Default empty phone number, or you can add logic for this
-        )
+    if created and not raw:
+        defaults = {'phone_number': '', **getattr(instance, '_profile_defaults', {})}
+        UserProfile.objects.create(user=instance, **defaults)
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+
+@receiver(post_delete, sender=DailyReport)
+def remove_daily_report_from_month(sender, instance, **kwargs):
     """
-    Signal to save UserProfile whenever the associated User instance is saved.
+    Subtract a deleted daily report from its seller's monthly totals.
+    Runs inside the delete's transaction, including bulk and cascade deletes.
     """
-    try:
-        # Attempt to save the UserProfile if it already exists
-        instance.userprofile.save()
-    except UserProfile.DoesNotExist:
-        # If the UserProfile does not exist, create it with only required fields
-        UserProfile.objects.create(
-            user=instance,
-            phone_number=''  # Default empty phone number, or you can add logic for this
-        )
+    MonthlyReport.record_daily_change(old=instance)
+    SellerPerformance.refresh_for_reports(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=AnonymousOrder)
+@receiver(post_delete, sender=AnonymousOrder)
+def refresh_dashboard_stats(sender, update_fields=None, **kwargs):
+    """Drop the superuser dashboard snapshot when a counted table changes."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # Logins touch no counter
+        return
+    invalidate_dashboard_stats()
@@ -1,3 +1,971 @@
-from django.test import TestCase
+import json
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
 # Create your tests here.
+from products.models import Cart, Category, Order, Product
+from .dashboard import STATS_CACHE_KEY, dashboard_stats, stats_cache
+from .importing import ADMIN_MAX_ROWS, import_users
+from .jobs import export_path, run_job
+from .maintenance import purge, purge_expired
+from .models import (
+    ROLLUP_FIELDS, DailyReport, DailyReportLine, Job, MonthlyReport, PasswordResetCode, SellerPerformance, User,
+    UserProfile,
+)
+from .pagination import keyset_paginate
+from .performance import streaks, window_metrics
+from .search import search_users
+from .views import MAX_BATCH_DAYS
+from .sessions import SessionStore
+
+
+def writes(queries, table):
+    """INSERT/UPDATE/DELETE statements against ``table`` in the captured queries"""
+    return [
+        query['sql'] for query in queries
+        if query['sql'].split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE') and f'"{table}"' in query['sql']
+    ]
+
+
+class ProfileWriteTests(TestCase):
+    """The profile is created once per user and only written when it changes"""
+
+    password = 'Vitabu-2024!'
+
+    def create_user(self, username, role='buyer'):
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password(self.password)
+        user._profile_defaults = {'phone_number': '+255700000000', 'role': role}
+        user.save()
+        return user
+
+    def test_registration_creates_one_profile(self):
+        data = {
+            'first_name': 'Asha', 'last_name': 'Mushi', 'username': 'asha',
+            'email': 'asha@example.com', 'phone_number': '+255712345678',
+            'password1': self.password, 'password2': self.password,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('register'), data)
+
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(len(writes(queries, 'auth_user')), 1)
+        self.assertEqual(len(writes(queries, 'users_userprofile')), 1)
+        profile = UserProfile.objects.get(user__username='asha')
+        self.assertEqual((profile.phone_number, profile.role), ('+255712345678', 'buyer'))
+
+    def test_login_does_not_write_profile(self):
+        self.create_user('seller1', role='seller')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {'username': 'seller1', 'password': self.password})
+
+        self.assertRedirects(response, reverse('seller_dashboard'), fetch_redirect_response=False)
+        # Only Django's last_login stamp
+        self.assertEqual(len(writes(queries, 'auth_user')), 1)
+        self.assertEqual(writes(queries, 'users_userprofile'), [])
+
+    def test_login_without_profile_does_not_create_one(self):
+        user = self.create_user('legacy')
+        UserProfile.objects.filter(user=user).delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {'username': 'legacy', 'password': self.password})
+
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(writes(queries, 'users_userprofile'), [])
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+
+    def test_manage_users_creates_one_profile(self):
+        admin = self.create_user('admin1', role='superuser')
+        self.client.force_login(admin)
+        data = {
+            'username': 'seller2', 'email': 'seller2@example.com', 'password': self.password,
+            'role': 'seller', 'phone_number': '+255799999999',
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('manage_users'), data)
+
+        self.assertRedirects(response, reverse('manage_users'), fetch_redirect_response=False)
+        self.assertEqual(len(writes(queries, 'auth_user')), 1)
+        self.assertEqual(len(writes(queries, 'users_userprofile')), 1)
+        profile = UserProfile.objects.get(user__username='seller2')
+        self.assertEqual((profile.role, profile.phone_number, profile.created_by), ('seller', '+255799999999', admin))
+
+    def test_saving_user_does_not_write_profile(self):
+        user = self.create_user('buyer1')
+        user.first_name = 'Neema'
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(writes(queries, 'users_userprofile'), [])
+
+    def test_profile_saves_only_changed_columns(self):
+        profile = UserProfile.objects.get(user=self.create_user('buyer2'))
+        with self.assertNumQueries(0):
+            profile.save()
+
+        profile.phone_number = '+255711111111'
+        with CaptureQueriesContext(connection) as queries:
+            profile.save()
+        [update] = writes(queries, 'users_userprofile')
+        self.assertIn('"phone_number"', update)
+        self.assertNotIn('"role"', update)
+        self.assertEqual(UserProfile.objects.get(pk=profile.pk).phone_number, '+255711111111')
+
+
+class SellerOrderUpdateTests(TestCase):
+    """Dashboard updates expose only ids and statuses; details are permission checked"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        UserProfile.objects.filter(user=self.seller).update(role='seller')
+        self.other = User.objects.create_user('seller2', password='x')
+        UserProfile.objects.filter(user=self.other).update(role='seller')
+        self.client.force_login(self.seller)
+
+    def create_order(self, **fields):
+        order = Order.objects.create(
+            customer_name='Asha', customer_email='asha@example.com', customer_phone='+255712345678',
+            delivery_address='Arusha', total_amount=Decimal('10000.00'), **fields,
+        )
+        order.record_event('created')
+        return order
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get(reverse('seller_order_events'))
+        self.assertEqual(response.status_code, 204)
+
+    def test_poll_returns_ids_and_statuses_only(self):
+        order = self.create_order()
+        response = self.client.get(reverse('seller_order_updates'), {'after': 0})
+        body = response.json()
+        self.assertEqual(body['events'], [
+            {'id': body['last_id'], 'type': 'order_created', 'data': {'id': order.id, 'status': 'pending'}},
+        ])
+        self.assertEqual(self.client.get(reverse('seller_order_updates'), {'after': body['last_id']}).json()['events'], [])
+
+    def test_detail_hides_other_sellers_orders(self):
+        pending = self.create_order()
+        taken = self.create_order(status='accepted', seller=self.other)
+        mine = self.create_order(status='accepted', seller=self.seller)
+
+        self.assertEqual(self.client.get(reverse('seller_order_detail', args=[pending.id])).json()['customer_name'], 'Asha')
+        self.assertEqual(self.client.get(reverse('seller_order_detail', args=[mine.id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('seller_order_detail', args=[taken.id])).status_code, 404)
+
+
+def make_report(seller, day, sold=0, free=0, houses=0, hours='0'):
+    return DailyReport.objects.create(
+        seller=seller, date=day,
+        books_sold_details=[{'book_name': 'Bible', 'quantity': sold}] if sold else [],
+        books_given_free_details=[{'book_name': 'Tract', 'quantity': free}] if free else [],
+        houses_visited=houses, working_hours=Decimal(hours),
+    )
+
+
+class MonthlyReportGenerationTests(TestCase):
+    """Monthly reports for every seller come from one grouped query and refresh stale rows"""
+
+    def setUp(self):
+        self.sellers = [User.objects.create_user(f'seller{n}', password='x') for n in range(3)]
+        for number, seller in enumerate(self.sellers, start=1):
+            make_report(seller, date(2024, 3, 1), sold=number, free=1, houses=2, hours='4')
+            make_report(seller, date(2024, 3, 2), sold=number, houses=4, hours='6')
+        make_report(self.sellers[0], date(2024, 4, 1), sold=50)  # Other month
+
+    def test_totals_for_all_sellers_in_one_query(self):
+        MonthlyReport.objects.all().delete()
+        with self.assertNumQueries(2):  # GROUP BY, bulk upsert
+            MonthlyReport.generate_monthly_reports(3, 2024)
+
+        report = MonthlyReport.objects.get(seller=self.sellers[2], month=3, year=2024)
+        self.assertEqual(
+            (report.total_books_sold_money, report.total_books_given_free, report.total_houses_visited),
+            (6, 1, 6),
+        )
+        self.assertEqual(report.total_working_hours, Decimal('10'))
+        self.assertEqual(report.average_daily_performance['avg_books_sold'], 3)
+        self.assertEqual(report.days_worked, 2)
+        self.assertEqual(MonthlyReport.objects.filter(month=3, year=2024).count(), 3)
+
+    def test_refreshes_an_existing_report(self):
+        MonthlyReport.objects.filter(seller=self.sellers[0], month=3).update(total_books_sold_money=999)
+
+        report = MonthlyReport.generate_monthly_report(self.sellers[0], 3, 2024)
+
+        self.assertEqual(report.total_books_sold_money, 2)
+        self.assertIsNone(MonthlyReport.generate_monthly_report(self.sellers[0], 5, 2024))
+
+
+class ReportLineBackfillTests(TestCase):
+    """Existing reports get their line rows, with one product lookup per batch"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        self.bible = Product.objects.create(
+            name='Bible', price=Decimal('5000.00'), image='product_images/test.jpg', description='Bible',
+            category=Category.objects.create(name='Books'), stock=10, slug='bible',
+        )
+        self.reports = [make_report(self.seller, date(2024, 3, day), sold=day, free=1) for day in (1, 2, 3)]
+        DailyReportLine.objects.all().delete()  # As before the lines existed
+
+    def lines(self):
+        return sorted(DailyReportLine.objects.values_list('report__date__day', 'kind', 'product_id', 'quantity'))
+
+    def expected(self):
+        return sorted(
+            [(day, DailyReportLine.SOLD, self.bible.id, day) for day in (1, 2, 3)]
+            + [(day, DailyReportLine.FREE, None, 1) for day in (1, 2, 3)]
+        )
+
+    def test_rebuild_lines_batches_queries(self):
+        with self.assertNumQueries(3):  # Delete, product names, insert
+            DailyReport.rebuild_lines(self.reports)
+        self.assertEqual(self.lines(), self.expected())
+
+    def test_migration_backfills_reports_without_lines(self):
+        migration = import_module('users.migrations.0013_backfill_report_lines')
+        migration.backfill_report_lines(apps, None)
+
+        self.assertEqual(self.lines(), self.expected())
+        self.assertEqual(DailyReport.objects.with_book_totals().get(date=date(2024, 3, 2)).books_sold_total, 2)
+
+
+class MonthlyRollupDeltaTests(TestCase):
+    """Daily report saves and deletes keep MonthlyReport equal to a full recompute"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+
+    def month(self, month=3):
+        return MonthlyReport.objects.filter(seller=self.seller, month=month, year=2024).first()
+
+    def assertMatchesRecompute(self, month=3):
+        stored = self.month(month)
+        [expected] = MonthlyReport.compute_monthly_reports(month, 2024, sellers=[self.seller])
+        for field in ROLLUP_FIELDS + ('average_daily_performance',):
+            self.assertEqual(getattr(stored, field), getattr(expected, field), field)
+
+    def test_create_and_update_apply_deltas(self):
+        first = make_report(self.seller, date(2024, 3, 1), sold=3, free=1, houses=2, hours='4.5')
+        make_report(self.seller, date(2024, 3, 2), sold=5, houses=1, hours='3')
+        self.assertEqual((self.month().total_books_sold_money, self.month().days_worked), (8, 2))
+
+        first.books_sold_details = [{'book_name': 'Bible', 'quantity': 10}]
+        first.houses_visited = 7
+        first.save()
+
+        self.assertEqual((self.month().total_books_sold_money, self.month().total_houses_visited), (15, 8))
+        self.assertMatchesRecompute()
+
+    def test_moving_a_report_updates_both_months(self):
+        report = make_report(self.seller, date(2024, 3, 1), sold=3)
+        make_report(self.seller, date(2024, 3, 2), sold=2)
+
+        report.date = date(2024, 4, 1)
+        report.save()
+
+        self.assertEqual(self.month(3).total_books_sold_money, 2)
+        self.assertEqual(self.month(4).total_books_sold_money, 3)
+        self.assertMatchesRecompute(3)
+        self.assertMatchesRecompute(4)
+
+    def test_deleting_the_last_report_removes_the_month(self):
+        first = make_report(self.seller, date(2024, 3, 1), sold=3)
+        second = make_report(self.seller, date(2024, 3, 2), sold=2)
+
+        first.delete()
+        self.assertEqual((self.month().total_books_sold_money, self.month().days_worked), (2, 1))
+        DailyReport.objects.filter(pk=second.pk).delete()
+        self.assertIsNone(self.month())
+
+
+class DailyReportBatchTests(TestCase):
+    """Batch submissions are validated as a whole and saved with bulk queries"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller1', password='x')
+        UserProfile.objects.filter(user=self.seller).update(role='seller')
+        self.client.force_login(self.seller)
+        self.today = timezone.localdate()
+
+    def day(self, days_back):
+        return self.today - timedelta(days=days_back)
+
+    def entry(self, days_back, sold=0, **fields):
+        return {
+            'date': self.day(days_back).isoformat(),
+            'books_sold': [{'book_name': 'Bible', 'quantity': sold}] if sold else [],
+            **fields,
+        }
+
+    def post(self, *entries):
+        return self.client.post(
+            reverse('daily_report_batch'), json.dumps({'reports': list(entries)}), content_type='application/json',
+        )
+
+    def test_one_bad_day_rejects_the_whole_batch(self):
+        response = self.post(self.entry(1, sold=2), self.entry(2, houses_visited=-1), self.entry(-1, sold=1))
+
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertFalse(body['saved'])
+        self.assertEqual([sorted(result.get('errors', {})) for result in body['results']], [[], ['houses_visited'], ['date']])
+        self.assertFalse(DailyReport.objects.exists())
+        self.assertFalse(MonthlyReport.objects.exists())
+        self.assertFalse(SellerPerformance.objects.exists())
+
+    def test_duplicate_dates_are_rejected(self):
+        response = self.post(self.entry(1, sold=2), self.entry(1, sold=3))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][1]['errors'], {'date': ['Duplicate date in batch.']})
+        self.assertFalse(DailyReport.objects.exists())
+
+    def test_batch_size_is_limited(self):
+        response = self.post(*[self.entry(days_back) for days_back in range(MAX_BATCH_DAYS + 1)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MAX_BATCH_DAYS), response.json()['error'])
+        self.assertFalse(DailyReport.objects.exists())
+
+    def test_statuses_say_which_days_were_created_or_updated(self):
+        make_report(self.seller, self.day(2), sold=1)
+
+        response = self.post(self.entry(1, sold=2), self.entry(2, sold=4))
+
+        self.assertEqual(response.json(), {'saved': True, 'results': [
+            {'date': self.day(1).isoformat(), 'status': 'created'},
+            {'date': self.day(2).isoformat(), 'status': 'updated'},
+        ]})
+        self.assertEqual(DailyReport.objects.filter(seller=self.seller).count(), 2)
+
+    def test_lines_months_and_performance_stay_in_step(self):
+        make_report(self.seller, self.day(3), sold=1, free=2, hours='2')
+        make_report(self.seller, self.day(40), sold=9, hours='5')
+
+        statuses = DailyReport.bulk_upsert(self.seller, [
+            {'date': self.day(3), 'books_sold_details': [{'book_name': 'Bible', 'quantity': 5}],
+             'books_given_free_details': [], 'houses_visited': 4, 'working_hours': Decimal('3')},
+            {'date': self.day(4), 'books_sold_details': [{'book_name': 'Hymnal', 'quantity': 2}],
+             'books_given_free_details': [{'book_name': 'Tract', 'quantity': 3}], 'working_hours': Decimal('1.5')},
+        ])
+
+        self.assertEqual(statuses, {self.day(3): 'updated', self.day(4): 'created'})
+        self.assertEqual(
+            sorted(DailyReportLine.objects.values_list('report__date', 'kind', 'book_name', 'quantity')),
+            sorted([
+                (self.day(3), 'sold', 'Bible', 5), (self.day(4), 'sold', 'Hymnal', 2),
+                (self.day(4), 'free', 'Tract', 3), (self.day(40), 'sold', 'Bible', 9),
+            ]),
+        )
+
+        months = {(day.month, day.year) for day in (self.day(3), self.day(4), self.day(40))}
+        for month, year in months:
+            stored = MonthlyReport.objects.get(seller=self.seller, month=month, year=year)
+            [expected] = MonthlyReport.compute_monthly_reports(month, year, sellers=[self.seller])
+            for field in ROLLUP_FIELDS + ('average_daily_performance',):
+                self.assertEqual(getattr(stored, field), getattr(expected, field), field)
+
+        def performance():
+            return sorted(SellerPerformance.objects.filter(seller=self.seller).values_list(
+                'window_days', 'books_sold', 'books_free', 'houses_visited', 'working_hours', 'days_reported',
+            ))
+        incremental = performance()
+        self.assertEqual(incremental[0], (7, 7, 3, 4, Decimal('4.50'), 2))
+        SellerPerformance.refresh(seller_ids=[self.seller.id])
+        self.assertEqual(performance(), incremental)
+
+
+def performance_row(day, sold=0, free=0, houses=0, teachings=0, hours='0'):
+    return {
+        'date': day, 'books_sold_total': sold, 'books_free_total': free,
+        'houses_visited': houses, 'teachings_given': teachings, 'working_hours': Decimal(hours),
+    }
+
+
+class SellerPerformanceTests(TestCase):
+    """Window totals, rates and streaks match a hand-computed report matrix"""
+
+    as_of = date(2024, 6, 30)
+
+    def day(self, days_back):
+        return self.as_of - timedelta(days=days_back)
+
+    def test_window_sums_rates_and_streaks(self):
+        rows = [
+            performance_row(self.day(0), sold=4, houses=6, teachings=1, hours='2'),
+            performance_row(self.day(1), sold=2, houses=3),  # Reported with zero hours
+            performance_row(self.day(3), sold=6, free=1, hours='3'),
+            performance_row(self.day(10), sold=5, hours='5'),
+            performance_row(self.day(11), sold=1, hours='1'),
+            performance_row(self.day(12), sold=1, hours='1'),
+            performance_row(self.day(40), sold=10, hours='4'),
+            performance_row(self.day(95), sold=99, hours='9'),  # Outside every window
+        ]
+        metrics = window_metrics(rows, self.as_of)
+
+        summary = {
+            window: (m['books_sold'], m['books_free'], m['houses_visited'], m['working_hours'], m['days_reported'],
+                     m['books_per_hour'], m['houses_per_hour'], m['teachings_per_hour'])
+            for window, m in metrics.items()
+        }
+        self.assertEqual(summary, {
+            7: (12, 1, 9, Decimal('5'), 3, 2.4, 1.8, 0.2),
+            30: (19, 1, 9, Decimal('12'), 6, 1.58, 0.75, 0.08),
+            90: (29, 1, 9, Decimal('16'), 7, 1.81, 0.56, 0.06),
+        })
+        # Days 0-1 are the current run; days 10-12 are the longest once the window reaches them
+        self.assertEqual(
+            {window: (m['current_streak'], m['longest_streak']) for window, m in metrics.items()},
+            {7: (2, 2), 30: (2, 3), 90: (2, 3)},
+        )
+
+    def test_zero_hours_give_zero_rates(self):
+        metrics = window_metrics([performance_row(self.day(2), sold=3, houses=4)], self.as_of)
+        self.assertEqual(
+            (metrics[7]['books_per_hour'], metrics[7]['houses_per_hour'], metrics[7]['teachings_per_hour']),
+            (0.0, 0.0, 0.0),
+        )
+
+    def test_streaks(self):
+        self.assertEqual(streaks([]), (0, 0))
+        self.assertEqual(streaks([1, 1, 0, 1, 1, 1]), (3, 3))
+        # Today not reported yet: the streak ending yesterday still counts
+        self.assertEqual(streaks([1, 1, 1, 0, 1, 1, 0]), (2, 3))
+        self.assertEqual(streaks([1, 0, 0]), (0, 1))
+
+    def test_report_saves_and_deletes_refresh_the_seller(self):
+        seller = User.objects.create_user('seller1', password='x')
+        today = timezone.localdate()
+        report = make_report(seller, today, sold=3, hours='2')
+        make_report(seller, today - timedelta(days=20), sold=5, hours='3')
+
+        performance = {row.window_days: row for row in SellerPerformance.objects.filter(seller=seller)}
+        self.assertEqual({window: row.books_sold for window, row in performance.items()}, {7: 3, 30: 8, 90: 8})
+        self.assertEqual(performance[7].books_per_hour, 1.5)
+        self.assertEqual(performance[7].as_of, today)
+
+        report.books_sold_details = [{'book_name': 'Bible', 'quantity': 7}]
+        report.save()
+        self.assertEqual(SellerPerformance.objects.get(seller=seller, window_days=30).books_sold, 12)
+
+        report.delete()
+        self.assertEqual(SellerPerformance.objects.get(seller=seller, window_days=7).days_reported, 0)
+        DailyReport.objects.filter(seller=seller).delete()
+        self.assertFalse(SellerPerformance.objects.filter(seller=seller).exists())
+
+    def test_leaderboard_reads_only_the_precomputed_table(self):
+        seller = User.objects.create_user('seller1', password='x')
+        UserProfile.objects.filter(user=seller).update(role='seller')
+        make_report(seller, timezone.localdate(), sold=4, hours='2')
+        # Changed behind the signals: the board keeps showing the stored rows
+        DailyReport.objects.update(working_hours=Decimal('8'))
+        self.client.force_login(seller)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(reverse('leaderboard'), {'window': 7}), 'seller1')
+            response = self.client.get(reverse('leaderboard_json'), {'window': 7})
+
+        self.assertFalse([query['sql'] for query in queries if 'users_dailyreport' in query['sql']])
+        [row] = response.json()['results']
+        self.assertEqual((row['seller'], row['books_sold'], row['books_per_hour']), ('seller1', 4, 2.0))
+
+
+class ReportFilterTests(TestCase):
+    """Malformed report filters are rejected with a message instead of a server error"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        make_report(User.objects.create_user('seller1', password='x'), date(2024, 3, 1), sold=2)
+
+    def test_valid_filters_list_reports(self):
+        response = self.client.get(reverse('view_reports'), {'date_from': '2024-03-01', 'date_to': '2024-03-31'})
+        self.assertEqual(response.context['total_reports'], 1)
+
+    def test_malformed_dates_redirect_with_an_error(self):
+        for value in ('yesterday', '2024-02-30'):
+            for name in ('view_reports', 'export_daily_reports', 'export_book_sales'):
+                response = self.client.get(reverse(name), {'date_from': value}, follow=True)
+                self.assertRedirects(response, reverse('view_reports'))
+                self.assertContains(response, 'Invalid seller or date filter.')
+
+    def test_malformed_filters_queue_no_export(self):
+        url = reverse('enqueue_export', args=['daily'])
+        self.client.post(f'{url}?date_to=2024-3-x')
+        self.client.post(f'{url}?seller=abc')
+        self.assertFalse(Job.objects.exists())
+
+        self.client.post(f'{url}?date_to=2024-03-31')
+        self.assertEqual(Job.objects.get().params['filters'], {'date_to': '2024-03-31'})
+
+
+class DailyReportFormTests(TestCase):
+    """The daily report form pairs each typed title with its quantity"""
+
+    def test_saves_typed_titles_and_skips_empty_rows(self):
+        seller = User.objects.create_user('seller1', password='x')
+        seller.userprofile.role = 'seller'
+        seller.userprofile.save()
+        self.client.force_login(seller)
+
+        self.client.post(reverse('daily_report'), {
+            'book_sold_name[]': ['Bible ', 'Not In Catalogue', ''],
+            'book_sold_quantity[]': ['2', '1', '3'],
+            'book_free_name[]': ['Tract'],
+            'book_free_quantity[]': ['0'],
+            'houses_visited': '4', 'teachings_given': '1', 'working_hours': '5',
+        })
+
+        report = DailyReport.objects.get(seller=seller)
+        self.assertEqual(report.books_sold_details, [
+            {'book_name': 'Bible', 'quantity': 2}, {'book_name': 'Not In Catalogue', 'quantity': 1},
+        ])
+        self.assertEqual(report.books_given_free_details, [])
+
+
+class JobRunnerTests(TestCase):
+    """Jobs are claimed once, reclaimed when their worker goes quiet, and resume from their cursor"""
+
+    stale_after = timedelta(minutes=5)
+
+    def test_claims_oldest_queued_job_once(self):
+        first = Job.enqueue('backfill_report_lines')
+        second = Job.enqueue('backfill_report_lines')
+
+        claimed = Job.claim_next(self.stale_after)
+        self.assertEqual((claimed.pk, claimed.status), (first.pk, Job.RUNNING))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(Job.claim_next(self.stale_after).pk, second.pk)
+        self.assertIsNone(Job.claim_next(self.stale_after))
+
+    def test_reclaims_running_job_only_after_heartbeat_goes_stale(self):
+        job = Job.enqueue('backfill_report_lines')
+        started = Job.claim_next(self.stale_after).started_at
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=1))
+        self.assertIsNone(Job.claim_next(self.stale_after))
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        reclaimed = Job.claim_next(self.stale_after)
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertEqual(reclaimed.started_at, started)
+        self.assertGreater(reclaimed.heartbeat_at, timezone.now() - timedelta(minutes=1))
+        self.assertIsNone(Job.claim_next(self.stale_after))
+
+    def test_requeued_job_resumes_from_its_cursor(self):
+        seller = User.objects.create_user('seller1', password='x')
+        reports = [make_report(seller, date(2024, 3, day), sold=1) for day in (1, 2, 3)]
+        DailyReportLine.objects.all().delete()
+        Job.enqueue('backfill_report_lines')
+
+        job = run_job(Job.claim_next(self.stale_after), chunk_size=1, max_chunks=2)
+        self.assertEqual((job.status, job.processed, job.state), (Job.QUEUED, 2, {'after': reports[1].id}))
+        self.assertEqual(DailyReportLine.objects.count(), 2)
+
+        job = run_job(Job.claim_next(self.stale_after), chunk_size=1)
+        self.assertEqual((job.status, job.processed, job.total), (Job.SUCCEEDED, 3, 3))
+        self.assertEqual(DailyReportLine.objects.count(), 3)
+
+    def test_failures_and_unknown_kinds_are_recorded(self):
+        Job.enqueue('no_such_kind')
+        Job.enqueue('monthly_reports', {'month': 13, 'year': 2024})
+
+        unknown = run_job(Job.claim_next(self.stale_after))
+        with self.assertLogs('users.jobs', 'ERROR'):
+            broken = run_job(Job.claim_next(self.stale_after))
+
+        self.assertEqual((unknown.status, unknown.error), (Job.FAILED, "Unknown job kind 'no_such_kind'"))
+        self.assertEqual(broken.status, Job.FAILED)
+        self.assertTrue(broken.error.startswith('ValueError'))
+
+    def test_export_job_writes_every_row(self):
+        seller = User.objects.create_user('seller1', password='x')
+        for day in range(1, 6):
+            make_report(seller, date(2024, 3, day), sold=day)
+        Job.enqueue('export', {'report': 'daily', 'filters': {'date_from': '2024-03-02'}})
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(JOB_EXPORT_DIR=directory):
+            job = run_job(Job.claim_next(self.stale_after), chunk_size=2)
+            lines = export_path(job).read_text().splitlines()
+
+        self.assertEqual((job.status, job.processed), (Job.SUCCEEDED, 4))
+        self.assertEqual(lines[0].split(',')[:2], ['Seller', 'Date'])
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], [f'2024-03-0{day}' for day in (5, 4, 3, 2)])
+
+
+def import_row(username, role='', phone=None):
+    return {
+        'username': username, 'email': f'{username}@example.com', 'password': 'Vitabu-2024!',
+        'first_name': username.title(), 'last_name': '', 'phone_number': phone or '+2557000000%02d' % len(username),
+        'role': role,
+    }
+
+
+class UserImportTests(TestCase):
+    """Bulk import validates the whole file first and writes users and profiles in bulk"""
+
+    def csv_upload(self, rows):
+        lines = ['username,email,password,first_name,last_name,phone_number,role']
+        lines += [','.join(row[column] for column in ('username', 'email', 'password', 'first_name', 'last_name',
+                                                          'phone_number', 'role')) for row in rows]
+        return SimpleUploadedFile('users.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+    def test_creates_users_and_profiles_in_bulk(self):
+        rows = [import_row('asha'), import_row('baraka', 'buyer'), import_row('chausiku')]
+        with CaptureQueriesContext(connection) as queries:
+            result = import_users(rows, workers=1)
+
+        self.assertEqual(result, {'created': 3, 'errors': {}})
+        self.assertEqual(len(writes(queries, 'auth_user')), 1)
+        self.assertEqual(len(writes(queries, 'users_userprofile')), 1)
+        self.assertEqual(
+            sorted(UserProfile.objects.values_list('user__username', 'role')),
+            [('asha', 'seller'), ('baraka', 'buyer'), ('chausiku', 'seller')],
+        )
+        self.assertTrue(User.objects.get(username='asha').check_password('Vitabu-2024!'))
+
+    def test_invalid_rows_write_nothing(self):
+        User.objects.create_user('taken', password='x')
+        rows = [import_row('asha'), import_row('asha'), import_row('taken'), import_row('neema', 'admin')]
+
+        result = import_users(rows, workers=1)
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(sorted(result['errors']), [3, 4, 5])
+        self.assertIn("username 'asha' repeats line 2", result['errors'][3])
+        self.assertIn("username 'taken' is already registered", result['errors'][4])
+        self.assertIn("unknown role 'admin'", result['errors'][5])
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_admin_staff_cannot_create_superusers(self):
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        staff.user_permissions.add(*Permission.objects.filter(codename__in=('add_user', 'view_userprofile')))
+        self.client.force_login(staff)
+        url = reverse('admin:users_userprofile_import')
+
+        response = self.client.post(url, {'csv_file': self.csv_upload([import_row('boss', 'superuser')])})
+        self.assertContains(response, "you may not create &#x27;superuser&#x27; accounts")
+        self.assertFalse(User.objects.filter(username='boss').exists())
+
+        self.client.post(url, {'csv_file': self.csv_upload([import_row('asha')])})
+        self.assertTrue(User.objects.filter(username='asha').exists())
+
+    def test_admin_hashes_in_process_and_caps_the_file(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        url = reverse('admin:users_userprofile_import')
+        rows = [import_row(f'seller{n}', phone=f'+255700{n:06d}') for n in range(10)]
+
+        with mock.patch('users.importing.ProcessPoolExecutor') as pool:
+            self.client.post(url, {'csv_file': self.csv_upload(rows[:9] + [import_row('boss', 'superuser', '+255799999999')])})
+        pool.assert_not_called()
+        self.assertTrue(User.objects.get(username='boss').is_superuser)
+
+        too_many = [import_row(f'bulk{n}', phone=f'+255711{n:06d}') for n in range(ADMIN_MAX_ROWS + 1)]
+        response = self.client.post(url, {'csv_file': self.csv_upload(too_many)})
+        self.assertContains(response, 'use manage.py import_users for larger files')
+        self.assertFalse(User.objects.filter(username__startswith='bulk').exists())
+
+
+class UserSearchPaginationTests(TestCase):
+    """Manage users pages by (date_joined, id) and searches by case-insensitive prefix"""
+
+    def setUp(self):
+        joined = timezone.now()
+        for number, name in enumerate(('Asha', 'ashura', 'Baraka', 'Chausiku', 'Daudi')):
+            user = User.objects.create_user(name, email=f'{name}@Example.com', password='x')
+            profile = user.userprofile
+            profile.phone_number = f'+25571200000{number}'
+            profile.role = 'seller' if number % 2 else 'buyer'
+            profile.save()
+        # Ties on date_joined must still page without gaps or repeats
+        User.objects.filter(username__in=('Asha', 'ashura', 'Baraka')).update(date_joined=joined)
+
+    def walk(self, queryset, per_page):
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(queryset, cursor, per_page=per_page, ordering=('-date_joined', '-id'))
+            pages.append([user.username for user in page])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(User.objects.order_by('-date_joined', '-id').values_list('username', flat=True))
+        for per_page in (1, 2, 4):
+            pages = self.walk(User.objects.all(), per_page)
+            self.assertEqual([name for page in pages for name in page], expected)
+            self.assertTrue(all(len(page) <= per_page for page in pages))
+
+    def test_malformed_cursor_starts_over(self):
+        page = keyset_paginate(User.objects.all(), 'not-a-cursor', per_page=2, ordering=('-date_joined', '-id'))
+        self.assertIsNone(page.cursor)
+        self.assertEqual(len(page), 2)
+
+    def test_prefix_search_ignores_case(self):
+        def names(query, role=''):
+            return sorted(search_users(User.objects.all(), query, role).values_list('username', flat=True))
+
+        self.assertEqual(names('asha'), ['Asha'])
+        self.assertEqual(names('ASH'), ['Asha', 'ashura'])
+        self.assertEqual(names('baraka@example'), ['Baraka'])
+        self.assertEqual(names('ash', role='seller'), ['ashura'])
+        for phone in ('0712000003', '712000003', '+255 712 000 003'):
+            self.assertEqual(names(phone), ['Chausiku'])
+
+    def test_manage_users_pages_search_results(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        url = reverse('manage_users')
+
+        response = self.client.get(url, {'q': 'a'})
+        self.assertEqual([user.username for user in response.context['users']], ['admin', 'ashura', 'Asha'])
+
+
+class DashboardStatsTests(TestCase):
+    """The dashboard counters come from one shared snapshot that counted writes drop"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'x')
+        self.client.force_login(self.admin)
+        stats_cache().delete(STATS_CACHE_KEY)
+        self.addCleanup(stats_cache().delete, STATS_CACHE_KEY)
+
+    def assertDropsSnapshot(self, write):
+        dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertIsNone(stats_cache().get(STATS_CACHE_KEY))
+
+    def test_snapshot_is_one_query_per_counted_table_then_cached(self):
+        for number in range(3):
+            User.objects.create_user(f'seller{number}', password='x')
+        # Session user, cart, five snapshot queries, recent orders, categories, today's reports
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('superuser_dashboard'))
+        self.assertEqual(response.context['total_users'], 4)
+        with self.assertNumQueries(5):
+            self.client.get(reverse('superuser_dashboard'))
+
+    def test_snapshot_lives_in_the_shared_cache(self):
+        self.assertEqual(settings.DASHBOARD_CACHE_ALIAS, 'shared')
+        self.assertNotIsInstance(stats_cache(), LocMemCache)
+        self.assertEqual(dashboard_stats()['total_users'], 1)
+        self.assertEqual(stats_cache().get(STATS_CACHE_KEY)['total_users'], 1)
+
+    def test_user_profile_and_order_saves_drop_the_snapshot(self):
+        self.assertDropsSnapshot(lambda: User.objects.create_user('asha', password='x'))
+        profile = UserProfile.objects.get(user__username='asha')
+        profile.role = 'seller'
+        self.assertDropsSnapshot(profile.save)
+        self.assertDropsSnapshot(lambda: Order.objects.create(
+            customer_name='Asha', customer_email='asha@example.com', customer_phone='+255712345678',
+            delivery_address='Arusha', total_amount=Decimal('10000.00'),
+        ))
+        self.assertEqual(dashboard_stats()['total_sellers'], 1)
+        self.assertEqual(dashboard_stats()['total_orders'], 1)
+
+    def test_login_keeps_the_snapshot(self):
+        dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.last_login = timezone.now()
+            self.admin.save(update_fields=['last_login'])
+        self.assertIsNotNone(stats_cache().get(STATS_CACHE_KEY))
+
+
+class SessionEngineTests(TestCase):
+    """Sessions are served from the cache and only written when changed or close to expiry"""
+
+    def setUp(self):
+        self.session = SessionStore()
+        self.session['theme'] = 'dark'
+        self.session.save()
+        self.addCleanup(self.session.delete)
+
+    def reopen(self):
+        return SessionStore(self.session.session_key)
+
+    def save_writes(self, session):
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        return writes(queries, 'django_session')
+
+    def test_unchanged_session_is_read_from_cache_and_not_written(self):
+        session = self.reopen()
+        with self.assertNumQueries(0):
+            self.assertEqual(session['theme'], 'dark')
+        self.assertEqual(self.save_writes(session), [])
+
+    def test_changes_are_written_to_database_and_cache(self):
+        session = self.reopen()
+        session['theme'] = 'light'
+        self.assertEqual(len(self.save_writes(session)), 1)
+
+        session._cache.delete(session.cache_key)  # A cold cache falls back to the row
+        self.assertEqual(self.reopen()['theme'], 'light')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.reopen()['theme'], 'light')
+
+    def test_expiry_is_refreshed_once_it_runs_low(self):
+        session = self.reopen()
+        session.load()
+        almost_expired = timezone.now() + timedelta(seconds=session.get_expiry_age() * 0.2)
+        session._remember(session._session, almost_expired)
+
+        session = self.reopen()
+        self.assertEqual(len(self.save_writes(session)), 1)
+        fresh = self.reopen()
+        fresh.load()
+        self.assertGreater(fresh._stored_expiry, almost_expired)
+        self.assertEqual(self.save_writes(self.reopen()), [])
+
+    def test_browsing_does_not_write_sessions(self):
+        session = self.client.session
+        session['theme'] = 'dark'
+        session.save()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.client.get(reverse('home'))
+        self.assertEqual(writes(queries, 'django_session'), [])
+
+
+class PurgeExpiredTests(TestCase):
+    """Only expired or abandoned rows are purged, a batch at a time"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.user = User.objects.create_user('buyer1', password='x')
+        for number in range(5):
+            Session.objects.create(session_key=f'old{number}', session_data='x', expire_date=now - timedelta(hours=1))
+        Session.objects.create(session_key='live', session_data='x', expire_date=now + timedelta(hours=1))
+
+        PasswordResetCode.objects.create(user=self.user, reset_code='111111', expires_at=now - timedelta(minutes=1))
+        PasswordResetCode.objects.create(user=self.user, reset_code='222222')  # Never confirmable
+        self.live_code = PasswordResetCode.objects.create(
+            user=self.user, reset_code='333333', expires_at=now + timedelta(minutes=10),
+        )
+
+        old = now - timedelta(days=30)
+        self.carts = {
+            'abandoned': Cart.objects.create(session_key='gone'),
+            'recent': Cart.objects.create(session_key='here'),
+            'ordered': Cart.objects.create(session_key='paid', is_ordered=True),
+            'user': Cart.objects.create(user=self.user),
+        }
+        Cart.objects.filter(pk__in=[cart.pk for name, cart in self.carts.items() if name != 'recent']).update(
+            updated_at=old,
+        )
+
+        self.old_job = Job.enqueue('export', {'report': 'daily'})
+        self.new_job = Job.enqueue('export', {'report': 'daily'})
+        Job.objects.filter(pk__in=(self.old_job.pk, self.new_job.pk)).update(status=Job.SUCCEEDED)
+        Job.objects.filter(pk=self.old_job.pk).update(created_at=old - timedelta(days=30))
+
+    def test_purges_in_batches(self):
+        with self.assertNumQueries(3 * 4 + 1):  # Per batch: select ids, savepoint, delete, release; final select
+            removed = purge(Session.objects.filter(expire_date__lt=timezone.now()), batch_size=2, pause=0)
+        self.assertEqual(removed, 5)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    def test_keeps_live_rows(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(JOB_EXPORT_DIR=directory):
+            old_file, new_file = export_path(self.old_job), export_path(self.new_job)
+            old_file.write_text('csv')
+            new_file.write_text('csv')
+            with self.captureOnCommitCallbacks(execute=True):
+                results = purge_expired(batch_size=2, pause=0)
+            files = (old_file.exists(), new_file.exists())
+
+        self.assertEqual(
+            {kind: result['removed'] for kind, result in results.items()},
+            {'sessions': 5, 'reset_codes': 2, 'carts': 1, 'jobs': 1},
+        )
+        self.assertEqual(list(PasswordResetCode.objects.all()), [self.live_code])
+        self.assertEqual(
+            set(Cart.objects.values_list('pk', flat=True)),
+            {cart.pk for name, cart in self.carts.items() if name != 'abandoned'},
+        )
+        self.assertEqual(list(Job.objects.all()), [self.new_job])
+        self.assertEqual(files, (False, True))
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('purge_expired', '--dry-run', '--only', 'sessions', stdout=out)
+        self.assertEqual(out.getvalue(), 'sessions: 5 row(s) would be removed.\n')
+        self.assertEqual(Session.objects.count(), 6)
+
+
+class SQLiteConnectionTests(TestCase):
+    """New connections get the configured pragmas and transaction mode; migration 0015 turns on WAL"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/check.sqlite3'
+
+    def open_connection(self):
+        """A connection to a scratch database file with the project's DATABASES settings"""
+        default = connections['default']
+        other = type(default)({**default.settings_dict, 'NAME': self.path}, alias='sqlite_check')
+        self.addCleanup(other.close)
+        other.ensure_connection()
+        return other
+
+    def pragma(self, other, name):
+        with other.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_settings_apply_to_every_new_connection(self):
+        other = self.open_connection()
+        self.assertEqual(
+            {name: self.pragma(other, name) for name in ('synchronous', 'busy_timeout', 'cache_size', 'temp_store')},
+            {'synchronous': 1, 'busy_timeout': 20000, 'cache_size': -65536, 'temp_store': 2},
+        )
+        self.assertEqual(self.pragma(other, 'mmap_size'), 134217728)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        other = self.open_connection()
+        self.assertEqual(other.transaction_mode, 'IMMEDIATE')
+        connections['sqlite_check'] = other
+        self.addCleanup(connections.__delitem__, 'sqlite_check')
+
+        with transaction.atomic(using='sqlite_check'):
+            self.pragma(other, 'user_version')  # Reads only
+            writer = sqlite3.connect(self.path, timeout=0)
+            self.addCleanup(writer.close)
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                writer.execute('BEGIN IMMEDIATE')
+
+    def test_migration_switches_the_file_to_wal(self):
+        migration = import_module('users.migrations.0015_sqlite_wal')
+        other = self.open_connection()
+        self.assertEqual(self.pragma(other, 'journal_mode'), 'delete')
+
+        with other.schema_editor(atomic=False) as editor:
+            migration.enable_wal(apps, editor)
+        # Stored in the file: a fresh connection is in WAL mode without any init_command
+        fresh = self.open_connection()
+        self.assertEqual(self.pragma(fresh, 'journal_mode'), 'wal')
+        fresh.close()  # WAL can only be left by the last connection
+
+        with other.schema_editor(atomic=False) as editor:
+            migration.disable_wal(apps, editor)
+        self.assertEqual(self.pragma(other, 'journal_mode'), 'delete')
@@ -14,18 +14,31 @@ urlpatterns = [
     # Dashboard URLs
     path('buyer-dashboard/', views.buyer_dashboard, name='buyer_dashboard'),
     path('seller-dashboard/', views.seller_dashboard, name='seller_dashboard'),
+    path('seller-dashboard/events/', views.seller_order_events, name='seller_order_events'),
+    path('seller-dashboard/updates/', views.seller_order_updates, name='seller_order_updates'),
+    path('seller-dashboard/orders/<int:order_id>/', views.seller_order_detail, name='seller_order_detail'),
     path('superuser-dashboard/', views.superuser_dashboard, name='superuser_dashboard'),
     
     # Order management URLs
+    path('order-lookup/', views.order_lookup, name='order_lookup'),
     path('accept-order/<int:order_id>/', views.accept_order, name='accept_order'),
     path('accept-anonymous-order/<int:order_id>/', views.accept_anonymous_order, name='accept_anonymous_order'),
     path('complete-order/<int:order_id>/', views.complete_order, name='complete_order'),
     
     # Report URLs
     path('daily-report/', views.daily_report_view, name='daily_report'),
+    path('daily-report/batch/', views.daily_report_batch, name='daily_report_batch'),
     path('view-reports/', views.view_reports, name='view_reports'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard.json', views.leaderboard_json, name='leaderboard_json'),
     path('monthly-reports/', views.monthly_reports_view, name='monthly_reports'),
     path('generate-monthly-reports/', views.generate_monthly_reports, name='generate_monthly_reports'),
+    path('reports/export/daily/', views.export_daily_reports, name='export_daily_reports'),
+    path('reports/export/monthly/', views.export_monthly_reports, name='export_monthly_reports'),
+    path('reports/export/book-sales/', views.export_book_sales, name='export_book_sales'),
+    path('reports/export/<str:report>/background/', views.enqueue_export, name='enqueue_export'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     
     # User management URLs
     path('manage-users/', views.manage_users, name='manage_users'),
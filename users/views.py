@@ -1,29 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.core.mail import send_mail
-from django.core.paginator import Paginator
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.core.cache import cache
 from django.contrib.auth.views import LoginView
-from users.models import UserProfile, PasswordResetCode, DailyReport, MonthlyReport, AnonymousOrder
-from users.forms import RegistrationForm, UserForm, UserProfileForm
+from users.models import UserProfile, PasswordResetCode, DailyReport, MonthlyReport, AnonymousOrder, SellerPerformance, Job
+from users.jobs import EXPORTS, export_path
+from users.performance import WINDOWS
+from users.forms import RegistrationForm, UserForm, UserProfileForm, DailyReportEntryForm
 from django.contrib.auth.forms import AuthenticationForm
 from django.utils.translation import activate, get_language
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from django.utils.translation import gettext as _
+from django.db.models import Max, Sum
+from django.utils.translation import gettext as _, gettext_lazy
 from django.contrib.auth import login
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode, url_has_allowed_host_and_scheme
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from datetime import timedelta
 from django.conf import settings
-from products.models import Category, Product, Cart, CartItem, Order, OrderItem
+from products.models import Category, Product, Cart, CartItem, Order, OrderItem, OrderEvent, ArchivedOrder, BookSaleReport
+from products.events import order_events
+from products.search import search_orders
+from .pagination import keyset_paginate
+from .search import search_users
+from .dashboard import dashboard_stats
+from .exports import (
+    BOOK_SALE_HEADER, DAILY_REPORT_HEADER, MONTHLY_REPORT_HEADER,
+    book_sale_rows, csv_response, daily_report_rows, filter_monthly_reports, filter_reports,
+    monthly_report_rows,
+)
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib import messages
@@ -37,29 +50,67 @@ from django.utils.encoding import force_bytes, force_str
 from datetime import datetime, timedelta
 from django.db.models import Q
 from functools import wraps
+import asyncio
+import json
 
 
-def role_required(allowed_roles):
-    """Decorator to check if user has required role"""
+def user_role(user):
+    """
+    Profile role of ``user``; users without a profile are buyers, the profile's
+    default role. ProfileModelBackend loads the profile together with the user,
+    so this costs no query.
+    """
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.userprofile.role
+    except UserProfile.DoesNotExist:
+        return UserProfile._meta.get_field('role').default
+
+
+def has_role(user, allowed_roles):
+    """Django superusers count as the 'superuser' role"""
+    return user_role(user) in allowed_roles or ('superuser' in allowed_roles and user.is_superuser)
+
+
+def role_required(allowed_roles, message=None, json=False):
+    """
+    Decorator to check if user has required role.
+
+    Anonymous users are sent to the login page. Users without one of
+    ``allowed_roles`` are redirected home with ``message``, or get a 403 JSON
+    error when ``json`` is set. Works on sync and async views.
+    """
+    def deny(request):
+        error = message or _('You do not have permission to access this page.')
+        if json:
+            return JsonResponse({'error': error}, status=403)
+        messages.error(request, error)
+        return redirect('home')
+
     def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                user = await request.auser()
+                if not user.is_authenticated:
+                    return redirect_to_login(request.get_full_path())
+                if not has_role(user, allowed_roles):
+                    return deny(request)
+                return await view_func(request, *args, **kwargs)
+            return _wrapped_async_view
+
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
-                return redirect('login')
-            
-            try:
-                user_profile = request.user.userprofile
-                if user_profile.role not in allowed_roles:
-                    messages.error(request, _('You do not have permission to access this page.'))
-                    return redirect('home')
-            except UserProfile.DoesNotExist:
-                messages.error(request, _('User profile not found.'))
-                return redirect('home')
-            
+                return redirect_to_login(request.get_full_path())
+            if not has_role(request.user, allowed_roles):
+                return deny(request)
             return view_func(request, *args, **kwargs)
         return _wrapped_view
     return decorator
 
+
 def register_view(request):
     """User registration view"""
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
@@ -68,13 +119,8 @@ def register_view(request):
     if request.method == 'POST':
         form = RegistrationForm(request.POST)
         if form.is_valid():
+            # Saving the user creates its buyer profile (see RegistrationForm.save)
             user = form.save()
-            # Create user profile
-            UserProfile.objects.create(
-                user=user,
-                phone_number=form.cleaned_data.get('phone_number', ''),
-                role='buyer'  # Default role for self-registered users
-            )
             username = form.cleaned_data.get('username')
             messages.success(request, _('Account created successfully! You can now log in.'))
             return redirect('login')
@@ -98,33 +144,18 @@ def login_view(request):
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                # Role-based redirection
-                try:
-                    user_profile = user.userprofile
-                    if user_profile.role == 'seller':
-                        messages.success(request, _('Welcome back, %(username)s!') % {'username': username})
-                        return redirect('seller_dashboard')
-                    elif user_profile.role == 'superuser':
-                        messages.success(request, _('Welcome back, %(username)s!') % {'username': username})
-                        return redirect('superuser_dashboard')
-                    else:
-                        messages.success(request, _('Welcome back, %(username)s!') % {'username': username})
-                        return redirect('home')  # Buyers go to home page
-                except UserProfile.DoesNotExist:
-                    # If no profile exists, create one with buyer role
-                    UserProfile.objects.create(user=user, phone_number='', role='buyer')
-                    messages.success(request, _('Welcome back, %(username)s!') % {'username': username})
-                    return redirect('home')
-                
-                # Check if user is Django superuser
-                if user.is_superuser:
-                    messages.success(request, _('Welcome back, %(username)s!') % {'username': username})
-                    return redirect('superuser_dashboard')
+            # The form already authenticated the user; checking again would hash the password twice
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, _('Welcome back, %(username)s!') % {'username': user.get_username()})
+
+            # Role-based redirection; users without a profile are buyers and go home
+            role = user_role(user)
+            if role == 'seller':
+                return redirect('seller_dashboard')
+            if has_role(user, ('superuser',)):
+                return redirect('superuser_dashboard')
+            return redirect('home')  # Buyers go to home page
     else:
         form = AuthenticationForm()
     
@@ -178,24 +209,31 @@ def profile_view(request):
     return render(request, 'users/profile.html', context)
 
 
+DASHBOARD_PAGE_SIZE = 20  # Orders per dashboard list page
+
+
 @login_required
+@role_required(('buyer',), gettext_lazy('Access denied. This dashboard is for buyers only.'))
 def buyer_dashboard(request):
     """Buyer dashboard view"""
-    # Check if user is buyer
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'buyer':
-            messages.error(request, _('Access denied. This dashboard is for buyers only.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        # Create buyer profile if doesn't exist
-        UserProfile.objects.create(user=request.user, phone_number='', role='buyer')
-    
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
-    # Get buyer's orders
-    orders = Order.objects.filter(customer=request.user).order_by('-created_at')[:10]
+    # Get buyer's orders, one indexed page at a time
+    orders = keyset_paginate(
+        Order.objects.for_customer(request.user).select_related('seller'),
+        request.GET.get('orders_after'),
+        per_page=10,
+    )
+
+    # Archived orders are only read when the buyer asks for their full history
+    archived_orders = None
+    if request.GET.get('history'):
+        archived_orders = keyset_paginate(
+            ArchivedOrder.objects.filter(customer=request.user).select_related('seller'),
+            request.GET.get('archived_after'),
+            per_page=10,
+        )
     
     # Get recent products
     recent_products = Product.objects.order_by('-created_at')[:8]
@@ -204,6 +242,7 @@ def buyer_dashboard(request):
         'categories': categories,
         'cart_item_count': cart_item_count,
         'orders': orders,
+        'archived_orders': archived_orders,
         'recent_products': recent_products,
         'current_tab': 'dashboard',
         'theme': request.session.get('theme', 'light'),
@@ -212,31 +251,43 @@ def buyer_dashboard(request):
 
 
 @login_required
+@role_required(('seller',), gettext_lazy('Access denied. This dashboard is for sellers only.'))
 def seller_dashboard(request):
     """Seller dashboard view"""
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
-    # Check if user is seller
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'seller':
-            messages.error(request, _('Access denied. This dashboard is for sellers only.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        messages.error(request, _('User profile not found.'))
-        return redirect('home')
-    
-    # Get pending orders (both regular and anonymous)
-    pending_orders = Order.objects.filter(status='pending').order_by('-created_at')
-    anonymous_orders = Order.objects.filter(status='pending', is_anonymous=True).order_by('-created_at')
+    # Get pending orders, registered and anonymous listed separately
+    pending_orders = keyset_paginate(
+        Order.objects.pending(anonymous=False),
+        request.GET.get('pending_after'),
+        per_page=DASHBOARD_PAGE_SIZE,
+    )
+    anonymous_orders = keyset_paginate(
+        Order.objects.pending(anonymous=True),
+        request.GET.get('anonymous_after'),
+        per_page=DASHBOARD_PAGE_SIZE,
+    )
     
     # Get seller's accepted orders
-    my_orders = Order.objects.filter(seller=request.user).order_by('-created_at')[:10]
+    my_orders = keyset_paginate(
+        Order.objects.for_seller(request.user),
+        request.GET.get('orders_after'),
+        per_page=10,
+    )
+
+    # Archived orders are only read when the seller asks for their full history
+    archived_orders = None
+    if request.GET.get('history'):
+        archived_orders = keyset_paginate(
+            ArchivedOrder.objects.filter(seller=request.user),
+            request.GET.get('archived_after'),
+            per_page=10,
+        )
     
     # Get today's report
     today = timezone.now().date()
-    today_report = DailyReport.objects.filter(seller=request.user, date=today).first()
+    today_report = DailyReport.objects.with_book_totals().filter(seller=request.user, date=today).first()
     
     context = {
         'categories': categories,
@@ -244,7 +295,12 @@ def seller_dashboard(request):
         'pending_orders': pending_orders,
         'anonymous_orders': anonymous_orders,
         'my_orders': my_orders,
+        'archived_orders': archived_orders,
         'today_report': today_report,
+        # Stream updates under ASGI; otherwise poll the event log from its current end
+        'stream_updates': serves_streams(request),
+        'last_event_id': OrderEvent.objects.aggregate(last=Max('id'))['last'] or 0,
+        'poll_seconds': ORDER_POLL_SECONDS,
         'current_tab': 'dashboard',
         'theme': request.session.get('theme', 'light'),
     }
@@ -252,56 +308,32 @@ def seller_dashboard(request):
 
 
 @login_required
+@role_required(('superuser',), gettext_lazy('Access denied. This dashboard is for administrators only.'))
 def superuser_dashboard(request):
     """Superuser dashboard view"""
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
-    # Check if user is superuser
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'superuser' and not request.user.is_superuser:
-            messages.error(request, _('Access denied. This dashboard is for administrators only.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        if not request.user.is_superuser:
-            messages.error(request, _('Access denied. This dashboard is for administrators only.'))
-            return redirect('home')
-    
-    # Get statistics
-    total_users = User.objects.count()
-    total_sellers = UserProfile.objects.filter(role='seller').count()
-    total_buyers = UserProfile.objects.filter(role='buyer').count()
-    total_orders = Order.objects.count()
-    total_anonymous_orders = AnonymousOrder.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    pending_anonymous_orders = AnonymousOrder.objects.filter(is_processed=False).count()
+    # Counters and recent users come from the cached snapshot
+    stats = dashboard_stats()
     
     # Get recent orders
-    recent_orders = Order.objects.order_by('-created_at')[:10]
-    recent_anonymous_orders = Order.objects.filter(is_anonymous=True).order_by('-created_at')[:5]
+    recent_orders = keyset_paginate(
+        Order.objects.select_related('seller'),
+        request.GET.get('orders_after'),
+        per_page=10,
+    )
     
     # Get today's reports
     today = timezone.now().date()
-    today_reports = DailyReport.objects.filter(date=today).select_related('seller')
-    
-    # Get recent users
-    recent_users = User.objects.order_by('-date_joined')[:10]
+    today_reports = DailyReport.objects.with_book_totals().filter(date=today).select_related('seller')
     
     context = {
         'categories': categories,
         'cart_item_count': cart_item_count,
-        'total_users': total_users,
-        'total_sellers': total_sellers,
-        'total_buyers': total_buyers,
-        'total_orders': total_orders,
-        'total_anonymous_orders': total_anonymous_orders,
-        'pending_orders': pending_orders,
-        'pending_anonymous_orders': pending_anonymous_orders,
+        **stats,
         'recent_orders': recent_orders,
-        'recent_anonymous_orders': recent_anonymous_orders,
         'today_reports': today_reports,
-        'recent_users': recent_users,
         'current_tab': 'dashboard',
         'theme': request.session.get('theme', 'light'),
     }
@@ -309,18 +341,25 @@ def superuser_dashboard(request):
 
 
 @login_required
+@role_required(('superuser',), gettext_lazy('Access denied. Only administrators can search orders.'))
+def order_lookup(request):
+    """Full-text order search for superusers"""
+    query = request.GET.get('q', '').strip()
+    orders = search_orders(query, limit=50) if query else []
+
+    context = {
+        'query': query,
+        'orders': orders,
+        'current_tab': 'dashboard',
+        'theme': request.session.get('theme', 'light'),
+    }
+    return render(request, 'users/order_lookup.html', context)
+
+
+@login_required
+@role_required(('seller',), gettext_lazy('Only sellers can accept orders.'))
 def accept_anonymous_order(request, order_id):
     """Accept an anonymous order by seller"""
-    # Check if user is seller
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'seller':
-            messages.error(request, _('Only sellers can accept orders.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        messages.error(request, _('User profile not found.'))
-        return redirect('home')
-    
     order = get_object_or_404(Order, id=order_id, status='pending', is_anonymous=True)
     order.accept_order(request.user)
     
@@ -329,18 +368,9 @@ def accept_anonymous_order(request, order_id):
 
 
 @login_required
+@role_required(('seller',), gettext_lazy('Only sellers can accept orders.'))
 def accept_order(request, order_id):
     """Accept an order by seller"""
-    # Check if user is seller
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'seller':
-            messages.error(request, _('Only sellers can accept orders.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        messages.error(request, _('User profile not found.'))
-        return redirect('home')
-    
     order = get_object_or_404(Order, id=order_id, status='pending')
     order.accept_order(request.user)
     messages.success(request, _('Order accepted successfully!'))
@@ -348,37 +378,109 @@ def accept_order(request, order_id):
 
 
 @login_required
+@role_required(('seller',), gettext_lazy('Only sellers can complete orders.'))
 def complete_order(request, order_id):
     """Complete an order by seller"""
-    # Check if user is seller
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'seller':
-            messages.error(request, _('Only sellers can complete orders.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        messages.error(request, _('User profile not found.'))
-        return redirect('home')
-    
     order = get_object_or_404(Order, id=order_id, seller=request.user, status='accepted')
     order.complete_order()
     messages.success(request, _('Order completed successfully!'))
     return redirect('seller_dashboard')
 
 
+SSE_KEEPALIVE_SECONDS = 15  # Comment line sent so proxies keep the stream open
+SSE_MAX_STREAM_SECONDS = 300  # Browsers reconnect automatically with Last-Event-ID
+ORDER_POLL_SECONDS = 15  # Dashboard polling interval when served under WSGI
+ORDER_POLL_LIMIT = 100  # Events returned per poll
+
+
+def serves_streams(request):
+    """
+    Whether long-lived responses are safe: only under ASGI. A WSGI worker would
+    be held for the whole stream.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+@login_required
+@role_required(('seller',), gettext_lazy('Only sellers can follow order updates.'), json=True)
+async def seller_order_events(request):
+    """Server-Sent Events stream of order changes for the seller dashboard"""
+    if not serves_streams(request):
+        # 204 tells EventSource to stop reconnecting; the dashboard polls instead
+        return HttpResponse(status=204)
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_id') or order_events.last_id)
+    except ValueError:
+        last_id = order_events.last_id
+
+    async def stream():
+        nonlocal last_id
+        yield "retry: 5000\n\n"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SSE_MAX_STREAM_SECONDS
+        while loop.time() < deadline:
+            events = await order_events.wait_for_events(last_id, SSE_KEEPALIVE_SECONDS)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                last_id = event['id']
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
+
+
+@login_required
+@role_required(('seller',), gettext_lazy('Only sellers can follow order updates.'), json=True)
+def seller_order_updates(request):
+    """Order events after ``?after=<OrderEvent id>``, for dashboards that poll instead of streaming"""
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({'error': _('Invalid event id.')}, status=400)
+    events = list(
+        OrderEvent.objects.filter(id__gt=after).order_by('id')
+        .values('id', 'event_type', 'order_id', 'to_status')[:ORDER_POLL_LIMIT]
+    )
+    return JsonResponse({
+        'last_id': events[-1]['id'] if events else after,
+        'events': [
+            {
+                'id': event['id'],
+                'type': f"order_{event['event_type']}",
+                'data': {'id': event['order_id'], 'status': event['to_status']},
+            }
+            for event in events
+        ],
+    })
+
+
+@login_required
+@role_required(('seller',), gettext_lazy('Only sellers can view orders.'), json=True)
+def seller_order_detail(request, order_id):
+    """Card details for an order the seller may see: any pending order or one of their own"""
+    order = Order.objects.filter(Q(status='pending') | Q(seller=request.user), id=order_id).first()
+    if order is None:
+        return JsonResponse({'error': _('Order not found.')}, status=404)
+    return JsonResponse({
+        'id': order.id,
+        'status': order.status,
+        'customer_name': order.customer_name,
+        'customer_phone': order.customer_phone,
+        'customer_email': order.customer_email,
+        'total_amount': str(order.total_amount),
+        'is_anonymous': order.is_anonymous,
+        'created_at': timezone.localtime(order.created_at).strftime('%b %d, %Y %H:%M'),
+    })
+
+
 @login_required
+@role_required(('seller',), gettext_lazy('Only sellers can fill daily reports.'))
 def daily_report_view(request):
     """Daily report form for sellers"""
-    # Check if user is seller
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'seller':
-            messages.error(request, _('Only sellers can fill daily reports.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        messages.error(request, _('User profile not found.'))
-        return redirect('home')
-    
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
@@ -408,12 +510,12 @@ def daily_report_view(request):
         # Process books sold
         books_sold_details = []
         book_sold_names = request.POST.getlist('book_sold_name[]')
-        custom_book_sold = request.POST.getlist('custom_book_sold[]')
         book_sold_quantities = request.POST.getlist('book_sold_quantity[]')
         
-        for i, (name, custom_name, quantity) in enumerate(zip(book_sold_names, custom_book_sold, book_sold_quantities)):
+        # Titles are typed with autocomplete, so the name field holds custom titles too
+        for name, quantity in zip(book_sold_names, book_sold_quantities):
             if quantity and int(quantity) > 0:
-                book_name = custom_name if name == 'custom' and custom_name else name
+                book_name = name.strip()
                 if book_name:
                     books_sold_details.append({
                         'book_name': book_name,
@@ -423,12 +525,12 @@ def daily_report_view(request):
         # Process books given free
         books_given_free_details = []
         book_free_names = request.POST.getlist('book_free_name[]')
-        custom_book_free = request.POST.getlist('custom_book_free[]')
         book_free_quantities = request.POST.getlist('book_free_quantity[]')
         
-        for i, (name, custom_name, quantity) in enumerate(zip(book_free_names, custom_book_free, book_free_quantities)):
+        # Titles are typed with autocomplete, so the name field holds custom titles too
+        for name, quantity in zip(book_free_names, book_free_quantities):
             if quantity and int(quantity) > 0:
-                book_name = custom_name if name == 'custom' and custom_name else name
+                book_name = name.strip()
                 if book_name:
                     books_given_free_details.append({
                         'book_name': book_name,
@@ -453,41 +555,82 @@ def daily_report_view(request):
         date = timezone.now().date() - timedelta(days=i)
         available_dates.append(date)
     
-    # Get all products for book selection
-    products = Product.objects.all().order_by('name')
-    products_names = [product.name for product in products]
-    
     context = {
         'categories': categories,
         'cart_item_count': cart_item_count,
         'report': report,
         'report_date': report_date,
         'available_dates': available_dates,
-        'products': products,
-        'products_names': products_names,
         'current_tab': 'report',
         'theme': request.session.get('theme', 'light'),
     }
     return render(request, 'users/daily_report.html', context)
 
 
+
+MAX_BATCH_DAYS = 62  # Two months of reports per request
+
+
 @login_required
+@require_POST
+@role_required(('seller',), gettext_lazy('Only sellers can fill daily reports.'), json=True)
+def daily_report_batch(request):
+    """
+    Save several days of daily reports at once from a JSON body of the form
+    ``{"reports": [{"date": "2024-05-01", "books_sold": [...], ...}, ...]}``.
+    Every day is validated first; nothing is saved unless all of them pass.
+    """
+    try:
+        entries = json.loads(request.body).get('reports')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': _('Request body must be a JSON object.')}, status=400)
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({'error': _('"reports" must be a non-empty list.')}, status=400)
+    if len(entries) > MAX_BATCH_DAYS:
+        return JsonResponse(
+            {'error': _('At most %(count)d days can be submitted at once.') % {'count': MAX_BATCH_DAYS}},
+            status=400,
+        )
+
+    results = []
+    cleaned = []
+    seen_dates = set()
+    for entry in entries:
+        form = DailyReportEntryForm(entry if isinstance(entry, dict) else {})
+        if not form.is_valid():
+            results.append({'date': entry.get('date') if isinstance(entry, dict) else None, 'errors': form.errors})
+            continue
+        report_date = form.cleaned_data['date']
+        if report_date in seen_dates:
+            results.append({'date': report_date.isoformat(), 'errors': {'date': [_('Duplicate date in batch.')]}})
+            continue
+        seen_dates.add(report_date)
+        cleaned.append(form.report_fields())
+        results.append({'date': report_date.isoformat()})
+
+    if any('errors' in result for result in results):
+        return JsonResponse({'saved': False, 'results': results}, status=400)
+
+    statuses = DailyReport.bulk_upsert(request.user, cleaned)
+    return JsonResponse({
+        'saved': True,
+        'results': [
+            {'date': report_date.isoformat(), 'status': status}
+            for report_date, status in statuses.items()
+        ],
+    })
+
+
+USERS_PAGE_SIZE = 25  # Users per manage-users page
+
+
+@login_required
+@role_required(('superuser',), gettext_lazy('Access denied. Only administrators can manage users.'))
 def manage_users(request):
     """Manage users view for superuser"""
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
-    # Check if user is superuser
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'superuser' and not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can manage users.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        if not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can manage users.'))
-            return redirect('home')
-    
     if request.method == 'POST':
         # Create new user
         username = request.POST.get('username')
@@ -503,79 +646,85 @@ def manage_users(request):
         elif User.objects.filter(email=email).exists():
             messages.error(request, _('Email already exists.'))
         else:
-            user = User.objects.create_user(
+            user = User(
                 username=username,
-                email=email,
-                password=password,
+                email=User.objects.normalize_email(email),
                 first_name=first_name,
-                last_name=last_name
-            )
-            
-            # Set superuser status if role is superuser
-            if role == 'superuser':
-                user.is_superuser = True
-                user.is_staff = True
-                user.save()
-            
-            UserProfile.objects.create(
-                user=user,
-                phone_number=phone_number,
-                role=role,
-                created_by=request.user
+                last_name=last_name,
+                # Set superuser status if role is superuser
+                is_superuser=role == 'superuser',
+                is_staff=role == 'superuser',
             )
+            user.set_password(password)
+            # One INSERT each for the user and, via the post_save signal, its profile
+            user._profile_defaults = {
+                'phone_number': phone_number,
+                'role': role,
+                'created_by': request.user,
+            }
+            user.save()
             
             messages.success(request, _('User created successfully!'))
             return redirect('manage_users')
     
-    # Get all users with profiles
-    users = User.objects.select_related('userprofile').order_by('-date_joined')
+    # One indexed page of users, newest first, narrowed by the search form
+    query = request.GET.get('q', '').strip()
+    role = request.GET.get('role', '')
+    if role not in dict(UserProfile.USER_ROLES):
+        role = ''
+    users = keyset_paginate(
+        search_users(User.objects.select_related('userprofile'), query, role),
+        request.GET.get('after'),
+        per_page=USERS_PAGE_SIZE,
+        ordering=('-date_joined', '-id'),
+    )
     
     context = {
         'categories': categories,
         'cart_item_count': cart_item_count,
         'users': users,
+        'query': query,
+        'role': role,
+        'roles': UserProfile.USER_ROLES,
         'current_tab': 'users',
         'theme': request.session.get('theme', 'light'),
     }
     return render(request, 'users/manage_users.html', context)
 
 
+RECENT_JOBS = 5  # Background jobs listed on the report pages
+
+
 @login_required
+@role_required(('superuser',), gettext_lazy('Access denied. Only administrators can view reports.'))
 def view_reports(request):
     """View all reports for superuser"""
     categories = Category.objects.filter(parent__isnull=True).prefetch_related('subcategories')
     cart_item_count = get_cart_item_count(request)
     
-    # Check if user is superuser
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'superuser' and not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can view reports.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        if not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can view reports.'))
-            return redirect('home')
-    
     # Get filter parameters
     seller_id = request.GET.get('seller')
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
     # Build query
-    reports = DailyReport.objects.select_related('seller').order_by('-date')
+    try:
+        reports = filter_reports(DailyReport.objects.all(), request.GET)
+    except ValueError:
+        messages.error(request, _('Invalid seller or date filter.'))
+        return redirect('view_reports')
     
-    if seller_id:
-        reports = reports.filter(seller_id=seller_id)
-    if date_from:
-        reports = reports.filter(date__gte=date_from)
-    if date_to:
-        reports = reports.filter(date__lte=date_to)
+    # Count once per filter combination and cache it instead of on every page
+    count_key = 'view_reports_count:%s:%s:%s' % (seller_id or '', date_from or '', date_to or '')
+    total_reports = cache.get_or_set(count_key, reports.count, settings.REPORT_COUNT_CACHE_SECONDS)
     
-    # Add pagination
-    paginator = Paginator(reports, 20)  # Show 20 reports per page
-    page_number = request.GET.get('page')
-    reports = paginator.get_page(page_number)
+    # Keyset pagination on (date, id); no OFFSET scans on deep pages
+    reports = keyset_paginate(
+        reports.with_book_totals().select_related('seller'),
+        request.GET.get('after'),
+        per_page=20,
+        ordering=('-date', '-id'),
+    )
     
     # Get sellers for filter dropdown
     sellers = User.objects.filter(userprofile__role='seller').order_by('username')
@@ -584,12 +733,82 @@ def view_reports(request):
         'categories': categories,
         'cart_item_count': cart_item_count,
         'reports': reports,
+        'total_reports': total_reports,
         'sellers': sellers,
+        'recent_jobs': Job.objects.filter(created_by=request.user)[:RECENT_JOBS],
         'current_tab': 'reports',
         'theme': request.session.get('theme', 'light'),
     }
     return render(request, 'users/view_reports.html', context)
 
+LEADERBOARD_SIZE = 20
+
+
+def leaderboard_rows(params):
+    """Top sellers for the requested window and metric, read from SellerPerformance only"""
+    try:
+        window = int(params.get('window', 30))
+    except ValueError:
+        window = 30
+    if window not in WINDOWS:
+        window = 30
+    metric = params.get('metric', 'books_sold')
+    if metric not in SellerPerformance.LEADERBOARD_METRICS:
+        metric = 'books_sold'
+    rows = SellerPerformance.objects.filter(window_days=window).select_related('seller').order_by(
+        f'-{metric}', 'seller__username',
+    )[:LEADERBOARD_SIZE]
+    return window, metric, rows
+
+
+@login_required
+@role_required(('seller', 'superuser'), gettext_lazy('Access denied. Only sellers and administrators can view the leaderboard.'))
+def leaderboard(request):
+    """Seller leaderboard over rolling 7/30/90-day windows"""
+    window, metric, rows = leaderboard_rows(request.GET)
+    context = {
+        'categories': Category.objects.filter(parent__isnull=True).prefetch_related('subcategories'),
+        'cart_item_count': get_cart_item_count(request),
+        'rows': rows,
+        'window': window,
+        'metric': metric,
+        'windows': WINDOWS,
+        'metrics': SellerPerformance.LEADERBOARD_METRICS,
+        'current_tab': 'leaderboard',
+        'theme': request.session.get('theme', 'light'),
+    }
+    return render(request, 'users/leaderboard.html', context)
+
+
+@login_required
+@role_required(('seller', 'superuser'), json=True)
+def leaderboard_json(request):
+    """JSON version of the leaderboard"""
+    window, metric, rows = leaderboard_rows(request.GET)
+    return JsonResponse({
+        'window_days': window,
+        'metric': metric,
+        'results': [
+            {
+                'seller': row.seller.username,
+                'as_of': row.as_of.isoformat(),
+                'days_reported': row.days_reported,
+                'books_sold': row.books_sold,
+                'books_free': row.books_free,
+                'houses_visited': row.houses_visited,
+                'teachings_given': row.teachings_given,
+                'working_hours': str(row.working_hours),
+                'books_per_hour': row.books_per_hour,
+                'houses_per_hour': row.houses_per_hour,
+                'teachings_per_hour': row.teachings_per_hour,
+                'current_streak': row.current_streak,
+                'longest_streak': row.longest_streak,
+            }
+            for row in rows
+        ],
+    })
+
+
 def password_reset_request(request):
     """Password reset request view"""
     if request.method == 'POST':
@@ -866,46 +1085,28 @@ def Shop(request):
 
 
 @login_required
+@role_required(('superuser',), gettext_lazy('Access denied. Only administrators can generate reports.'))
 def generate_monthly_reports(request):
     """Generate monthly reports for all sellers"""
-    # Check if user is superuser
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role != 'superuser' and not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can generate reports.'))
-            return redirect('home')
-    except UserProfile.DoesNotExist:
-        if not request.user.is_superuser:
-            messages.error(request, _('Access denied. Only administrators can generate reports.'))
-            return redirect('home')
-    
     # Get month and year from request
-    month = int(request.GET.get('month', timezone.now().month))
-    year = int(request.GET.get('year', timezone.now().year))
-    
-    # Get all sellers
-    sellers = User.objects.filter(userprofile__role='seller')
-    
-    generated_reports = []
-    for seller in sellers:
-        monthly_report = MonthlyReport.generate_monthly_report(seller, month, year)
-        if monthly_report:
-            generated_reports.append(monthly_report)
-    
-    messages.success(request, f'Generated {len(generated_reports)} monthly reports for {month}/{year}')
-    return redirect('monthly_reports')
-
-def is_superuser(user):
-    """
-    Allow access only to users whose profile role is 'superuser'.
-    """
     try:
-        return user.userprofile.role == 'superuser'
-    except UserProfile.DoesNotExist:
-        return False
+        month = int(request.GET.get('month', timezone.now().month))
+        year = int(request.GET.get('year', timezone.now().year))
+        date(year, month, 1)
+    except ValueError:
+        messages.error(request, _('Invalid month or year.'))
+        return redirect('monthly_reports')
+
+    # Generation runs in chunks under `manage.py run_jobs`; the page polls the job's progress
+    job = Job.enqueue('monthly_reports', {'month': month, 'year': year}, request.user)
+
+    messages.success(request, _('Queued monthly report generation for %(month)s/%(year)s (job #%(job)s).') % {
+        'month': month, 'year': year, 'job': job.pk,
+    })
+    return redirect(f"{reverse('monthly_reports')}?month={month}&year={year}")
 
 @login_required
-@user_passes_test(is_superuser)
+@role_required(('superuser',))
 def monthly_reports_view(request):
     """
     Display the Monthly Reports page.
@@ -946,6 +1147,105 @@ def monthly_reports_view(request):
         'available_years': available_years,
         'monthly_reports': monthly_reports,
         'selected_month': selected_month,
+        'recent_jobs': Job.objects.filter(created_by=request.user)[:RECENT_JOBS],
     }
 
     return render(request, 'users/monthly_reports.html', context)
+
+
+@login_required
+@role_required(('superuser',))
+def export_daily_reports(request):
+    """Stream the daily reports matching the View Reports filters as CSV"""
+    try:
+        reports = filter_reports(DailyReport.objects.order_by('-date', '-id'), request.GET)
+    except ValueError:
+        messages.error(request, _('Invalid seller or date filter.'))
+        return redirect('view_reports')
+    return csv_response('daily-reports', DAILY_REPORT_HEADER, daily_report_rows(reports))
+
+
+@login_required
+@role_required(('superuser',))
+def export_monthly_reports(request):
+    """Stream monthly reports as CSV, optionally for one month/year"""
+    try:
+        reports = filter_monthly_reports(
+            MonthlyReport.objects.order_by('-year', '-month', 'seller__username'), request.GET,
+        )
+    except ValueError:
+        messages.error(request, _('Invalid month or year.'))
+        return redirect('monthly_reports')
+    return csv_response('monthly-reports', MONTHLY_REPORT_HEADER, monthly_report_rows(reports))
+
+
+@login_required
+@role_required(('superuser',))
+def export_book_sales(request):
+    """Stream book sale reports as CSV with the same seller / date filters"""
+    try:
+        sales = filter_reports(
+            BookSaleReport.objects.order_by('-date_reported', '-id'), request.GET, date_field='date_reported',
+        )
+    except ValueError:
+        messages.error(request, _('Invalid seller or date filter.'))
+        return redirect('view_reports')
+    return csv_response('book-sales', BOOK_SALE_HEADER, book_sale_rows(sales))
+
+
+@login_required
+@role_required(('superuser',))
+@require_POST
+def enqueue_export(request, report):
+    """Queue a CSV export for `manage.py run_jobs` instead of streaming it from this request"""
+    if report not in EXPORTS:
+        raise Http404
+    back = request.META.get('HTTP_REFERER', '')
+    if not url_has_allowed_host_and_scheme(back, {request.get_host()}, request.is_secure()):
+        back = reverse('monthly_reports' if report == 'monthly' else 'view_reports')
+
+    filters = {key: value for key, value in request.GET.items() if value and key != 'after'}
+    try:
+        EXPORTS[report][3](EXPORTS[report][2](), filters)
+    except ValueError:
+        messages.error(request, _('Invalid month or year.') if report == 'monthly' else _('Invalid seller or date filter.'))
+        return redirect(back)
+
+    job = Job.enqueue('export', {'report': report, 'filters': filters}, request.user)
+    messages.success(request, _('Export queued (job #%(job)s). It can be downloaded from the jobs panel when ready.') % {
+        'job': job.pk,
+    })
+    return redirect(back)
+
+
+@login_required
+@role_required(('superuser',), json=True)
+def job_status(request, job_id):
+    """Progress of one background job as JSON, polled by the jobs panel"""
+    job = get_object_or_404(Job, pk=job_id)
+    data = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'processed': job.processed,
+        'total': job.total,
+        'percent': job.percent,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.kind == 'export' and job.status == Job.SUCCEEDED:
+        data['download_url'] = reverse('job_download', args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+@role_required(('superuser',))
+def job_download(request, job_id):
+    """Serve the CSV written by a finished export job"""
+    job = get_object_or_404(Job, pk=job_id, kind='export', status=Job.SUCCEEDED)
+    path = export_path(job)
+    if not path.exists():
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name, content_type='text/csv')